@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from pulsar_paragraph.catalogue import load_catalogue, write_snapshot
+from pulsar_paragraph.pulsar_classes import PulsarParagraph, parse_assoc, render_assoc, render_assoc_section
+from pulsar_paragraph.pulsar_paragraph import (
+    PARAGRAPH_COLUMNS,
+    SURVEY_CODES,
+    assoc_distance_overrides,
+    derive_quantities,
+    render_pulsar_paragraphs,
+    write_paragraphs,
+)
+from pulsar_paragraph.rewrite import PARAGRAPH_REWRITER
+
+
+# The number of pulsars in each benchmark scenario
+SCENARIOS = {
+    '1k': 1000,
+    '10k': 10000,
+    '100k': 100000,
+    '1M': 1000000,
+}
+# The stages timed for each scenario, in the order they run
+STAGES = ['fetch', 'derive', 'classify', 'assoc', 'assembly', 'postprocess', 'output']
+
+# Fraction of pulsars missing each parameter, roughly as in the ATNF catalogue
+MISSING_RATES = {
+    'PSRB': 0.7,
+    'P0': 0.01,
+    'P1': 0.3,
+    'DM': 0.03,
+    'AGE': 0.35,
+    'BSURF': 0.35,
+    'PB': 0.85,
+    'ECC': 0.88,
+    'MINMASS': 0.86,
+    'S1400': 0.45,
+    'VTRANS': 0.93,
+    'ASSOC': 0.85,
+    'SURVEY': 0.03,
+    'DATE': 0.02,
+    'DIST': 0.02,
+}
+# (lower, upper) of the log-uniform distribution of each numerical parameter
+PARAMETER_RANGES = {
+    'P0': (1e-3, 20),
+    'P1': (1e-21, 1e-11),
+    'DM': (1, 2000),
+    'AGE': (1e3, 1e11),
+    'BSURF': (1e7, 1e14),
+    'PB': (0.05, 2000),
+    'ECC': (1e-7, 0.9),
+    'MINMASS': (0.01, 2),
+    'S1400': (0.01, 2000),
+    'VTRANS': (5, 1000),
+    'DIST': (0.1, 30),
+}
+ASSOC_TEMPLATES = [
+    'GC:{cluster}[{ref}]',
+    'SNR:G{glon:.1f}{glat:+.1f}[{ref}]',
+    'XRS:{source}[{ref}]',
+    'GRS:4FGL_{source}[{ref}]',
+    'OPT:{source}[{ref}]',
+    'PWN:G{glon:.1f}{glat:+.1f}[{ref}]',
+    'EXGAL:SMC[{ref}]',
+    'EXGAL:LMC[{ref}]',
+]
+GLOBULAR_CLUSTERS = ['47Tuc', 'M15', 'M2', 'M22', 'M28', 'M5', 'M53', 'M62', 'NGC6440', 'NGC6752', 'Ter5', 'OmegaCen']
+
+
+def synthetic_catalogue(n_pulsars, seed=0):
+    """Generate an ATNF-like catalogue of the PARAGRAPH_COLUMNS for n_pulsars fake pulsars.
+
+    Values are drawn from roughly the catalogue's ranges with its missing value rates (MISSING_RATES),
+    and with ASSOC, SURVEY and DATE strings in the same formats as the catalogue.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        The synthetic catalogue, missing values are NaN.
+    """
+    rng = np.random.default_rng(seed)
+
+    def missing(column):
+        return rng.random(n_pulsars) < MISSING_RATES[column]
+
+    def log_uniform(column):
+        lower, upper = PARAMETER_RANGES[column]
+        values = 10 ** rng.uniform(np.log10(lower), np.log10(upper), n_pulsars)
+        values[missing(column)] = np.nan
+        return values
+
+    def strings(values, column):
+        values = np.asarray(values, dtype=object)
+        values[missing(column)] = np.nan
+        return values
+
+    ra = rng.integers(0, 24 * 60, n_pulsars)
+    dec = rng.integers(-89 * 60, 89 * 60, n_pulsars)
+    # The index suffix keeps the names unique
+    psrj = [
+        f"J{r // 60:02d}{r % 60:02d}{'-' if d < 0 else '+'}{abs(d) // 60:02d}{abs(d) % 60:02d}{i}"
+        for i, (r, d) in enumerate(zip(ra.tolist(), dec.tolist()))
+    ]
+    psrb = [f"B{r // 60:02d}{r % 60:02d}{'-' if d < 0 else '+'}{abs(d) // 60:02d}" for r, d in zip(ra.tolist(), dec.tolist())]
+    decj = [f"{'-' if d < 0 else '+'}{abs(d) // 60:02d}:{abs(d) % 60:02d}:{s:05.2f}" for d, s in zip(dec.tolist(), rng.uniform(0, 60, n_pulsars).tolist())]
+
+    p1 = log_uniform('P1')
+    p1[rng.random(n_pulsars) < 0.01] *= -1
+
+    # Only build the strings of the pulsars with an association
+    assoc = np.full(n_pulsars, np.nan, dtype=object)
+    for i in np.flatnonzero(~missing('ASSOC')).tolist():
+        entries = []
+        for template in rng.choice(ASSOC_TEMPLATES, rng.integers(1, 3)).tolist():
+            entries.append(template.format(
+                cluster=GLOBULAR_CLUSTERS[rng.integers(len(GLOBULAR_CLUSTERS))],
+                glon=rng.uniform(0, 360),
+                glat=rng.uniform(-5, 5),
+                source=f"J{rng.integers(0, 2400):04d}{rng.choice(['+', '-'])}{rng.integers(0, 9000):04d}",
+                ref=f"abc+{rng.integers(0, 100):02d}",
+            ))
+        assoc[i] = ','.join(entries)
+
+    # Some pulsars were found by two surveys
+    survey_codes = list(SURVEY_CODES)
+    first_surveys = rng.integers(len(survey_codes), size=n_pulsars).tolist()
+    second_surveys = rng.integers(len(survey_codes), size=n_pulsars).tolist()
+    two_surveys = (rng.random(n_pulsars) < 0.2).tolist()
+    survey = [
+        f"{survey_codes[first]},{survey_codes[second]}" if two else survey_codes[first]
+        for first, second, two in zip(first_surveys, second_surveys, two_surveys)
+    ]
+
+    return pd.DataFrame({
+        'PSRJ': psrj,
+        'PSRB': strings(psrb, 'PSRB'),
+        'P0': log_uniform('P0'),
+        'P1': p1,
+        'DM': log_uniform('DM'),
+        'AGE': log_uniform('AGE'),
+        'BSURF': log_uniform('BSURF'),
+        'PB': log_uniform('PB'),
+        'ECC': log_uniform('ECC'),
+        'MINMASS': log_uniform('MINMASS'),
+        'S1400': log_uniform('S1400'),
+        'VTRANS': log_uniform('VTRANS'),
+        'DECJ': decj,
+        'ASSOC': assoc,
+        'SURVEY': strings(survey, 'SURVEY'),
+        'DATE': strings(rng.integers(1968, 2025, n_pulsars).astype(str), 'DATE'),
+        'DIST': log_uniform('DIST'),
+    })[PARAGRAPH_COLUMNS]
+
+
+def clear_assoc_caches():
+    parse_assoc.cache_clear()
+    render_assoc.cache_clear()
+    render_assoc_section.cache_clear()
+
+
+def run_scenario(n_pulsars, seed=0, work_dir=None):
+    """Time each stage of rendering a synthetic catalogue of n_pulsars.
+
+    The stages are:
+
+    - fetch: loading the catalogue from a local snapshot (the network isn't benchmarked)
+    - derive: derive_quantities
+    - classify: putting every PulsarVariable value into its gate
+    - assoc: parsing and rendering the ASSOC strings and their distance overrides
+    - assembly: the rest of render_pulsar_paragraphs, building the paragraphs with the sentence plan
+    - postprocess: the PARAGRAPH_REWRITER fixes
+    - output: writing the paragraphs to a file
+
+    classify, assoc and postprocess are timed on their own, and assembly is the rest of the time taken by render_pulsar_paragraphs.
+
+    Returns
+    -------
+    result: dict
+        The "n_pulsars", the time of each stage in seconds ("stages"), the "total" time and "pulsars_per_second".
+    """
+    pulsar_paragraph = PulsarParagraph()
+    query = synthetic_catalogue(n_pulsars, seed=seed)
+    stages = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as cache_dir:
+        write_snapshot(query, 'benchmark', cache_dir=cache_dir)
+        del query
+
+        start = time.perf_counter()
+        query = load_catalogue(columns=PARAGRAPH_COLUMNS, cache_dir=cache_dir, offline=True)
+        stages['fetch'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        query = derive_quantities(query)
+        stages['derive'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for variable_name, column in [
+                ('period', 'P0'), ('dm', 'DM'), ('age', 'AGE_CORR'), ('bsurf', 'BSURF_CORR'), ('pb', 'PB'),
+                ('ecc', 'ECC'), ('minmass', 'MINMASS'), ('s1400', 'S1400'), ('vtrans', 'VTRANS'),
+            ]:
+            getattr(pulsar_paragraph, variable_name).variable_values_to_str(query[column])
+        stages['classify'] = time.perf_counter() - start
+
+        clear_assoc_caches()
+        start = time.perf_counter()
+        [pulsar_paragraph.assoc_section(assoc) for assoc in query['ASSOC'].tolist()]
+        assoc_distance_overrides(query['ASSOC'])
+        stages['assoc'] = time.perf_counter() - start
+
+        clear_assoc_caches()
+        start = time.perf_counter()
+        paragraphs = render_pulsar_paragraphs(query, pulsar_paragraph)
+        render_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        [PARAGRAPH_REWRITER.rewrite(paragraph) for paragraph in paragraphs]
+        stages['postprocess'] = time.perf_counter() - start
+        stages['assembly'] = max(render_time - stages['classify'] - stages['assoc'] - stages['postprocess'], 0.0)
+
+        start = time.perf_counter()
+        with open(os.path.join(cache_dir, 'paragraphs.txt'), 'w') as f:
+            write_paragraphs(zip(query['PSRJ'].tolist(), paragraphs), f)
+        stages['output'] = time.perf_counter() - start
+
+    stages = {stage: stages[stage] for stage in STAGES}
+    total = sum(stages.values())
+    return {
+        'n_pulsars': n_pulsars,
+        'stages': stages,
+        'total': total,
+        'pulsars_per_second': n_pulsars / total,
+    }
+
+
+def run_benchmark(scenarios=None, seed=0, work_dir=None):
+    """Run the benchmark scenarios (names from SCENARIOS, default all of them).
+
+    Returns
+    -------
+    results: dict
+        The "created" time, the "python", "pandas", "numpy" versions and "platform" of the run and the result of each scenario
+        (see run_scenario) keyed by its name.
+    """
+    if scenarios is None:
+        scenarios = list(SCENARIOS)
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'scenarios': {},
+    }
+    for scenario in scenarios:
+        results['scenarios'][scenario] = run_scenario(SCENARIOS[scenario], seed=seed, work_dir=work_dir)
+    return results
+
+
+def format_results(results):
+    """A table of the time of each stage of each scenario."""
+    lines = [f"{'scenario':>8s} " + ' '.join(f"{stage:>11s}" for stage in STAGES) + f" {'total':>9s} {'pulsars/s':>10s}"]
+    for scenario, result in results['scenarios'].items():
+        lines.append(
+            f"{scenario:>8s} " + ' '.join(f"{result['stages'][stage]:11.4f}" for stage in STAGES)
+            + f" {result['total']:9.3f} {result['pulsars_per_second']:10.0f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of rendering pulsar paragraphs on synthetic catalogues.")
+
+    parser.add_argument("-s", "--scenarios", nargs="+", choices=list(SCENARIOS), default=['1k', '10k', '100k'], help="The catalogue sizes to benchmark. Default: %(default)s.")
+    parser.add_argument("-o", "--output_file", help="Save the results as JSON to this file so runs can be compared.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic catalogues. Default: %(default)s.")
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.scenarios, seed=args.seed)
+    print(format_results(results), file=sys.stderr)
+    if args.output_file:
+        with open(args.output_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import warnings
+
+
+# Where catalogue snapshots are stored. Can be overridden with the PULSAR_PARAGRAPH_CACHE environment variable.
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PULSAR_PARAGRAPH_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'pulsar_paragraph'),
+)
+# How long (in seconds) a snapshot is used before checking for a new catalogue, one week.
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+# Metadata file recording the most recent snapshot
+SNAPSHOT_METADATA = 'snapshot.json'
+
+
+def snapshot_path(version, cache_dir=None):
+    """The path of the snapshot directory for an ATNF catalogue version.
+
+    Each column of the catalogue is stored as its own file so that only the columns required need to be read.
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    return os.path.join(cache_dir, f'atnf_catalogue_v{version}')
+
+
+def read_snapshot_index(version, cache_dir=None):
+    """Read the index of the snapshot of an ATNF catalogue version.
+
+    Returns
+    -------
+    index: dict or None
+        The "columns" stored in the snapshot and whether it is the "complete" catalogue, or None if there is no snapshot.
+    """
+    try:
+        with open(os.path.join(snapshot_path(version, cache_dir), 'index.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_snapshot_metadata(cache_dir=None):
+    """Read the metadata of the most recent snapshot.
+
+    Returns
+    -------
+    metadata: dict or None
+        The "version" and "fetched" (unix time) of the most recent snapshot, or None if there is no snapshot.
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    try:
+        with open(os.path.join(cache_dir, SNAPSHOT_METADATA)) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if read_snapshot_index(metadata['version'], cache_dir) is None:
+        return None
+    return metadata
+
+
+def read_snapshot(version, columns=None, cache_dir=None):
+    """Read the snapshot of an ATNF catalogue version.
+
+    Parameters
+    ----------
+    version: str
+        The catalogue version.
+    columns: list, optional
+        Only read these columns. Default: all the columns in the snapshot.
+    cache_dir: str, optional
+        The snapshot directory. Default: DEFAULT_CACHE_DIR.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        The catalogue.
+    """
+    # Imported here as pandas is slow to import and isn't needed when the paragraphs come from a cache
+    import pandas as pd
+
+    path = snapshot_path(version, cache_dir)
+    if columns is None:
+        columns = read_snapshot_index(version, cache_dir)['columns']
+    return pd.DataFrame({column: pd.read_pickle(os.path.join(path, f'{column}.pkl')) for column in columns})
+
+
+def write_snapshot(query, version, cache_dir=None, latest=True, complete=False):
+    """Save a catalogue DataFrame as the snapshot for version and, if latest, mark it as the most recent snapshot.
+
+    complete records that query is the full catalogue rather than only some of its columns.
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    path = snapshot_path(version, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    # Write to temporary files then rename so a concurrent run never reads a partial snapshot
+    for column in query.columns:
+        column_path = os.path.join(path, f'{column}.pkl')
+        query[column].to_pickle(f'{column_path}.tmp')
+        os.replace(f'{column_path}.tmp', column_path)
+    index_path = os.path.join(path, 'index.json')
+    with open(f'{index_path}.tmp', 'w') as f:
+        json.dump({'columns': list(query.columns), 'complete': complete}, f)
+    os.replace(f'{index_path}.tmp', index_path)
+    if not latest:
+        return
+    metadata_path = os.path.join(cache_dir, SNAPSHOT_METADATA)
+    with open(f'{metadata_path}.tmp', 'w') as f:
+        json.dump({'version': version, 'fetched': time.time()}, f)
+    os.replace(f'{metadata_path}.tmp', metadata_path)
+
+
+def fetch_catalogue(version='latest', refresh=False, columns=None):
+    """Download (or load psrqpy's cached copy of) the ATNF catalogue.
+
+    Parameters
+    ----------
+    version: str
+        The catalogue version. Default: "latest".
+    refresh: bool
+        Check for an update of psrqpy's cached copy of the catalogue.
+    columns: list, optional
+        Only request these catalogue parameters (without their errors). Default: all parameters.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        The catalogue.
+    version: str
+        The catalogue version.
+    """
+    # Imported here as psrqpy (and astropy) takes most of a second to import
+    import psrqpy
+
+    atnf_query = psrqpy.QueryATNF(
+        params=None if columns is None else list(columns),
+        include_errs=columns is None,
+        version=version,
+        checkupdate=refresh,
+    )
+    query = atnf_query.pandas
+    if columns is not None:
+        # psrqpy doesn't keep the order of the requested parameters
+        query = query[list(columns)]
+    return query, str(atnf_query.get_version)
+
+
+def has_columns(version, columns, cache_dir=None):
+    """Check the snapshot of version exists and contains all the columns (None meaning the full catalogue)."""
+    index = read_snapshot_index(version, cache_dir)
+    if index is None:
+        return False
+    if columns is None:
+        return index['complete']
+    return set(columns).issubset(index['columns'])
+
+
+def load_catalogue(
+        version=None,
+        columns=None,
+        cache_dir=None,
+        ttl=DEFAULT_CACHE_TTL,
+        refresh=False,
+        offline=False,
+    ):
+    """Load the ATNF catalogue, using a local snapshot when possible.
+
+    Parameters
+    ----------
+    version: str, optional
+        A specific catalogue version to load. Snapshots of a specific version never expire.
+        If None, the most recent snapshot is used until it is older than ttl.
+    columns: list, optional
+        Only request, read and return these catalogue parameters. Default: all parameters.
+    cache_dir: str, optional
+        The snapshot directory. Default: DEFAULT_CACHE_DIR.
+    ttl: float
+        The maximum age of the most recent snapshot in seconds before a new catalogue is fetched.
+    refresh: bool
+        Always fetch the catalogue and update the snapshot.
+    offline: bool
+        Never touch the network. Any existing snapshot is used regardless of its age.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        The catalogue.
+    """
+    if refresh and offline:
+        raise ValueError("Can't refresh the catalogue in offline mode")
+
+    if version is None:
+        metadata = read_snapshot_metadata(cache_dir)
+        if metadata is not None and not refresh and (offline or time.time() - metadata['fetched'] < ttl):
+            if has_columns(metadata['version'], columns, cache_dir):
+                return read_snapshot(metadata['version'], columns, cache_dir)
+    else:
+        if has_columns(version, columns, cache_dir) and not refresh:
+            return read_snapshot(version, columns, cache_dir)
+        metadata = None
+
+    if offline:
+        raise FileNotFoundError(f"No catalogue snapshot with the required columns found in {cache_dir or DEFAULT_CACHE_DIR} and running offline")
+
+    # Keep the columns already in the snapshot so other callers don't need to fetch them again
+    fetch_columns = columns
+    snapshot_version = version if metadata is None else metadata['version']
+    index = None if snapshot_version is None else read_snapshot_index(snapshot_version, cache_dir)
+    if columns is not None and index is not None:
+        if index['complete']:
+            fetch_columns = None
+        else:
+            fetch_columns = list(columns) + [column for column in index['columns'] if column not in columns]
+    try:
+        query, fetched_version = fetch_catalogue(version=version or 'latest', refresh=refresh, columns=fetch_columns)
+    except (IOError, RuntimeError) as e:
+        if metadata is None or not has_columns(metadata['version'], columns, cache_dir):
+            raise
+        # Better to use an old catalogue than fail on an unreliable network
+        warnings.warn(f"Failed to fetch the ATNF catalogue ({e}), using the snapshot of version {metadata['version']}")
+        return read_snapshot(metadata['version'], columns, cache_dir)
+    write_snapshot(query, fetched_version, cache_dir, latest=version is None, complete=fetch_columns is None)
+    if columns is not None:
+        query = query[list(columns)]
+    return query
@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+
+from pulsar_paragraph.load_data import load_distance_overrides, load_links_index
+from pulsar_paragraph.names import normalize_name
+
+
+# Bump when the manifest layout or the way pulsars are hashed changes, which forces a full rebuild
+MANIFEST_FORMAT = 2
+# Bump when the wording of the paragraphs changes for the same gates (e.g. the sentence plan, rewrites or formatting),
+# so the manifest, paragraph cache and store render them again
+RENDER_VERSION = 1
+
+
+def read_manifest(manifest_path):
+    """Read the manifest of a previous incremental run.
+
+    Returns
+    -------
+    manifest: dict or None
+        The "settings" the paragraphs were rendered with and the "pulsars", a dict of the [hash, paragraph, B name or None]
+        of each pulsar keyed by its J name. None if there is no manifest (or it can't be read).
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return None
+    return manifest
+
+
+def write_manifest(manifest_path, settings, pulsars):
+    """Save the manifest of an incremental run, see read_manifest."""
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump({'format': MANIFEST_FORMAT, 'settings': settings, 'pulsars': pulsars}, f)
+    # Rename so an interrupted run never leaves a partial manifest
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+
+def pulsar_hashes(query, extra_columns=(), salt=''):
+    """Hash the catalogue values of each pulsar (row) in query.
+
+    Parameters
+    ----------
+    query: pandas.DataFrame
+        The catalogue columns the paragraphs depend on.
+    extra_columns: list, optional
+        Other per pulsar values (lists the length of query) the paragraphs depend on.
+    salt: str, optional
+        Included in every hash, e.g. a render_fingerprint.
+
+    Returns
+    -------
+    hashes: list
+        The hex digest of each pulsar, in catalogue order.
+    """
+    columns = [query[column].tolist() for column in query.columns] + [list(column) for column in extra_columns]
+    # repr of python floats and strings is stable between versions of python and pandas
+    return [hashlib.blake2b(repr((salt, row)).encode(), digest_size=16).hexdigest() for row in zip(*columns)]
+
+
+def render_fingerprint(pulsar_paragraph, include_links=False):
+    """Hash everything other than the catalogue values that changes the paragraphs.
+
+    That is the RENDER_VERSION, the gates, descriptors and decimal places of every PulsarVariable of pulsar_paragraph,
+    whether links are included and the association distance overrides.
+    """
+    settings = (RENDER_VERSION, pulsar_paragraph.fingerprint(), include_links, sorted(load_distance_overrides().items()))
+    return hashlib.blake2b(repr(settings).encode(), digest_size=16).hexdigest()
+
+
+def paragraph_keys(query, pulsar_paragraph, include_links=False):
+    """The key of each pulsar's paragraph, which changes if anything the paragraph depends on changes.
+
+    Parameters
+    ----------
+    query: pandas.DataFrame
+        The PARAGRAPH_COLUMNS of the pulsars.
+    pulsar_paragraph: PulsarParagraph
+        The variable gates used to describe each pulsar.
+    include_links: bool
+        Whether links are included in the paragraphs.
+
+    Returns
+    -------
+    keys: list
+        The hex digest key of each pulsar, in catalogue order.
+    """
+    extra_columns = []
+    if include_links:
+        # Whether the pulsar has a page changes its paragraph
+        psrs_available = load_links_index()
+        extra_columns.append([psrj in psrs_available for psrj in query['PSRJ'].tolist()])
+    return pulsar_hashes(query, extra_columns, salt=render_fingerprint(pulsar_paragraph, include_links))
+
+
+def diff_manifest(manifest, psrjs, hashes):
+    """Compare the pulsars and their hashes with a previous manifest.
+
+    Returns
+    -------
+    new: list
+        The pulsars not in the manifest.
+    changed: list
+        The pulsars whose hash is different to the manifest.
+    """
+    new = []
+    changed = []
+    for psrj, pulsar_hash in zip(psrjs, hashes):
+        previous = manifest.get(psrj)
+        if previous is None:
+            new.append(psrj)
+        elif previous[0] != pulsar_hash:
+            changed.append(psrj)
+    return new, changed
+
+
+def cached_paragraphs(manifest_path, pulsar_names, fingerprint):
+    """Get the paragraphs of pulsar_names (J or B names) from a manifest without loading the catalogue.
+
+    Parameters
+    ----------
+    manifest_path: str
+        The manifest written by update_pulsar_paragraphs.
+    pulsar_names: list
+        The J or B names of the pulsars.
+    fingerprint: str
+        The render_fingerprint the paragraphs must have been rendered with.
+
+    Returns
+    -------
+    paragraphs: list or None
+        The (PSRJ, paragraph) of each pulsar in the order of the manifest, or None if there is no manifest,
+        it was rendered with different settings or any of the pulsars aren't in it.
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None or manifest['settings'] != {'fingerprint': fingerprint}:
+        return None
+    names = set(normalize_name(name) for name in pulsar_names)
+    paragraphs = []
+    found = set()
+    for psrj, (_, paragraph, psrb) in manifest['pulsars'].items():
+        if psrj in names or psrb in names:
+            paragraphs.append((psrj, paragraph))
+            found.update((psrj, psrb))
+    if not names.issubset(found):
+        return None
+    return paragraphs
@@ -1,4 +1,47 @@
 import os
+import csv
+import functools
+
+import numpy as np
 
 def get_data_path(file_name):
-    return os.path.join(os.path.dirname(__file__), 'data_files', file_name)
\ No newline at end of file
+    return os.path.join(os.path.dirname(__file__), 'data_files', file_name)
+
+
+@functools.lru_cache(maxsize=None)
+def load_distance_overrides():
+    """Load the distances (kpc) used instead of the catalogue distance for associations such as globular clusters.
+
+    Returns
+    -------
+    distance_overrides: dict
+        The distance keyed by the association name as it appears in the ASSOC parameter (e.g. "47Tuc").
+    """
+    with open(get_data_path('globular_cluster_distances.csv'), newline='') as f:
+        return {row['assoc_name']: float(row['distance_kpc']) for row in csv.DictReader(f)}
+
+
+@functools.lru_cache(maxsize=None)
+def load_links_index():
+    """Load the pulsars that have a page on pulsars.org.au (pulsars-links_available.csv) once per process.
+
+    If the precompiled pulsars-links_available.npy (see compile_links_index) is next to the CSV it is loaded
+    instead, which avoids parsing the CSV.
+
+    Returns
+    -------
+    psrs_available: frozenset
+        The J names of the pulsars with a page.
+    """
+    compiled_path = get_data_path('pulsars-links_available.npy')
+    if os.path.isfile(compiled_path):
+        return frozenset(np.load(compiled_path, allow_pickle=False).tolist())
+    with open(get_data_path('pulsars-links_available.csv'), newline='') as f:
+        return frozenset(row[0] for row in csv.reader(f) if row)
+
+
+def compile_links_index():
+    """Write pulsars-links_available.npy from pulsars-links_available.csv. Rerun this whenever the CSV is updated."""
+    with open(get_data_path('pulsars-links_available.csv'), newline='') as f:
+        psrs_available = [row[0] for row in csv.reader(f) if row]
+    np.save(get_data_path('pulsars-links_available.npy'), np.array(psrs_available, dtype=str), allow_pickle=False)
@@ -0,0 +1,165 @@
+import re
+import difflib
+import unicodedata
+
+import numpy as np
+
+
+# Dashes and minus signs that are typed (or copied from documents, e.g. "J0437−4715") for the "-" of a name
+DASHES = dict.fromkeys(map(ord, '\u2010\u2011\u2012\u2013\u2014\u2015\u2212\ufe58\ufe63\uff0d'), '-')
+# The "PSR" in front of a name, e.g. "PSR J0437-4715"
+PSR_PREFIX = re.compile(r'^psr', re.IGNORECASE)
+# Number of names NameIndex.suggest returns
+DEFAULT_SUGGESTIONS = 3
+
+
+def normalize_name(name):
+    """Normalize a pulsar name as it is typed into the form the catalogue uses.
+
+    Unicode dashes and minus signs become "-", whitespace and a leading "PSR" are removed and the J or B is made upper case,
+    e.g. "psr j0437−4715" becomes "J0437-4715". A trailing "*" (a prefix) is kept.
+    """
+    name = ''.join(unicodedata.normalize('NFKC', str(name)).translate(DASHES).split())
+    name = PSR_PREFIX.sub('', name)
+    if name[:1] in ('j', 'b'):
+        name = name[0].upper() + name[1:]
+    return name
+
+
+class NameIndex:
+    """The J names, B names and aliases of a catalogue's pulsars mapped to their row positions, built once per catalogue.
+
+    The aliases are the names without their J or B (e.g. "0531+21"). Names are looked up as they are, then ignoring case.
+    A sorted array of the J and B names is kept for prefix lookups and suggestions of similar names.
+
+    Parameters
+    ----------
+    psrjs: list
+        The J name of each row.
+    psrbs: list
+        The B name of each row, anything but a str (e.g. NaN) or "*" if the pulsar doesn't have one.
+    """
+    def __init__(self, psrjs, psrbs):
+        self.positions = {}
+        # Names that differ only in case are only found by the case they are in the catalogue
+        self.folded_positions = {}
+        ambiguous = set()
+        names = []
+        name_positions = []
+        for position, (psrj, psrb) in enumerate(zip(psrjs, psrbs)):
+            for name in (psrj, psrb):
+                if type(name) != str or name == '*':
+                    continue
+                names.append(name)
+                name_positions.append(position)
+                for key in (name, name[1:]):
+                    self.positions.setdefault(key, position)
+                    folded = key.upper()
+                    if self.folded_positions.setdefault(folded, position) != position:
+                        ambiguous.add(folded)
+        for folded in ambiguous:
+            del self.folded_positions[folded]
+        order = np.argsort(names, kind='stable')
+        self.sorted_names = np.array(names, dtype=str)[order]
+        self.sorted_positions = np.array(name_positions, dtype=np.int64)[order]
+
+    @classmethod
+    def from_query(cls, query):
+        """The NameIndex of a catalogue DataFrame with PSRJ and PSRB columns."""
+        return cls(query['PSRJ'].tolist(), query['PSRB'].tolist())
+
+    def __len__(self):
+        return len(self.sorted_names)
+
+    def lookup(self, name):
+        """The row position of the pulsar with name (a J name, B name or alias, see normalize_name), or None."""
+        key = normalize_name(name)
+        position = self.positions.get(key)
+        if position is None:
+            position = self.folded_positions.get(key.upper())
+        return position
+
+    def prefix(self, prefix):
+        """The row positions of the pulsars with a J or B name starting with prefix (e.g. "J04"), in catalogue order."""
+        prefix = normalize_name(prefix).rstrip('*')
+        start, end = np.searchsorted(self.sorted_names, [prefix, prefix + '\uffff'])
+        return np.unique(self.sorted_positions[start:end])
+
+    def resolve(self, names):
+        """Find many names in one pass of hash lookups.
+
+        Names ending in "*" are prefixes (see prefix).
+
+        Returns
+        -------
+        positions: numpy.ndarray
+            The row positions of the pulsars found, in catalogue order and without repeats.
+        missing: list
+            The names that weren't found.
+        """
+        found = []
+        missing = []
+        for name in names:
+            if name.endswith('*'):
+                positions = self.prefix(name)
+                if len(positions):
+                    found.extend(positions.tolist())
+                else:
+                    missing.append(name)
+                continue
+            position = self.lookup(name)
+            if position is None:
+                missing.append(name)
+            else:
+                found.append(position)
+        return np.unique(np.array(found, dtype=np.int64)), missing
+
+    def suggest(self, name, n=DEFAULT_SUGGESTIONS):
+        """Up to n J or B names similar to name, from the names either side of where it would be in sorted order."""
+        key = normalize_name(name)
+        start = np.searchsorted(self.sorted_names, key)
+        candidates = self.sorted_names[max(start - 2 * n, 0):start + 2 * n].tolist()
+        return difflib.get_close_matches(key, candidates, n=n, cutoff=0.5)
+
+
+class NameMatcher:
+    """Match the pulsars of catalogue chunks against names (see NameIndex.resolve), built once from the names.
+
+    The names found in any chunk are recorded, so the names that aren't in the catalogue are known once every chunk has been matched.
+    Names are matched ignoring case, and names ending in "*" are prefixes of the J and B names.
+
+    Parameters
+    ----------
+    names: list
+        The J names, B names, aliases or prefixes to match.
+    """
+    def __init__(self, names):
+        self.names = list(names)
+        self.keys = {}
+        self.prefixes = []
+        for name in self.names:
+            if name.endswith('*'):
+                self.prefixes.append((normalize_name(name).rstrip('*'), name))
+            else:
+                self.keys.setdefault(normalize_name(name).upper(), []).append(name)
+        self.found = set()
+
+    def match(self, psrjs, psrbs):
+        """The row positions of the pulsars (given by the J and B name of each row) matching any of the names, in order."""
+        positions = []
+        for position, (psrj, psrb) in enumerate(zip(psrjs, psrbs)):
+            matched = []
+            for name in (psrj, psrb):
+                if type(name) != str or name == '*':
+                    continue
+                for key in (name, name[1:]):
+                    matched.extend(self.keys.get(key.upper(), ()))
+                matched.extend(requested for prefix, requested in self.prefixes if name.startswith(prefix))
+            if matched:
+                self.found.update(matched)
+                positions.append(position)
+        return positions
+
+    def missing(self):
+        """The names that haven't been found in any of the rows matched so far."""
+        return [name for name in self.names if name not in self.found]
@@ -0,0 +1,101 @@
+import os
+import time
+import sqlite3
+
+
+# The maximum number of paragraphs kept in the cache before the least recently used are evicted
+DEFAULT_MAX_ENTRIES = 200000
+
+
+class ParagraphCache:
+    """A persistent cache of rendered paragraphs in an SQLite database.
+
+    Paragraphs are keyed by a hash of the catalogue values they were rendered from and of the rendering configuration
+    (see render_fingerprint in pulsar_paragraph.py), so the same cache can be shared between different gate sets.
+    When there are more than max_entries paragraphs the least recently used are evicted.
+    The number of hits and misses of this instance are counted in hits and misses.
+    """
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Wait for other processes writing to the same cache rather than failing
+        self.connection = sqlite3.connect(path, timeout=60)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS paragraphs (key TEXT PRIMARY KEY, paragraph TEXT NOT NULL, last_used INTEGER NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS paragraphs_last_used ON paragraphs (last_used)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM paragraphs').fetchone()[0]
+
+    def _now(self):
+        """The time (ns) paragraphs are marked as used. Always increases so the order of use is kept even if the clock hasn't ticked."""
+        latest = self.connection.execute('SELECT MAX(last_used) FROM paragraphs').fetchone()[0]
+        return max(time.time_ns(), (latest or 0) + 1)
+
+    def get_many(self, keys):
+        """Look up the paragraphs of keys, marking them as recently used.
+
+        Returns
+        -------
+        paragraphs: dict
+            The cached paragraph of each key that is in the cache.
+        """
+        keys = list(dict.fromkeys(keys))
+        paragraphs = {}
+        # Stay below SQLite's limit on the number of parameters of a query
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            paragraphs.update(self.connection.execute(
+                f'SELECT key, paragraph FROM paragraphs WHERE key IN ({placeholders})', batch
+            ).fetchall())
+        if paragraphs:
+            now = self._now()
+            with self.connection:
+                self.connection.executemany(
+                    'UPDATE paragraphs SET last_used = ? WHERE key = ?',
+                    [(now, key) for key in paragraphs],
+                )
+        self.hits += len(paragraphs)
+        self.misses += len(keys) - len(paragraphs)
+        return paragraphs
+
+    def put_many(self, paragraphs):
+        """Add a dict of paragraphs keyed by their cache key, then evict the least recently used paragraphs if the cache is full."""
+        now = self._now()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO paragraphs (key, paragraph, last_used) VALUES (?, ?, ?)',
+                [(key, paragraph, now) for key, paragraph in paragraphs.items()],
+            )
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    'DELETE FROM paragraphs WHERE key IN (SELECT key FROM paragraphs ORDER BY last_used LIMIT ?)',
+                    (excess,),
+                )
+
+    def stats(self):
+        """The hits and misses of this instance, the hit rate and the number of paragraphs in the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self),
+        }
@@ -0,0 +1,285 @@
+import os
+import time
+import queue
+import threading
+import warnings
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from pulsar_paragraph import profiling
+from pulsar_paragraph.catalogue import DEFAULT_CACHE_TTL, load_catalogue
+from pulsar_paragraph.load_data import load_links_index
+from pulsar_paragraph.names import NameMatcher
+from pulsar_paragraph.psrcat_db import iter_psrcat_db
+from pulsar_paragraph.pulsar_classes import PulsarParagraph
+from pulsar_paragraph.pulsar_paragraph import (
+    DEFAULT_CHUNK_SIZE,
+    PARAGRAPH_COLUMNS,
+    derive_quantities,
+    init_render_worker,
+    parse_where,
+    pulsar_records,
+    render_pulsar_paragraphs,
+    render_worker_chunk,
+    where_mask,
+)
+
+
+# The stages of the pipeline, in order
+STAGES = ['load', 'derive', 'render', 'write']
+# Number of chunks each queue between the stages holds before the stage feeding it waits
+DEFAULT_QUEUE_SIZE = 4
+# Number of rows CSVSource reads from the file at a time
+DEFAULT_READ_SIZE = 16384
+# Marks the end of the chunks in a queue
+_DONE = object()
+
+
+class QuerySource:
+    """A catalogue source of an already loaded catalogue DataFrame."""
+    def __init__(self, query):
+        self.query = query
+
+    def chunks(self, columns, chunk_size):
+        query = self.query[columns]
+        for start in range(0, len(query), chunk_size):
+            yield query.iloc[start:start + chunk_size]
+
+
+class SnapshotSource:
+    """A catalogue source of the local snapshot of the ATNF catalogue, fetched with psrqpy if it is missing or stale.
+
+    The snapshot stores each column as a whole (see catalogue.write_snapshot), so the columns are read in full and then
+    passed on in chunks: unlike PsrcatDBSource and CSVSource it isn't streamed, and holds the catalogue in memory for the whole run.
+    The parameters are the same as load_catalogue.
+    """
+    def __init__(self, version=None, cache_dir=None, ttl=DEFAULT_CACHE_TTL, refresh=False, offline=False):
+        self.version = version
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.refresh = refresh
+        self.offline = offline
+
+    def chunks(self, columns, chunk_size):
+        query = load_catalogue(
+            version=self.version,
+            columns=columns,
+            cache_dir=self.cache_dir,
+            ttl=self.ttl,
+            refresh=self.refresh,
+            offline=self.offline,
+        )
+        yield from QuerySource(query).chunks(columns, chunk_size)
+
+
+class PsrcatDBSource:
+    """A catalogue source of a local psrcat.db file, parsed (without psrqpy) a chunk at a time as it is read.
+
+    The pulsars are in the order of the file rather than sorted by J name.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def chunks(self, columns, chunk_size):
+        return iter_psrcat_db(self.path, columns=columns, chunk_size=chunk_size)
+
+
+class CSVSource:
+    """A catalogue source of a CSV file of the catalogue columns (e.g. written with DataFrame.to_csv), read read_size rows at a time.
+
+    It stands in for the ATNF catalogue, e.g. in tests. Missing values can be empty or "*".
+    """
+    def __init__(self, path, read_size=DEFAULT_READ_SIZE):
+        self.path = path
+        self.read_size = read_size
+
+    def chunks(self, columns, chunk_size):
+        # Imported here as pandas is slow to import
+        import pandas as pd
+
+        for block in pd.read_csv(self.path, usecols=columns, chunksize=self.read_size, na_values=['*']):
+            # A block without missing values would have integer columns, the catalogue's numbers are all floats
+            block = block.astype({column: float for column in block.columns if pd.api.types.is_integer_dtype(block[column])})
+            yield from QuerySource(block).chunks(columns, chunk_size)
+
+
+class Pipeline:
+    """Render a catalogue source to a ParagraphWriter with the load, derive, render and write stages each in their own thread.
+
+    The stages are connected by queues of at most queue_size chunks of chunk_size pulsars, so reading and writing
+    overlap with rendering and only a few chunks are held in memory at a time. If a stage fails the other stages
+    are stopped and the exception is raised by run.
+    With jobs > 1 (or 0 for one per CPU) the render stage hands the chunks to a pool of that many processes
+    and the write stage waits for them in order, as rendering is the slowest stage and threads share one CPU.
+    The pulsar_names and where selection (see select_pulsars) are applied to each chunk as it is loaded,
+    and a warning is given for each of the pulsar_names not found in any chunk once the source is exhausted.
+    The time each stage spent working (not waiting for the other stages) is recorded in seconds,
+    and added to the enabled profiler as the pipeline:<stage> stages.
+    """
+    def __init__(
+            self,
+            source,
+            writer,
+            pulsar_paragraph=None,
+            include_links=False,
+            pulsar_names=None,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            queue_size=DEFAULT_QUEUE_SIZE,
+            jobs=1,
+            where=None,
+        ):
+        self.source = source
+        self.writer = writer
+        self.pulsar_paragraph = pulsar_paragraph or PulsarParagraph()
+        self.include_links = include_links
+        self.pulsar_names = None if pulsar_names is None else list(pulsar_names)
+        self.name_matcher = None if pulsar_names is None else NameMatcher(self.pulsar_names)
+        self.where = None if where is None else parse_where(where)
+        self.chunk_size = chunk_size
+        if jobs == 0:
+            jobs = os.cpu_count()
+        self.jobs = jobs
+        # Keep every worker busy with chunks in flight to the write stage
+        self.queues = [queue.Queue(maxsize=queue_size), queue.Queue(maxsize=queue_size), queue.Queue(maxsize=max(queue_size, 2 * jobs))]
+        self.executor = None
+        self.psrs_available = None
+        self.stop = threading.Event()
+        self.errors = []
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        # The number of chunks each stage has handled
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.n_pulsars = 0
+
+    def put(self, output_queue, item):
+        """Put item on a queue, giving up if the pipeline has been stopped while waiting for space."""
+        while not self.stop.is_set():
+            try:
+                output_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, input_queue):
+        """Get the next item from a queue, or _DONE if the pipeline has been stopped."""
+        while not self.stop.is_set():
+            try:
+                return input_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def timed(self, stage, work, *args):
+        start = time.perf_counter()
+        try:
+            return work(*args)
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+
+    def run_stage(self, stage, work, input_queue, output_queue):
+        """Apply work to each chunk from input_queue and pass the results on to output_queue.
+
+        The first stage has no input queue, work is a generator of the chunks.
+        """
+        try:
+            if input_queue is None:
+                chunks = work()
+                work = partial(next, chunks, _DONE)
+            while True:
+                if input_queue is None:
+                    result = self.timed(stage, work)
+                    if result is _DONE:
+                        break
+                else:
+                    chunk = self.get(input_queue)
+                    if chunk is _DONE:
+                        break
+                    result = self.timed(stage, work, chunk)
+                self.calls[stage] += 1
+                if output_queue is not None and not self.put(output_queue, result):
+                    return
+            if output_queue is not None:
+                self.put(output_queue, _DONE)
+        except BaseException as e:
+            self.errors.append(e)
+            self.stop.set()
+
+    def load(self):
+        for chunk in self.source.chunks(PARAGRAPH_COLUMNS, self.chunk_size):
+            if self.name_matcher is not None:
+                chunk = chunk.iloc[self.name_matcher.match(chunk['PSRJ'].tolist(), chunk['PSRB'].tolist())]
+            if self.where is not None:
+                chunk = chunk[where_mask(chunk, self.where)]
+            if len(chunk):
+                yield chunk
+
+    def render(self, chunk):
+        """The chunk and its paragraphs, or a Future of the paragraphs if rendering in a pool."""
+        if self.executor is not None:
+            return chunk, self.executor.submit(render_worker_chunk, chunk)
+        return chunk, render_pulsar_paragraphs(chunk, self.pulsar_paragraph, include_links=self.include_links, psrs_available=self.psrs_available)
+
+    def write(self, rendered):
+        chunk, paragraphs = rendered
+        if isinstance(paragraphs, Future):
+            paragraphs, stats = paragraphs.result()
+            if stats is not None:
+                profiling.enabled_profiler().merge(stats)
+        records = list(pulsar_records(chunk, zip(chunk['PSRJ'].tolist(), paragraphs)))
+        self.writer.write_many(records)
+        self.writer.flush()
+        self.n_pulsars += len(records)
+
+    def run(self):
+        """Run the pipeline until the source is exhausted, then return the number of pulsars written."""
+        if self.jobs > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=init_render_worker,
+                initargs=(self.pulsar_paragraph, self.include_links, profiling.enabled_profiler() is not None),
+            )
+        elif self.include_links:
+            # Loaded once rather than by the first chunk rendered
+            self.psrs_available = load_links_index()
+        works = [self.load, derive_quantities, self.render, self.write]
+        inputs = [None] + self.queues
+        outputs = self.queues + [None]
+        threads = [
+            threading.Thread(target=self.run_stage, args=stage_args, name=f'pulsar_paragraph-{stage_args[0]}', daemon=True)
+            for stage_args in zip(STAGES, works, inputs, outputs)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            # e.g. KeyboardInterrupt while waiting
+            self.stop.set()
+            if self.executor is not None:
+                # Don't render the chunks still queued if a stage failed
+                while not self.queues[-1].empty():
+                    item = self.queues[-1].get()
+                    if item is _DONE:
+                        continue
+                    _, future = item
+                    future.cancel()
+                self.executor.shutdown()
+        if self.errors:
+            raise self.errors[0]
+        if self.name_matcher is not None:
+            for name in self.name_matcher.missing():
+                warnings.warn(f"No pulsar named {name} in the catalogue")
+        profiler = profiling.enabled_profiler()
+        if profiler is not None:
+            for stage, seconds in self.seconds.items():
+                profiler.add(f'pipeline:{stage}', seconds, self.calls[stage])
+        return self.n_pulsars
+
+
+def run_pipeline(source, writer, **kwargs):
+    """Render a catalogue source to a ParagraphWriter with a Pipeline, returning the number of pulsars written.
+
+    The keyword arguments are the same as Pipeline.
+    """
+    return Pipeline(source, writer, **kwargs).run()
@@ -0,0 +1,100 @@
+import json
+import time
+
+
+class Profiler:
+    """Records the cumulative wall time and number of calls of each stage of rendering the paragraphs.
+
+    Stages are timed with the module level stage function while the profiler is enabled (see enable).
+    """
+    def __init__(self):
+        # Stats of each stage, in the order they were first seen
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name, seconds, calls=1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def merge(self, stats):
+        """Add the stats of another profiler (e.g. from a worker process)."""
+        for name, stage_stats in stats.items():
+            self.add(name, stage_stats['seconds'], stage_stats['calls'])
+
+    def stats(self):
+        """The "calls" and "seconds" of each stage."""
+        return {name: {'calls': self.calls[name], 'seconds': self.seconds[name]} for name in self.seconds}
+
+    def to_json(self):
+        return json.dumps(self.stats(), indent=2)
+
+    def format_table(self):
+        lines = [f"{'stage':35s} {'calls':>10s} {'seconds':>10s} {'us/call':>10s}"]
+        for name, stage_stats in self.stats().items():
+            per_call = stage_stats['seconds'] / stage_stats['calls'] * 1e6 if stage_stats['calls'] else 0.0
+            lines.append(f"{name:35s} {stage_stats['calls']:10d} {stage_stats['seconds']:10.4f} {per_call:10.3f}")
+        return '\n'.join(lines)
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'calls', 'start')
+
+    def __init__(self, profiler, name, calls):
+        self.profiler = profiler
+        self.name = name
+        self.calls = calls
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, time.perf_counter() - self.start, self.calls)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+# The enabled Profiler, None when profiling is disabled
+_profiler = None
+
+
+def stage(name, calls=1):
+    """Context manager timing a stage with the enabled Profiler.
+
+    calls is the number of calls the stage counts as, e.g. the number of values a columnar stage converted.
+    When profiling is disabled a shared do-nothing context manager is returned so the hooks cost almost nothing.
+    """
+    if _profiler is None:
+        return _NULL_STAGE
+    return _Stage(_profiler, name, calls)
+
+
+def enable(profiler=None):
+    """Start recording stages with profiler (default a new Profiler), which is returned."""
+    global _profiler
+    if profiler is None:
+        profiler = Profiler()
+    _profiler = profiler
+    return profiler
+
+
+def disable():
+    """Stop recording stages and return the Profiler that was enabled (or None)."""
+    global _profiler
+    profiler = _profiler
+    _profiler = None
+    return profiler
+
+
+def enabled_profiler():
+    return _profiler
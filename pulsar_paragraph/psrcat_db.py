@@ -0,0 +1,310 @@
+import re
+from array import array
+
+import numpy as np
+
+
+# The string parameters of the psrcat.db file that the paragraphs need
+STRING_PARAMETERS = ['PSRJ', 'PSRB', 'DECJ', 'ASSOC', 'SURVEY']
+# The numeric parameters of the psrcat.db file that the paragraphs need, directly or to derive
+# P0, P1, PB, ECC, MINMASS, DIST, VTRANS, AGE and BSURF the same way as psrqpy
+FLOAT_PARAMETERS = [
+    'P0', 'F0', 'P1', 'F1', 'DM', 'S1400', 'DATE', 'PB', 'FB0', 'A1', 'ECC', 'EPS1', 'EPS2',
+    'ELONG', 'ELAT', 'PMRA', 'PMDEC', 'PMELONG', 'PMELAT',
+    'PX', 'DIST_A', 'DIST_AMN', 'DIST_AMX', 'DIST_DM',
+]
+# Parameters whose error column is needed
+ERROR_PARAMETERS = ['PX']
+# The columns read_psrcat_db returns, the same as pulsar_paragraph.PARAGRAPH_COLUMNS
+CATALOGUE_COLUMNS = [
+    'PSRJ', 'PSRB', 'P0', 'P1', 'DM', 'AGE', 'BSURF', 'PB', 'ECC', 'MINMASS',
+    'S1400', 'VTRANS', 'DECJ', 'ASSOC', 'SURVEY', 'DATE', 'DIST',
+]
+# Number of pulsars iter_psrcat_db parses before deriving and yielding them
+DEFAULT_CHUNK_SIZE = 1024
+# Constants used by psrqpy (from psrcat.h and astropy)
+ONEAU = 149597870.0  # km
+ONEPC = 30.857e12  # km
+SPEED_OF_LIGHT = 299792458.0  # m/s
+GM_SUN = 1.3271244e20  # m^3/s^2
+MASS_PSR = 1.35  # solar masses
+# Obliquity of the ecliptic at J2000, to place pulsars with only ecliptic coordinates in a hemisphere
+OBLIQUITY = np.deg2rad(23.4392911)
+# Where an ASSOC value's first association name ends, psrqpy only keeps that
+ASSOC_SPLIT = re.compile(r"\[|,|\(|:")
+EXPONENT_SPLIT = re.compile("e|E|d|D")
+
+
+def parse_float(value):
+    """Parse a psrcat.db value as a float, NaN if it is "*" or isn't a number."""
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def parse_error(value, error):
+    """Convert the error of a psrcat.db value to the same units as the value.
+
+    Errors are in units of the last digit of the value, unless they are negative or have a decimal point.
+    """
+    if error[0] == '-' or '.' in error:
+        return float(error)
+    # The seconds of sexagesimal values
+    mantissa, *exponent = EXPONENT_SPLIT.split(value.split(':')[-1])
+    scale = 10.0 ** -int(exponent[0]) if exponent else 1.0
+    point = mantissa.find('.')
+    if point != -1:
+        scale *= 10 ** (len(mantissa) - point - 1)
+    return float(error) / scale
+
+
+def empty_parameters():
+    """Empty columns of the parameters parse_psrcat_db keeps."""
+    parameters = {parameter: [] for parameter in STRING_PARAMETERS}
+    parameters.update((parameter, array('d')) for parameter in FLOAT_PARAMETERS)
+    parameters.update((f'{parameter}_ERR', array('d')) for parameter in ERROR_PARAMETERS)
+    return parameters
+
+
+def parse_psrcat_db(f, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Parse the text of a psrcat.db file in one pass, generating the parameters of chunk_size pulsars at a time.
+
+    Only the STRING_PARAMETERS, FLOAT_PARAMETERS and the errors of the ERROR_PARAMETERS are kept, every other line is skipped
+    after reading its parameter name.
+
+    Parameters
+    ----------
+    f: file
+        The psrcat.db file, opened as text.
+    chunk_size: int
+        The number of pulsars in each chunk.
+
+    Returns
+    -------
+    chunks: generator of dict
+        Each parameter's values as a list (strings, None if missing) or a float array (NaN if missing).
+    """
+    string_parameters = frozenset(STRING_PARAMETERS)
+    float_parameters = frozenset(FLOAT_PARAMETERS)
+    error_parameters = frozenset(ERROR_PARAMETERS)
+
+    chunk = empty_parameters()
+    n_pulsars = 0
+    pulsar = {}
+    for line in f:
+        if line.startswith(('#', 'WARNING')):
+            continue
+        if line.startswith('@'):
+            # The end of a pulsar
+            for column, values in chunk.items():
+                values.append(pulsar.get(column, None if column in string_parameters else np.nan))
+            pulsar = {}
+            n_pulsars += 1
+            if n_pulsars == chunk_size:
+                yield chunk
+                chunk = empty_parameters()
+                n_pulsars = 0
+            continue
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        parameter = fields[0]
+        if parameter in string_parameters:
+            pulsar[parameter] = fields[1]
+        elif parameter in float_parameters:
+            pulsar[parameter] = parse_float(fields[1])
+            if parameter in error_parameters and len(fields) > 2:
+                try:
+                    pulsar[f'{parameter}_ERR'] = parse_error(fields[1], fields[2])
+                except ValueError:
+                    # A reference rather than an error
+                    pass
+    if n_pulsars:
+        yield chunk
+
+
+def derive_distance(px, px_err, dist_a, dist_amn, dist_amx, dist_dm):
+    """The distance (kpc) psrqpy gives pulsars: the association distance, a parallax distance if it is more than 3 sigma,
+    or the DM distance limited to the association's range.
+    """
+    dist = dist_dm.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        significance = np.where(np.isfinite(px) & np.isfinite(px_err), px / px_err, 0.0)
+    has_dist_a = np.isfinite(dist_a)
+    dist[has_dist_a] = dist_a[has_dist_a]
+    has_px = (significance > 3.0) & ~has_dist_a
+    dist[has_px] = (ONEAU / ONEPC) * (60.0 * 60.0 * 180) / (px[has_px] * np.pi)
+
+    limited = np.isfinite(dist) & ~has_px
+    with np.errstate(invalid='ignore'):
+        outside = ~((dist <= dist_amx) & (dist >= dist_amn))
+        above = outside & limited & (dist >= dist_amx)
+        below = outside & limited & (dist < dist_amx)
+    dist[above] = dist_amx[above]
+    dist[below] = dist_amn[below]
+    midpoint = ~np.isfinite(dist) & ~has_px & np.isfinite(dist_amn) & np.isfinite(dist_amx)
+    dist[midpoint] = 0.5 * (dist_amn[midpoint] + dist_amx[midpoint])
+    return dist
+
+
+def minimum_companion_mass(mass_function):
+    """The companion mass (solar masses) for an edge-on orbit around a MASS_PSR pulsar, NaN where mass_function is.
+
+    Solves (MASS_PSR + m)^2 = m^3 / mass_function for all pulsars at once with Newton's method, starting above the root
+    where the cubic is convex so it converges to the one positive root (psrqpy's search from MASS_PSR gives up on
+    some massive companions).
+    """
+    valid = np.isfinite(mass_function) & (mass_function > 0)
+    mf = mass_function[valid]
+    mass = 2 * mf + 2 * MASS_PSR + 1
+    for _ in range(100):
+        step = ((MASS_PSR + mass) ** 2 - mass ** 3 / mf) / (2 * (MASS_PSR + mass) - 3 * mass ** 2 / mf)
+        mass -= step
+        if np.all(np.abs(step) <= 1e-12 * mass):
+            break
+    minmass = np.full(len(mass_function), np.nan)
+    minmass[valid] = mass
+    return minmass
+
+
+def sexagesimal_declination(degrees):
+    """Format a declination in degrees as a signed "+DD:MM:SS.ss" string, like psrqpy (with up to 8 decimal places)."""
+    sign = '-' if degrees < 0 else '+'
+    arcseconds = round(abs(degrees) * 3600, 8)
+    d, remainder = divmod(arcseconds, 3600)
+    m, s = divmod(remainder, 60)
+    seconds = f"{s:011.8f}".rstrip('0').rstrip('.')
+    return f"{sign}{int(d):02d}:{int(m):02d}:{seconds}"
+
+
+def derive_declination(decj, elong, elat):
+    """The DECJ strings, with decimal declinations made sexagesimal and the declination of pulsars with only
+    ecliptic coordinates worked out from them.
+    """
+    derived = []
+    for dec, lon, lat in zip(decj, elong.tolist(), elat.tolist()):
+        if dec is not None:
+            try:
+                dec = sexagesimal_declination(float(dec))
+            except ValueError:
+                pass
+        elif np.isfinite(lon) and np.isfinite(lat):
+            lon, lat = np.deg2rad(lon), np.deg2rad(lat)
+            sin_dec = np.sin(lat) * np.cos(OBLIQUITY) + np.cos(lat) * np.sin(OBLIQUITY) * np.sin(lon)
+            dec = sexagesimal_declination(np.rad2deg(np.arcsin(sin_dec)))
+        derived.append(dec)
+    return derived
+
+
+def derive_catalogue_columns(parameters):
+    """Build the CATALOGUE_COLUMNS from the parameters of a chunk parsed by parse_psrcat_db.
+
+    The derived values follow psrqpy (QueryATNF): catalogue values are kept and only missing values are derived.
+
+    Returns
+    -------
+    columns: dict
+        Float arrays of the numeric columns and lists of the string columns.
+    """
+    values = {parameter: np.frombuffer(parameters[parameter], dtype=float) for parameter in FLOAT_PARAMETERS}
+    values.update((f'{parameter}_ERR', np.frombuffer(parameters[f'{parameter}_ERR'], dtype=float)) for parameter in ERROR_PARAMETERS)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        p0 = np.where(np.isnan(values['P0']), 1.0 / values['F0'], values['P0'])
+        p1 = np.where(np.isnan(values['P1']), -p0 ** 2 * values['F1'], values['P1'])
+        spinning_down = np.isfinite(p0) & (p1 > 0)
+        age = np.where(spinning_down, p0 / (2 * p1) / (365.25 * 86400.0), np.nan)
+        bsurf = np.where(spinning_down, 3.2e19 * np.sqrt(p0 * p1), np.nan)
+
+        pb = np.where(np.isnan(values['PB']), 1.0 / (values['FB0'] * 86400.0), values['PB'])
+        ecc = np.where(np.isnan(values['ECC']), np.sqrt(values['EPS1'] ** 2 + values['EPS2'] ** 2), values['ECC'])
+        a1 = values['A1'] * SPEED_OF_LIGHT
+        mass_function = 4.0 * np.pi ** 2 / GM_SUN * a1 ** 3 / (pb * 86400.0) ** 2
+        minmass = minimum_companion_mass(mass_function)
+
+        dist = derive_distance(values['PX'], values['PX_ERR'], values['DIST_A'], values['DIST_AMN'], values['DIST_AMX'], values['DIST_DM'])
+        pmra = np.where(np.isnan(values['PMRA']), values['PMELONG'], values['PMRA'])
+        pmdec = np.where(np.isnan(values['PMDEC']), values['PMELAT'], values['PMDEC'])
+        pmtot = np.sqrt(pmra ** 2 + pmdec ** 2)
+        vtrans = pmtot * np.pi / (1000.0 * 3600.0 * 180.0 * 365.25 * 86400.0) * 3.086e16 * dist
+
+    return {
+        'PSRJ': parameters['PSRJ'],
+        'PSRB': parameters['PSRB'],
+        'P0': p0,
+        'P1': p1,
+        'DM': values['DM'],
+        'AGE': age,
+        'BSURF': bsurf,
+        'PB': pb,
+        'ECC': ecc,
+        'MINMASS': minmass,
+        'S1400': values['S1400'],
+        'VTRANS': vtrans,
+        'DECJ': derive_declination(parameters['DECJ'], values['ELONG'], values['ELAT']),
+        'ASSOC': [None if assoc is None else ASSOC_SPLIT.split(assoc)[0] for assoc in parameters['ASSOC']],
+        'SURVEY': parameters['SURVEY'],
+        'DATE': values['DATE'],
+        'DIST': dist,
+    }
+
+
+def catalogue_frame(columns, names=None):
+    """A DataFrame of the derived columns, the same types as psrqpy's (missing strings are NaN)."""
+    # Imported here as pandas is slow to import
+    import pandas as pd
+
+    return pd.DataFrame({
+        column: (np.array([np.nan if value is None else value for value in values], dtype=object) if isinstance(values, list) else values)
+        for column, values in columns.items()
+        if names is None or column in names
+    })
+
+
+def iter_psrcat_db(path, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generate the catalogue in a psrcat.db file as DataFrames of chunk_size pulsars, in file order, as the file is read.
+
+    Parameters
+    ----------
+    path: str
+        The psrcat.db file.
+    columns: list, optional
+        Only these of the CATALOGUE_COLUMNS. Default: all of them.
+    chunk_size: int
+        The number of pulsars in each DataFrame.
+    """
+    with open(path) as f:
+        for parameters in parse_psrcat_db(f, chunk_size):
+            yield catalogue_frame(derive_catalogue_columns(parameters), columns)
+
+
+def read_psrcat_db(path, columns=None):
+    """Read a local ATNF psrcat.db file without psrqpy.
+
+    The file is parsed in a single pass keeping only the parameters the paragraphs need, so it is much faster
+    and smaller than psrqpy.QueryATNF(loadfromdb=path).pandas and needs no network access.
+    The CATALOGUE_COLUMNS are derived the same way as psrqpy, except DATE which is the catalogue's discovery date
+    (psrqpy replaces it with the year of the name's reference).
+
+    Parameters
+    ----------
+    path: str
+        The psrcat.db file.
+    columns: list, optional
+        Only return these of the CATALOGUE_COLUMNS. Default: all of them.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        The catalogue, sorted by J name like psrqpy.
+    """
+    # Imported here as pandas is slow to import
+    import pandas as pd
+
+    chunks = list(iter_psrcat_db(path, columns))
+    if not chunks:
+        return catalogue_frame(derive_catalogue_columns(empty_parameters()), columns)
+    query = pd.concat(chunks, ignore_index=True)
+    if 'PSRJ' in query.columns:
+        query = query.sort_values('PSRJ', kind='stable', ignore_index=True)
+    return query
@@ -1,3 +1,7 @@
+import sys
+import functools
+from collections import namedtuple
+
 import numpy as np
 
 
@@ -35,7 +39,24 @@ def get_conversion_factor(metric_prefix):
         raise ValueError("Invalid metric prefix")
 
 
+class Section(namedtuple('Section', ['descriptor', 'value', 'unit'])):
+    """The structured result of describing one value, e.g. Section("a fairly young pulsar with an estimated age of", "1256.784", "yr").
+
+    The value is formatted to the variable's decimal places and the unit includes the gate's metric prefix ("" if it has none).
+    A value that is missing or doesn't pass into any gate has no section (None).
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.unit:
+            return f"{self.descriptor} {self.value} {self.unit}"
+        # No unit so no dangling space
+        return f"{self.descriptor} {self.value}"
+
+
 class VariableGate:
+    __slots__ = ('name', 'lower_bound', 'upper_bound', 'descriptor', 'metric_prefix')
+
     def __init__(
             self,
             name,
@@ -50,15 +71,126 @@ class VariableGate:
         # The maximum value that something can be to pass into specific gate.
         self.upper_bound = upper_bound
         # The descriptor usually containing adjectives, e.g "an extremely young pulsar with a"
-        self.descriptor = descriptor
+        self.descriptor = sys.intern(descriptor)
         # The metric prefix. Used to convert to the new units (e.g. G then divide by 1e9)
         self.metric_prefix = metric_prefix
 
+    def _key(self):
+        return (self.name, self.lower_bound, self.upper_bound, self.descriptor, self.metric_prefix)
+
+    def __eq__(self, other):
+        return isinstance(other, VariableGate) and self._key() == other._key()
+
+    def __hash__(self):
+        # Gates are compared by value so equal gate lists share one compiled GateTable
+        return hash(self._key())
+
     def display(self):
         print(f"{format_float(self.lower_bound):8s} > {self.name:7s} > {format_float(self.upper_bound):8s} {self.descriptor:55s} unit: {self.metric_prefix}{self.unit:12s}")
 
 
+class GateTable:
+    """A list of VariableGates compiled into immutable arrays for classifying whole columns of values.
+
+    The gates are sorted by lower bound, with the conversion factor of each gate's metric prefix and its
+    descriptor and unit strings resolved once, so classification is a binary search of the lower bounds.
+    Build with compile_gate_table, which shares the table between variables with the same gates.
+    """
+    __slots__ = ('gates', 'order', 'lower', 'upper', 'conversion_factors', 'descriptors', 'units', 'unit_suffixes', 'overlapping')
+
+    def __init__(self, gates, unit):
+        self.gates = tuple(gates)
+        lower = np.array([gate.lower_bound for gate in self.gates], dtype=float)
+        upper = np.array([gate.upper_bound for gate in self.gates], dtype=float)
+        self.order = np.argsort(lower, kind="stable")
+        self.lower = lower[self.order]
+        self.upper = upper[self.order]
+        self.overlapping = bool(np.any(self.lower[1:] < self.upper[:-1]))
+        # The extra factor is for values that don't pass into any gate (index -1)
+        self.conversion_factors = np.array([get_conversion_factor(gate.metric_prefix) for gate in self.gates] + [1.0])
+        self.descriptors = tuple(gate.descriptor for gate in self.gates)
+        self.units = tuple(sys.intern(f"{gate.metric_prefix}{unit}") for gate in self.gates)
+        # No unit so no dangling space
+        self.unit_suffixes = tuple(f" {unit}" if unit else "" for unit in self.units)
+        for array in (self.order, self.lower, self.upper, self.conversion_factors):
+            array.flags.writeable = False
+
+    def gaps(self):
+        """The (upper bound, next lower bound) of each hole between consecutive gates that no value passes into."""
+        return [
+            (upper, lower)
+            for upper, lower in zip(self.upper[:-1].tolist(), self.lower[1:].tolist())
+            if lower > upper
+        ]
+
+    def validate(self, name):
+        """Raise a ValueError if the gates of the variable called name overlap or leave gaps between them."""
+        if self.overlapping:
+            raise ValueError(f"The gates of {name} overlap")
+        gaps = self.gaps()
+        if gaps:
+            raise ValueError(f"The gates of {name} leave gaps between {', '.join(f'{upper} and {lower}' for upper, lower in gaps)}")
+
+    def classify(self, values):
+        """The index into gates of the gate each float value passes into, or -1 if none.
+
+        If gates overlap (e.g. from add_gate) the first gate in the list wins.
+        """
+        values = np.asarray(values, dtype=float)
+        gate_indices = np.full(values.shape, -1, dtype=int)
+        if not self.gates:
+            return gate_indices
+        if not self.overlapping:
+            # Binary search for the last gate with a lower bound <= value
+            position = np.searchsorted(self.lower, values, side="right") - 1
+            clipped = np.clip(position, 0, None)
+            hit = (position >= 0) & (values < self.upper[clipped])
+            gate_indices[hit] = self.order[clipped[hit]]
+        else:
+            for gate_index in reversed(range(len(self.gates))):
+                gate = self.gates[gate_index]
+                gate_indices[(gate.lower_bound <= values) & (values < gate.upper_bound)] = gate_index
+        return gate_indices
+
+
+class SectionColumn:
+    """The Sections of a whole column of values (see PulsarVariable.variable_values_to_sections).
+
+    They are kept as columns rather than a Section object per value: the index of the gate and the formatted value
+    of each value, and the text of each Section (None if absent) for building paragraphs.
+    Indexing gives the Section of one value, or None.
+    """
+    __slots__ = ('table', 'gate_indices', 'values', 'texts')
+
+    def __init__(self, table, gate_indices, values, texts):
+        self.table = table
+        self.gate_indices = gate_indices
+        self.values = values
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, i):
+        gate_index = int(self.gate_indices[i])
+        if gate_index < 0:
+            return None
+        return Section(self.table.descriptors[gate_index], self.values[i], self.table.units[gate_index])
+
+
+@functools.lru_cache(maxsize=256)
+def compile_gate_table(gates, unit):
+    """The GateTable of a tuple of VariableGates, cached so every PulsarVariable with the same gates shares one table.
+
+    Only the default gates are checked for overlaps and gaps (see build_default_gates). Gates added with add_gate often
+    overlap the open ended default gates on purpose, as the first gate in the list wins; use PulsarVariable.validate to check them.
+    """
+    return GateTable(gates, unit)
+
+
 class PulsarVariable:
+    __slots__ = ('name', 'unit', 'decimal_places', 'gates')
+
     def __init__(
             self,
             name,
@@ -81,23 +213,110 @@ class PulsarVariable:
         for gate in self.gates:
             gate.display()
 
+    @property
+    def table(self):
+        """The GateTable of the current gates, only compiled again when the gates change."""
+        return compile_gate_table(tuple(self.gates), self.unit)
+
+    def validate(self):
+        """Raise a ValueError if the current gates overlap or leave gaps between them, like the default gates are checked."""
+        self.table.validate(self.name)
+
+    def fingerprint(self):
+        """Everything about this variable that changes how its values are described."""
+        return (
+            self.name,
+            self.unit,
+            self.decimal_places,
+            tuple((gate.name, gate.lower_bound, gate.upper_bound, gate.descriptor, gate.metric_prefix) for gate in self.gates),
+        )
+
     def variable_value_to_str(self,  value: str) -> str:
         if value == "*":
             return None
         if self.name == "s1400":
             # Convert value from mJy to Jy so metric prefixes are handled correctly
             value = float(value) / 1000.0
-        for variable_gate in self.gates:
-            if variable_gate.lower_bound <= float(value) < variable_gate.upper_bound:
-                # Convert to metric prefix units (e.g. G then divide by 1e9)
-                converted_value = float(value) / get_conversion_factor(variable_gate.metric_prefix)
-                output_str = f"{variable_gate.descriptor} { format_float(converted_value, decimal_places=self.decimal_places) }"
-                if f"{variable_gate.metric_prefix}{self.unit}" == "":
-                    # No unit so return without a dangling space
-                    return output_str
-                else:
-                    return f"{output_str} {variable_gate.metric_prefix}{self.unit}"
+        table = self.table
+        gate_index = int(table.classify(float(value)))
+        if gate_index < 0:
+            return None
+        # Convert to metric prefix units (e.g. G then divide by 1e9)
+        converted_value = float(value) / table.conversion_factors[gate_index]
+        return str(Section(
+            table.descriptors[gate_index],
+            format_float(converted_value, decimal_places=self.decimal_places),
+            table.units[gate_index],
+        ))
+
+    def gate_indices(self, values):
+        """Find the index of the gate each value falls into.
+
+        Parameters
+        ----------
+        values: array_like
+            Float values in the units of the gates.
 
+        Returns
+        -------
+        gate_indices: np.ndarray
+            The index into self.gates for each value or -1 if no gate matched.
+        """
+        return self.table.classify(values)
+
+    def variable_values_to_str(self, values) -> list:
+        """Vectorised version of variable_value_to_str for a whole column of values.
+
+        Parameters
+        ----------
+        values: array_like
+            A NumPy array, pandas Series or list of catalogue values. Missing values can be NaN or "*".
+
+        Returns
+        -------
+        descriptors: list
+            The descriptor string for each value, or None if it is missing or did not pass into any gate.
+        """
+        return self.variable_values_to_sections(values).texts
+
+    def variable_values_to_sections(self, values):
+        """Like variable_values_to_str but the descriptor, value and unit of each value are kept apart.
+
+        Returns
+        -------
+        sections: SectionColumn
+            The Section of each value, None if it is missing or did not pass into any gate.
+        """
+        values = values_to_float_array(values)
+        if self.name == "s1400":
+            # Convert value from mJy to Jy so metric prefixes are handled correctly
+            values = values / 1000.0
+        table = self.table
+        gate_indices = table.classify(values)
+        hit = gate_indices >= 0
+        # Convert to metric prefix units (e.g. G then divide by 1e9)
+        converted_values = values / table.conversion_factors[gate_indices]
+        descriptors = table.descriptors
+        unit_suffixes = table.unit_suffixes
+
+        value_strs = [None] * len(values)
+        output_strs = [None] * len(values)
+        for i, gate_index, converted_value in zip(
+                np.flatnonzero(hit).tolist(),
+                gate_indices[hit].tolist(),
+                converted_values[hit].tolist(),
+            ):
+            value_str = value_strs[i] = format_float(converted_value, decimal_places=self.decimal_places)
+            output_strs[i] = f"{descriptors[gate_index]} {value_str}{unit_suffixes[gate_index]}"
+        return SectionColumn(table, gate_indices, value_strs, output_strs)
+
+
+def values_to_float_array(values):
+    """Convert a column of catalogue values to a float array, with "*" becoming NaN."""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([np.nan if value == "*" else float(value) for value in values], dtype=float)
 
 
 class PulsarParagraph:
@@ -149,6 +368,15 @@ class PulsarParagraph:
         )
 
 
+    def fingerprint(self):
+        """The fingerprint of every PulsarVariable, which changes whenever a gate is added or altered."""
+        return tuple(
+            variable.fingerprint()
+            for _, variable in sorted(vars(self).items())
+            if isinstance(variable, PulsarVariable)
+        )
+
+
     def p1_to_str(self, p1, psr_name):
         """Function that reads in p1 directly from file and output a string. Has 3 outcomes depending if p1 is +, -, or 0.
         """
@@ -184,111 +412,171 @@ class PulsarParagraph:
 
     def assoc_to_str(self, assoc: int):
         """Converts assoc str to descriptor. Does not have a law because data-type is unique.
-        Breaks the data into lists, then converts data to str depending on data-type. Then, appended to a final str.
+        The rendering of each distinct ASSOC string is cached (see render_assoc).
         Does not work for every case, which is why there are some .replace methods at the bottom of file.
         Final output is of truncated type, aka one/two sentence descriptor max.
         """
-        assoc_dict = {
-            "EXGAL": "an extragalactic pulsar",
-            "SMC": " located in the Small Magellanic Cloud.",
-            "XRS": "an associated x-ray source",
-            "GRS": "an associated gamma-ray source",
-            "SNR": "a supernova remnant",
-            "GC": "located in the globular cluster",
-            "PWN": " located in the pulsar wind nebula",
-            "LMC": " located in the Large Magellanic Cloud.",
-            "OPT": "the optical counterpart",
-        }
-        assoc = str(assoc).strip()
-        assoc_str_final = ''
-        assoc_str = ''
-        assoc_str_temp = ''
-        assoc_str_temp2 = ''
-        assoc_str2 = ''
-        count = 0
-        count2 = 0
-        exgal_flag = False
-        if '*' not in assoc:
-            if ',' in assoc:
-                assoc_split = assoc.split(',')
-                for comma_split in assoc_split:
-                    count += 1
-                    if ':' in comma_split:
-                        colon_split = comma_split.split(':')
-                        for item in colon_split:
-                            item = str(item).strip()
-                            if item in assoc_dict and exgal_flag == True:
-                                assoc_str_temp += assoc_dict[item]
-                            elif item in assoc_dict and 'EXGAL' == item:
-                                assoc_str_temp = assoc_dict[item]
-                                exgal_flag = True
-                            elif item in assoc_dict:
-                                if count < len(assoc_split) and count != 1:
-                                    assoc_str_temp += ' and '
-                                if 'with' in assoc_str_temp or 'and' in assoc_str_temp:
-                                    assoc_str_temp = assoc_dict[item]
-                                else:
-                                    assoc_str_temp += assoc_dict[item]
-                            elif item not in assoc_dict and '[' in item and len(item) > 9:
-                                bracket = item.index('[')
-                                new_item = item[:bracket]
-                                assoc_str_temp += ' ' + '(' + str(new_item) + ')'
-                                if count < len(assoc_split)-1:
-                                    assoc_str_temp += ', '
-                                elif count < len(assoc_split):
-                                    assoc_str_temp += ' and '
-                                else:
-                                    assoc_str_temp += '.'
-                            elif item not in assoc_dict and '[' in item:
-                                assoc_str_temp = assoc_str_temp.replace('the', 'an')
-                                if count < len(assoc_split)-1:
-                                    assoc_str_temp += ', '
-                                elif count < len(assoc_split):
-                                    assoc_str_temp += ' and '
-                                else:
-                                    assoc_str_temp += '.'
-                            elif item not in assoc_dict:
-                                if count < len(colon_split):
-                                    assoc_str_temp += ' with'
-                                assoc_str_temp += ' ' + '(' + str(item) + ')'
-                                if count == len(assoc_split):
-                                    assoc_str_temp += '.'
-                            assoc_str = assoc_str_temp
-                    assoc_str_final += assoc_str
-            elif ':' in assoc:
-                colon_split2 = assoc.split(':')
-                for item in colon_split2:
-                    count2 += 1
-                    item = str(item).strip()
-                    if item in assoc_dict and exgal_flag == True:
-                        assoc_str_temp2 += assoc_dict[item]
-                    elif item in assoc_dict and 'EXGAL' == item:
-                        assoc_str_temp2 = assoc_dict[item]
+        return render_assoc(str(assoc).strip())
+
+    def assoc_section(self, assoc):
+        """Like assoc_to_str but returns an AssocSection, or None if the pulsar has no associations."""
+        return render_assoc_section(str(assoc).strip())
+
+
+ASSOC_DESCRIPTORS = {
+    "EXGAL": "an extragalactic pulsar",
+    "SMC": " located in the Small Magellanic Cloud.",
+    "XRS": "an associated x-ray source",
+    "GRS": "an associated gamma-ray source",
+    "SNR": "a supernova remnant",
+    "GC": "located in the globular cluster",
+    "PWN": " located in the pulsar wind nebula",
+    "LMC": " located in the Large Magellanic Cloud.",
+    "OPT": "the optical counterpart",
+}
+
+# A single association from the ATNF ASSOC parameter, e.g. "GC:47Tuc[mlr+91]" is AssocRecord("GC", "47Tuc", "mlr+91").
+# An association that is only a type (e.g. "GC") has a name and reference of None.
+AssocRecord = namedtuple('AssocRecord', ['type', 'name', 'reference'])
+# The rendered associations of a pulsar (see render_assoc) and how they join onto the hemisphere sentence:
+# extragalactic descriptions are their own sentence, and continues is True if the text carries on the sentence by itself
+# rather than after "with".
+AssocSection = namedtuple('AssocSection', ['text', 'extragalactic', 'continues'])
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_assoc(assoc: str):
+    """Parse an ATNF ASSOC string into its comma separated associations, each a tuple of an AssocRecord per name.
+
+    e.g. "GC:47Tuc[mlr+91],XRS" is ((AssocRecord("GC", "47Tuc", "mlr+91"),), (AssocRecord("XRS", None, None),)).
+    The records are cached by the raw string and shared by everything that uses the associations (rendering and
+    the distance overrides). Returns None if the ASSOC is missing ("*").
+    """
+    if '*' in assoc:
+        return None
+    associations = []
+    for association in assoc.split(','):
+        assoc_type, *names = (item.strip() for item in association.split(':'))
+        records = []
+        for name in names:
+            name, bracket, reference = name.partition('[')
+            if bracket:
+                reference = (reference[:-1] if reference.endswith(']') else reference).strip()
+            else:
+                reference = None
+            records.append(AssocRecord(assoc_type, name.strip(), reference))
+        associations.append(tuple(records) or (AssocRecord(assoc_type, None, None),))
+    return tuple(associations)
+
+
+def assoc_items(records):
+    """The (text, reference) items of an association that render_assoc describes in turn: its type, then each name."""
+    return [(records[0].type, None)] + [(record.name, record.reference) for record in records if record.name is not None]
+
+
+@functools.lru_cache(maxsize=8192)
+def render_assoc(assoc: str):
+    """Converts the AssocRecords of an ASSOC string (see parse_assoc) into the descriptor used by PulsarParagraph.assoc_to_str.
+    Then, appended to a final str depending on the data-type of each item (see assoc_items): a type, a name or a name
+    with a reference, which is only shown if the name and its "[reference]" are longer than 9 characters.
+    """
+    associations = parse_assoc(assoc)
+    if associations is None:
+        return None
+    associations = [assoc_items(records) for records in associations]
+    assoc_str_final = ''
+    assoc_str = ''
+    assoc_str_temp = ''
+    assoc_str_temp2 = ''
+    assoc_str2 = ''
+    exgal_flag = False
+    if len(associations) > 1:
+        for count, colon_split in enumerate(associations, start=1):
+            if len(colon_split) > 1:
+                for item, reference in colon_split:
+                    described = reference is None and item in ASSOC_DESCRIPTORS
+                    if described and exgal_flag == True:
+                        assoc_str_temp += ASSOC_DESCRIPTORS[item]
+                    elif described and 'EXGAL' == item:
+                        assoc_str_temp = ASSOC_DESCRIPTORS[item]
                         exgal_flag = True
-                    elif item in assoc_dict:
-                        assoc_str_temp2 = ' and has ' + assoc_dict[item]
-                    elif item not in assoc_dict and '[' in item and len(item) > 9:
-                        bracket = item.index('[')
-                        new_item = item[:bracket]
-                        assoc_str_temp2 += ' ' + '(' + str(new_item) + ')'
-                        if count2 < len(colon_split2):
-                            assoc_str_temp2 += ' and has '
+                    elif described:
+                        if count < len(associations) and count != 1:
+                            assoc_str_temp += ' and '
+                        if 'with' in assoc_str_temp or 'and' in assoc_str_temp:
+                            assoc_str_temp = ASSOC_DESCRIPTORS[item]
                         else:
-                            assoc_str_temp2 += '. '
-                    elif item not in assoc_dict and '[' in item:
-                        assoc_str_temp2 = assoc_str_temp2.replace('the', 'an')
-                    elif item not in assoc_dict:
-                        assoc_str_temp2 += ' ' + str(item)
-                        if count2 < len(colon_split2):
-                            assoc_str_temp2 += 'and has '
+                            assoc_str_temp += ASSOC_DESCRIPTORS[item]
+                    elif reference is not None and len(item) + len(reference) + 2 > 9:
+                        assoc_str_temp += ' ' + '(' + item + ')'
+                        if count < len(associations)-1:
+                            assoc_str_temp += ', '
+                        elif count < len(associations):
+                            assoc_str_temp += ' and '
                         else:
-                            assoc_str_temp2 += '. '
-                assoc_str2 = assoc_str_temp2
-            assoc_str_final += assoc_str2
-            return assoc_str_final
+                            assoc_str_temp += '.'
+                    elif reference is not None:
+                        assoc_str_temp = assoc_str_temp.replace('the', 'an')
+                        if count < len(associations)-1:
+                            assoc_str_temp += ', '
+                        elif count < len(associations):
+                            assoc_str_temp += ' and '
+                        else:
+                            assoc_str_temp += '.'
+                    else:
+                        if count < len(colon_split):
+                            assoc_str_temp += ' with'
+                        assoc_str_temp += ' ' + '(' + str(item) + ')'
+                        if count == len(associations):
+                            assoc_str_temp += '.'
+                    assoc_str = assoc_str_temp
+            assoc_str_final += assoc_str
+    elif len(associations[0]) > 1:
+        colon_split2 = associations[0]
+        for count2, (item, reference) in enumerate(colon_split2, start=1):
+            described = reference is None and item in ASSOC_DESCRIPTORS
+            if described and exgal_flag == True:
+                assoc_str_temp2 += ASSOC_DESCRIPTORS[item]
+            elif described and 'EXGAL' == item:
+                assoc_str_temp2 = ASSOC_DESCRIPTORS[item]
+                exgal_flag = True
+            elif described:
+                assoc_str_temp2 = ' and has ' + ASSOC_DESCRIPTORS[item]
+            elif reference is not None and len(item) + len(reference) + 2 > 9:
+                assoc_str_temp2 += ' ' + '(' + item + ')'
+                if count2 < len(colon_split2):
+                    assoc_str_temp2 += ' and has '
+                else:
+                    assoc_str_temp2 += '. '
+            elif reference is not None:
+                assoc_str_temp2 = assoc_str_temp2.replace('the', 'an')
+            else:
+                assoc_str_temp2 += ' ' + item
+                if count2 < len(colon_split2):
+                    assoc_str_temp2 += 'and has '
+                else:
+                    assoc_str_temp2 += '. '
+        assoc_str2 = assoc_str_temp2
+    assoc_str_final += assoc_str2
+    return assoc_str_final
+
+
+@functools.lru_cache(maxsize=8192)
+def render_assoc_section(assoc: str):
+    """The AssocSection of an ASSOC string, worked out once per distinct string."""
+    text = render_assoc(assoc)
+    if text is None:
+        return None
+    return AssocSection(text, 'extragalactic' in text, '47Tuc' in text or 'and has' in text)
 
 
 def gate_default(variable_name):
+    """A new list of the default gates of variable_name. The gates themselves are shared, see DEFAULT_GATES."""
+    return list(DEFAULT_GATES[variable_name])
+
+
+def build_default_gates():
+    """The default gates of each variable, checked for overlaps and gaps."""
     gate_defaults = {
         "age" : [
             VariableGate(
@@ -593,7 +881,7 @@ def gate_default(variable_name):
             VariableGate(
                 name="period",
                 lower_bound=0.1,
-                upper_bound=0.999,
+                upper_bound=1.0,
                 descriptor="a normal pulsar with a period of",
                 metric_prefix="milli",
             ),
@@ -726,4 +1014,10 @@ def gate_default(variable_name):
             ),
         ]
     }
-    return gate_defaults[variable_name]
\ No newline at end of file
+    for name, gates in gate_defaults.items():
+        GateTable(gates, "").validate(name)
+    return {name: tuple(gates) for name, gates in gate_defaults.items()}
+
+
+# Built once, so constructing a PulsarParagraph only copies these lists and its GateTables are shared
+DEFAULT_GATES = build_default_gates()
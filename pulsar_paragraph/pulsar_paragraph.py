@@ -1,13 +1,28 @@
 # @author: Evan Anthopoulos
 # Version of Pulsar Paragraph program that has output in WIKI format rather than html for upload onto https://pulsars.org.au
 
-import psrqpy
 import numpy as np
-import pandas as pd
 import argparse
+import os
+import sys
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-from pulsar_paragraph.load_data import get_data_path
-from pulsar_paragraph.pulsar_classes import PulsarParagraph
+from pulsar_paragraph.catalogue import DEFAULT_CACHE_TTL, load_catalogue
+from pulsar_paragraph.incremental import cached_paragraphs, diff_manifest, paragraph_keys, read_manifest, render_fingerprint, write_manifest
+from pulsar_paragraph.load_data import load_distance_overrides, load_links_index
+from pulsar_paragraph.names import NameIndex
+from pulsar_paragraph.paragraph_cache import DEFAULT_MAX_ENTRIES, ParagraphCache
+from pulsar_paragraph import profiling
+from pulsar_paragraph.psrcat_db import read_psrcat_db
+from pulsar_paragraph.pulsar_classes import PulsarParagraph, parse_assoc, values_to_float_array
+from pulsar_paragraph.rewrite import PARAGRAPH_REWRITER
+from pulsar_paragraph.selection import Selection
+from pulsar_paragraph.sentence_plan import SENTENCE_PLAN
+from pulsar_paragraph.store import ParagraphStore, stored_paragraphs
+from pulsar_paragraph.writers import WRITERS, infer_format, open_writer
 
 
 SURVEY_CODES = {
@@ -63,6 +78,16 @@ SURVEY_CODES = {
     "tulipp": "the LOFAR Targetted Search for Polarized Pulsars",
 }
 
+# The catalogue parameters used to build the paragraphs, only these are requested from the catalogue
+PARAGRAPH_COLUMNS = [
+    'PSRJ', 'PSRB', 'P0', 'P1', 'DM', 'AGE', 'BSURF', 'PB', 'ECC', 'MINMASS',
+    'S1400', 'VTRANS', 'DECJ', 'ASSOC', 'SURVEY', 'DATE', 'DIST',
+]
+# Number of pulsars rendered at a time by iter_pulsar_paragraphs
+DEFAULT_CHUNK_SIZE = 256
+# Columns added to the catalogue by derive_quantities
+DERIVED_COLUMNS = ['P1_CORR', 'AGE_CORR', 'BSURF_CORR']
+
 def is_atnf_value(value):
     """Check if value is a valid ATNF value.
 
@@ -107,340 +132,822 @@ def shklovski_pdot_correction(pdot, p, dist, vtrans):
     return pdot - p * vtrans_ms**2 / ( dist_m * c )
 
 
+def derive_quantities(query):
+    """Add the Shklovski corrected period derivative, characteristic age and surface magnetic field to the catalogue.
+
+    All pulsars are computed at once with NumPy. Pulsars missing any of P0, P1, DIST or VTRANS
+    can't be corrected so keep their catalogue P1, AGE and BSURF.
+
+    Parameters
+    ----------
+    query: pandas.DataFrame
+        The ATNF catalogue with at least the P0, P1, DIST, VTRANS, AGE and BSURF columns.
+
+    Returns
+    -------
+    query: pandas.DataFrame
+        A copy of query with the P1_CORR, AGE_CORR and BSURF_CORR columns added.
+    """
+    p0     = values_to_float_array(query['P0'])
+    p1     = values_to_float_array(query['P1'])
+    dist   = values_to_float_array(query['DIST'])
+    vtrans = values_to_float_array(query['VTRANS'])
+    # Values available for Shklovski correction
+    correctable = ~(np.isnan(p0) | np.isnan(p1) | np.isnan(dist) | np.isnan(vtrans))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pdot  = shklovski_pdot_correction(p1, p0, dist, vtrans)
+        age   = p0 / ( 2 * pdot ) * 3.1688087814029e-8 # convert to years
+        bsurf = 3.2e19 * np.sqrt( p0 * pdot )
+    return query.assign(
+        P1_CORR    = np.where(correctable, pdot,  p1),
+        AGE_CORR   = np.where(correctable, age,   values_to_float_array(query['AGE'])),
+        BSURF_CORR = np.where(correctable, bsurf, values_to_float_array(query['BSURF'])),
+    )
+
+
+def select_pulsars(
+        pulsar_names=None,
+        query=None,
+        refresh=False,
+        offline=False,
+        cache_dir=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        where=None,
+    ):
+    """Get the PARAGRAPH_COLUMNS of the catalogue for the pulsars in pulsar_names (default all pulsars).
+
+    The names are found with a NameIndex of the catalogue, so they can be J or B names in any case, with Unicode minus signs,
+    or prefixes ending in "*" (e.g. "J04*"). A warning suggesting similar names is given for each name that isn't found.
+    where is a selection expression (see selection.Selection), e.g. "P0 < 0.03 and PB > 0 and DECJ < 0", over the
+    PARAGRAPH_COLUMNS and DERIVED_COLUMNS. It is evaluated once over the whole catalogue, after the pulsar_names are found.
+
+    If no query is given the catalogue is loaded from the local snapshot cache (see load_catalogue),
+    which is only refreshed from the ATNF when it is older than cache_ttl seconds or refresh is True.
+    query can also be the path of a local psrcat.db file, which is read without psrqpy (see read_psrcat_db).
+    """
+    if isinstance(query, (str, os.PathLike)):
+        with profiling.stage('catalogue_load'):
+            query = read_psrcat_db(query, columns=PARAGRAPH_COLUMNS)
+    elif query is None:
+        with profiling.stage('catalogue_load'):
+            query = load_catalogue(
+                columns=PARAGRAPH_COLUMNS,
+                cache_dir=cache_dir,
+                ttl=cache_ttl,
+                refresh=refresh,
+                offline=offline,
+            )
+    if pulsar_names is not None:
+        # Filter our query to only include pulsars in pulsar_names
+        name_index = NameIndex.from_query(query)
+        positions, missing = name_index.resolve(pulsar_names)
+        for name in missing:
+            suggestions = name_index.suggest(name)
+            warnings.warn(f"No pulsar named {name} in the catalogue" + (f", did you mean {' or '.join(suggestions)}?" if suggestions else ''))
+        query = query.iloc[positions]
+    if where is not None:
+        with profiling.stage('select'):
+            query = query[where_mask(query, parse_where(where))]
+    # Only hold on to the columns we need
+    return query[PARAGRAPH_COLUMNS]
+
+
+def parse_where(where):
+    """The Selection (see selection.Selection) of a where expression over the PARAGRAPH_COLUMNS and DERIVED_COLUMNS."""
+    if isinstance(where, Selection):
+        return where
+    return Selection(where, PARAGRAPH_COLUMNS + DERIVED_COLUMNS)
+
+
+def where_mask(query, selection):
+    """The boolean mask of the pulsars in query selected by a Selection, only deriving quantities if it uses them."""
+    if selection.columns & set(DERIVED_COLUMNS):
+        query = derive_quantities(query)
+    return selection.mask(query)
+
+
+def iter_pulsar_paragraphs(
+        pulsar_names=None,
+        query=None,
+        pulsar_paragraph=None,
+        include_links=False,
+        refresh=False,
+        offline=False,
+        cache_dir=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        jobs=1,
+        paragraph_cache=None,
+        where=None,
+    ):
+    """Generate a (PSRJ, paragraph) pair for each pulsar in pulsar_names as they are rendered.
+
+    The catalogue is rendered chunk_size pulsars at a time, so the first paragraphs are available straight
+    away and the rendered paragraphs are never all held in memory.
+    The other parameters are the same as create_pulsar_paragraph.
+    """
+    query = select_pulsars(
+        pulsar_names=pulsar_names,
+        where=where,
+        query=query,
+        refresh=refresh,
+        offline=offline,
+        cache_dir=cache_dir,
+        cache_ttl=cache_ttl,
+    )
+
+    if pulsar_paragraph is None:
+        pulsar_paragraph = PulsarParagraph()
+
+    if paragraph_cache is None:
+        yield from render_in_chunks(query, pulsar_paragraph, include_links, chunk_size, jobs)
+    else:
+        yield from render_with_cache(query, pulsar_paragraph, include_links, chunk_size, jobs, paragraph_cache)
+
+
+def render_in_chunks(query, pulsar_paragraph, include_links, chunk_size, jobs):
+    """Render query chunk_size pulsars at a time, generating (PSRJ, paragraph) pairs in catalogue order."""
+    chunks = (query.iloc[start:start + chunk_size] for start in range(0, len(query), chunk_size))
+
+    if jobs == 0:
+        jobs = os.cpu_count()
+    if jobs > 1:
+        yield from render_chunks_in_pool(chunks, pulsar_paragraph, include_links, jobs)
+        return
+
+    for chunk in chunks:
+        yield from zip(
+            chunk['PSRJ'].tolist(),
+            render_pulsar_paragraphs(chunk, pulsar_paragraph, include_links=include_links),
+        )
+
+
+def render_with_cache(query, pulsar_paragraph, include_links, chunk_size, jobs, paragraph_cache):
+    """Like render_in_chunks but paragraphs in the ParagraphCache are reused and only the other pulsars are rendered.
+
+    The newly rendered paragraphs are added to the cache chunk_size at a time.
+    """
+    keys = paragraph_keys(query, pulsar_paragraph, include_links)
+    cached = paragraph_cache.get_many(keys)
+    missing = np.array([key not in cached for key in keys], dtype=bool)
+    # The rendered pulsars are generated in the same order as they appear in the catalogue
+    rendered = render_in_chunks(query[missing], pulsar_paragraph, include_links, chunk_size, jobs)
+
+    new_paragraphs = {}
+    for psrj, key in zip(query['PSRJ'].tolist(), keys):
+        if key in cached:
+            yield psrj, cached[key]
+            continue
+        _, paragraph = next(rendered)
+        new_paragraphs[key] = paragraph
+        if len(new_paragraphs) >= chunk_size:
+            paragraph_cache.put_many(new_paragraphs)
+            new_paragraphs = {}
+        yield psrj, paragraph
+    if new_paragraphs:
+        paragraph_cache.put_many(new_paragraphs)
+
+
 def create_pulsar_paragraph(
         pulsar_names=None,
         query=None,
         pulsar_paragraph=None,
         include_links=False,
+        refresh=False,
+        offline=False,
+        cache_dir=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        jobs=1,
+        paragraph_cache=None,
+        where=None,
     ):
-    """Create a paragraph for each pulsar in pulsar_names."""
+    """Create a paragraph for each pulsar in pulsar_names.
 
-    if query is None:
-        if pulsar_names is None:
-            query = psrqpy.QueryATNF().pandas
-        else:
-            query = psrqpy.QueryATNF(psrs=list(pulsar_names)).pandas
+    If no query is given the catalogue is loaded from the local snapshot cache (see load_catalogue),
+    which is only refreshed from the ATNF when it is older than cache_ttl seconds or refresh is True.
+    With jobs > 1 (or 0 for one per CPU) the catalogue is rendered in that many processes,
+    the paragraphs are still returned in catalogue order.
+    If a ParagraphCache is given, paragraphs already rendered with the same catalogue values and gates are reused from it.
+    query is a catalogue DataFrame or the path of a local psrcat.db file.
+    """
+    if jobs != 1 or paragraph_cache is not None:
+        return [
+            paragraph for _, paragraph in iter_pulsar_paragraphs(
+                pulsar_names=pulsar_names,
+                where=where,
+                query=query,
+                pulsar_paragraph=pulsar_paragraph,
+                include_links=include_links,
+                refresh=refresh,
+                offline=offline,
+                cache_dir=cache_dir,
+                cache_ttl=cache_ttl,
+                jobs=jobs,
+                paragraph_cache=paragraph_cache,
+            )
+        ]
+
+    query = select_pulsars(
+        pulsar_names=pulsar_names,
+        where=where,
+        query=query,
+        refresh=refresh,
+        offline=offline,
+        cache_dir=cache_dir,
+        cache_ttl=cache_ttl,
+    )
+
+    if pulsar_paragraph is None:
+        pulsar_paragraph = PulsarParagraph()
+
+    return render_pulsar_paragraphs(
+        query,
+        pulsar_paragraph,
+        include_links=include_links,
+    )
+
+
+def iter_pulsar_records(
+        pulsar_names=None,
+        query=None,
+        pulsar_paragraph=None,
+        include_links=False,
+        refresh=False,
+        offline=False,
+        cache_dir=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        jobs=1,
+        paragraph_cache=None,
+        where=None,
+    ):
+    """Generate a record of each pulsar in pulsar_names for the writers (see writers.RECORD_FIELDS).
+
+    Each record is a dict of the J and B names (None if it has none), the paragraph and the derived quantities
+    (None if missing). The parameters are the same as iter_pulsar_paragraphs.
+    """
+    query = derive_quantities(select_pulsars(
+        pulsar_names=pulsar_names,
+        where=where,
+        query=query,
+        refresh=refresh,
+        offline=offline,
+        cache_dir=cache_dir,
+        cache_ttl=cache_ttl,
+    ))
+    paragraphs = iter_pulsar_paragraphs(
+        query=query,
+        pulsar_paragraph=pulsar_paragraph,
+        include_links=include_links,
+        chunk_size=chunk_size,
+        jobs=jobs,
+        paragraph_cache=paragraph_cache,
+    )
+    yield from pulsar_records(query, paragraphs)
+
+
+def pulsar_records(query, paragraphs):
+    """Generate the writer record of each pulsar in query (with its derive_quantities) from its (PSRJ, paragraph) pairs."""
+    for (psrj, paragraph), psrb, p1_corr, age_corr, bsurf_corr in zip(
+            paragraphs,
+            query['PSRB'].tolist(),
+            query['P1_CORR'].tolist(),
+            query['AGE_CORR'].tolist(),
+            query['BSURF_CORR'].tolist(),
+        ):
+        yield {
+            'PSRJ': psrj,
+            'PSRB': psrb if type(psrb) == str and psrb != '*' else None,
+            'paragraph': paragraph,
+            # NaN isn't equal to itself
+            'P1_CORR': p1_corr if p1_corr == p1_corr else None,
+            'AGE_CORR': age_corr if age_corr == age_corr else None,
+            'BSURF_CORR': bsurf_corr if bsurf_corr == bsurf_corr else None,
+        }
+
+
+def update_pulsar_paragraphs(
+        manifest_path,
+        pulsar_names=None,
+        query=None,
+        pulsar_paragraph=None,
+        include_links=False,
+        refresh=False,
+        offline=False,
+        cache_dir=None,
+        cache_ttl=DEFAULT_CACHE_TTL,
+        jobs=1,
+        paragraph_cache=None,
+        store=None,
+        where=None,
+    ):
+    """Create a paragraph for each pulsar in pulsar_names, only rendering the pulsars that are new or changed since the last run.
+
+    The manifest at manifest_path records the paragraph_keys of each pulsar (a hash of everything its paragraph depends on)
+    and the paragraph.
+    Paragraphs of pulsars whose hash hasn't changed are reused, then the manifest is updated.
+    If a ParagraphStore is given, the rendered paragraphs (and any it is missing) are added to it and the removed pulsars removed.
+    The other parameters are the same as create_pulsar_paragraph.
+
+    Returns
+    -------
+    paragraphs: list
+        The (PSRJ, paragraph) of each pulsar, in catalogue order.
+    changes: dict
+        The J names of the "new" and "changed" pulsars that were rendered and of the pulsars "removed" from the catalogue
+        (only when all pulsars are selected, without pulsar_names or where).
+    """
+    query = select_pulsars(
+        pulsar_names=pulsar_names,
+        where=where,
+        query=query,
+        refresh=refresh,
+        offline=offline,
+        cache_dir=cache_dir,
+        cache_ttl=cache_ttl,
+    )
+    return update_selected_paragraphs(
+        manifest_path,
+        query,
+        all_pulsars=pulsar_names is None and where is None,
+        pulsar_paragraph=pulsar_paragraph,
+        include_links=include_links,
+        jobs=jobs,
+        paragraph_cache=paragraph_cache,
+        store=store,
+    )
+
+
+def update_selected_paragraphs(
+        manifest_path,
+        query,
+        all_pulsars,
+        pulsar_paragraph=None,
+        include_links=False,
+        jobs=1,
+        paragraph_cache=None,
+        store=None,
+    ):
+    """update_pulsar_paragraphs of the pulsars select_pulsars has already selected into query.
+
+    Pulsars missing from the manifest are only reported as removed if all_pulsars were selected.
+    """
+    if pulsar_paragraph is None:
+        pulsar_paragraph = PulsarParagraph()
+    psrjs = query['PSRJ'].tolist()
+    hashes = paragraph_keys(query, pulsar_paragraph, include_links)
+    # Any change to the gates or settings changes every paragraph
+    settings = {'fingerprint': render_fingerprint(pulsar_paragraph, include_links)}
+
+    manifest = read_manifest(manifest_path)
+    if manifest is None or manifest['settings'] != settings:
+        previous = {}
     else:
-        # Filter our query to only include pulsars in pulsar_names
-        query = query[query['PSRJ'].isin(pulsar_names)]
+        previous = manifest['pulsars']
+    new, changed = diff_manifest(previous, psrjs, hashes)
+
+    rendered = dict(iter_pulsar_paragraphs(
+        query=query[query['PSRJ'].isin(new + changed)],
+        pulsar_paragraph=pulsar_paragraph,
+        include_links=include_links,
+        jobs=jobs,
+        paragraph_cache=paragraph_cache,
+    ))
+    paragraphs = [(psrj, rendered[psrj] if psrj in rendered else previous[psrj][1]) for psrj in psrjs]
+
+    if all_pulsars:
+        current = set(psrjs)
+        removed = [psrj for psrj in previous if psrj not in current]
+        pulsars = {}
+    else:
+        # Keep the pulsars that weren't selected this time
+        removed = []
+        pulsars = dict(previous)
+    psrbs = [psrb if type(psrb) == str and psrb != '*' else None for psrb in query['PSRB'].tolist()]
+    for (psrj, paragraph), pulsar_hash, psrb in zip(paragraphs, hashes, psrbs):
+        pulsars[psrj] = [pulsar_hash, paragraph, psrb]
+    write_manifest(manifest_path, settings, pulsars)
+
+    if store is not None:
+        store.update(
+            [
+                (psrj, psrb, paragraph)
+                for (psrj, paragraph), psrb in zip(paragraphs, psrbs)
+                if psrj in rendered or store.fingerprint != settings['fingerprint'] or store.get(psrj) is None
+            ],
+            settings['fingerprint'],
+            removed=removed,
+        )
+
+    return paragraphs, {'new': new, 'changed': changed, 'removed': removed}
+
+
+# The PulsarParagraph and options of a render_chunks_in_pool worker process, set once by init_render_worker
+_worker_state = {}
+
 
+def init_render_worker(pulsar_paragraph, include_links, profile=False):
+    """Set up a worker process of render_chunks_in_pool so the gates and lookup tables are only built once per process."""
     if pulsar_paragraph is None:
         pulsar_paragraph = PulsarParagraph()
+    _worker_state['pulsar_paragraph'] = pulsar_paragraph
+    _worker_state['include_links'] = include_links
+    _worker_state['profile'] = profile
+    load_distance_overrides()
+    if include_links:
+        load_links_index()
 
-    pulsars_available = pd.read_csv(get_data_path('pulsars-links_available.csv'), header=None, sep=",", engine='python')
-    psrs_available = list(pulsars_available.iloc[:, 0])
 
-    output_paragraphs = []
-    for _, row in query.iterrows():
-        if is_atnf_value(row['P1']) and is_atnf_value(row['P0']) and is_atnf_value(row['DIST']) and is_atnf_value(row['VTRANS']):
-            # Values available for Shklovski correction
-            pdot = shklovski_pdot_correction(row['P1'], row['P0'], row['DIST'], row['VTRANS'])
-            age = row['P0'] / ( 2 * pdot ) * 3.1688087814029e-8 # convert to years
-            bsurf = 3.2e19 * np.sqrt( row['P0'] * pdot )
-        else:
-            pdot = row['P1']
-            age = row['AGE']
-            bsurf = row['BSURF']
-
-
-        period_func_str  = pulsar_paragraph.period.variable_value_to_str( row['P0'])
-        dm_func_str      = pulsar_paragraph.dm.variable_value_to_str(     row['DM'])
-        age_func_str     = pulsar_paragraph.age.variable_value_to_str(    age)
-        bsurf_func_str   = pulsar_paragraph.bsurf.variable_value_to_str(  bsurf)
-        pb_func_str      = pulsar_paragraph.pb.variable_value_to_str(     row['PB'])
-        ecc_func_str     = pulsar_paragraph.ecc.variable_value_to_str(    row['ECC'])
-        minmass_func_str = pulsar_paragraph.minmass.variable_value_to_str(row['MINMASS'])
-        s1400_func_str   = pulsar_paragraph.s1400.variable_value_to_str(  row['S1400'])
-        vtrans_func_str  = pulsar_paragraph.vtrans.variable_value_to_str( row['VTRANS'])
-        dec_func_str     = pulsar_paragraph.dec_law(row['DECJ'])
-        p1_func_str      = pulsar_paragraph.p1_to_str(pdot, row['PSRJ'])
-        assoc_func_str   = pulsar_paragraph.assoc_to_str(row['ASSOC'])
-        if type(row['SURVEY']) == str:
-            survey_name      = row['SURVEY'].split(',')[0]
-            survey_func_str  = SURVEY_CODES[survey_name]
-        else:
-            survey_func_str  = None
+def render_worker_chunk(chunk):
+    """Render a chunk in a worker process, returning the paragraphs and the profiling stats of the chunk (or None)."""
+    if _worker_state['profile']:
+        profiler = profiling.enable()
+    paragraphs = render_pulsar_paragraphs(
+        chunk,
+        _worker_state['pulsar_paragraph'],
+        include_links=_worker_state['include_links'],
+    )
+    if _worker_state['profile']:
+        profiling.disable()
+        return paragraphs, profiler.stats()
+    return paragraphs, None
 
-        # Name
-        if '*' == row['PSRB'] or type(row['PSRB']) == float:
-            bname_str = ''
-        else:
-            bname_str = f" ({row['PSRB']})"
-        if row['PSRJ'] in psrs_available and include_links:
-            period_str = f"PSR [[https://pulsars.org.au/fold/meertime/{row['PSRJ']}|{row['PSRJ']}]]{bname_str} is {period_func_str}"
-        else:
-            period_str = f"PSR {row['PSRJ']}{bname_str} is {period_func_str}"
 
-        # DISPERSION MEASURE
-        if dm_func_str is None:
-            dm_str = '.'
-        else:
-            dm_str = ' and has ' + dm_func_str + '.'
-        # S1400
-        if s1400_func_str is None:
-            s1400_str = ''
-        else:
-            s1400_str = ' It is ' + s1400_func_str + '.'
-        # YEAR
-        if '*' == row['DATE'] or type(row['DATE']) == float:
-            year_str = ''
-        else:
-            if '1089806188' in str(row['DATE']):
-                year_str = ''
-            elif (survey_func_str == '') or (survey_func_str is None):
-                year_str = f" PSR {row['PSRJ']} was discovered in {row['DATE']}."
-            else:
-                year_str = f" PSR {row['PSRJ']} was discovered in {row['DATE']}"
-        # DISTANCE
-        if '*' not in str(row['DIST']) and not np.isnan(row['DIST']):
-            dist = float(row['DIST'])
+def render_chunks_in_pool(chunks, pulsar_paragraph, include_links, jobs):
+    """Render the chunks of the catalogue in a pool of jobs processes, generating (PSRJ, paragraph) pairs in catalogue order.
+
+    Only a few chunks per process are in flight at a time so memory doesn't grow with the size of the catalogue.
+    """
+    # The stages run in the workers are added to this process's profiler
+    profiler = profiling.enabled_profiler()
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_render_worker,
+        initargs=(pulsar_paragraph, include_links, profiler is not None),
+    )
+
+    def finished_chunk():
+        psrjs, future = pending.popleft()
+        paragraphs, stats = future.result()
+        if stats is not None:
+            profiler.merge(stats)
+        return zip(psrjs, paragraphs)
+
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append((chunk['PSRJ'].tolist(), executor.submit(render_worker_chunk, chunk)))
+            if len(pending) >= 2 * jobs:
+                yield from finished_chunk()
+        while pending:
+            yield from finished_chunk()
+    finally:
+        # Don't render the rest of the catalogue if the caller stopped early
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def render_pulsar_paragraphs(
+        query,
+        pulsar_paragraph,
+        include_links=False,
+        psrs_available=None,
+    ):
+    """Render a paragraph for every pulsar (row) in query.
+
+    Each section of the paragraph is computed for the whole catalogue at once as a column of structured
+    results, then the SENTENCE_PLAN builds each pulsar's paragraph from them.
+
+    Parameters
+    ----------
+    query: pandas.DataFrame
+        The ATNF catalogue (or a subset of it) to render.
+    pulsar_paragraph: PulsarParagraph
+        The variable gates used to describe each pulsar.
+    include_links: bool
+        Include links to pulsars.org.au and astronomy.swin.edu.au in the descriptions.
+    psrs_available: set, optional
+        The pulsars that have a page on pulsars.org.au. Default: load_links_index().
 
+    Returns
+    -------
+    output_paragraphs: list
+        The paragraph for each pulsar, in catalogue order.
+    """
+    # tolist() gives the same python values as iterrows() without building a Series for each row
+    psrj_col    = query['PSRJ'].tolist()
+    psrb_col    = query['PSRB'].tolist()
+    dist_col    = query['DIST'].tolist()
+    date_col    = query['DATE'].tolist()
+    survey_col  = query['SURVEY'].tolist()
+
+    n_pulsars = len(psrj_col)
+
+    if not set(DERIVED_COLUMNS).issubset(query.columns):
+        with profiling.stage('derive_quantities', n_pulsars):
+            query = derive_quantities(query)
+    pdot_col = query['P1_CORR'].tolist()
+
+    # Each stage counts a call per pulsar, as if the scalar function was called for each row
+    with profiling.stage('variable_value_to_str:period', n_pulsars):
+        period_texts   = pulsar_paragraph.period.variable_values_to_str(query['P0'])
+    with profiling.stage('variable_value_to_str:dm', n_pulsars):
+        dm_texts       = pulsar_paragraph.dm.variable_values_to_str(query['DM'])
+    with profiling.stage('variable_value_to_str:age', n_pulsars):
+        age_texts      = pulsar_paragraph.age.variable_values_to_str(query['AGE_CORR'])
+    with profiling.stage('variable_value_to_str:bsurf', n_pulsars):
+        bsurf_texts    = pulsar_paragraph.bsurf.variable_values_to_str(query['BSURF_CORR'])
+    with profiling.stage('variable_value_to_str:pb', n_pulsars):
+        pb_texts       = pulsar_paragraph.pb.variable_values_to_str(query['PB'])
+    with profiling.stage('variable_value_to_str:ecc', n_pulsars):
+        ecc_texts      = pulsar_paragraph.ecc.variable_values_to_str(query['ECC'])
+    with profiling.stage('variable_value_to_str:minmass', n_pulsars):
+        minmass_texts  = pulsar_paragraph.minmass.variable_values_to_str(query['MINMASS'])
+    with profiling.stage('variable_value_to_str:s1400', n_pulsars):
+        s1400_texts    = pulsar_paragraph.s1400.variable_values_to_str(query['S1400'])
+    with profiling.stage('variable_value_to_str:vtrans', n_pulsars):
+        vtrans_texts   = pulsar_paragraph.vtrans.variable_values_to_str(query['VTRANS'])
+    with profiling.stage('dec_law', n_pulsars):
+        hemispheres    = [pulsar_paragraph.dec_law(dec) for dec in query['DECJ'].tolist()]
+    with profiling.stage('p1_to_str', n_pulsars):
+        pdot_strs      = [pulsar_paragraph.p1_to_str(pdot, psrj) for pdot, psrj in zip(pdot_col, psrj_col)]
+    with profiling.stage('assoc_to_str', n_pulsars):
+        assoc_sections = [pulsar_paragraph.assoc_section(assoc) for assoc in query['ASSOC'].tolist()]
+
+    # Name
+    if include_links:
+        if psrs_available is None:
+            with profiling.stage('links_index_load'):
+                psrs_available = load_links_index()
+        elif not isinstance(psrs_available, (set, frozenset)):
+            psrs_available = set(psrs_available)
+    names = []
+    for psrj, psrb in zip(psrj_col, psrb_col):
+        name = f"[[https://pulsars.org.au/fold/meertime/{psrj}|{psrj}]]" if include_links and psrj in psrs_available else psrj
+        if not ('*' == psrb or type(psrb) == float):
+            name += f" ({psrb})"
+        names.append(name)
+    # DISTANCE
+    with profiling.stage('distance_override', n_pulsars):
+        dist_overrides = assoc_distance_overrides(query['ASSOC']).tolist()
+    distances = []
+    minmass_spaces = []
+    for dist, dist_override in zip(dist_col, dist_overrides):
+        if '*' not in str(dist) and not np.isnan(dist):
             # For globular clusters
-            if '47Tuc' in assoc_func_str:
-                dist = 4.5
-            elif 'M10' in assoc_func_str:
-                dist = 4.4
-            elif 'M13' in assoc_func_str:
-                dist = 7.1
-            elif 'M14' in assoc_func_str:
-                dist = 9.3
-            elif 'M15' in assoc_func_str:
-                dist = 10.4
-            elif 'M22' in assoc_func_str:
-                dist = 3.2
-            elif 'M28' in assoc_func_str:
-                dist = 5.5
-            elif 'M2' in assoc_func_str:
-                dist = 11.5
-            elif 'M30' in assoc_func_str:
-                dist = 8.1
-            elif 'NGC5272' in assoc_func_str:
-                dist = 10.2
-            elif 'M4' in assoc_func_str:
-                dist = 2.2
-            elif 'M53' in assoc_func_str:
-                dist = 17.9
-            elif 'M5' in assoc_func_str:
-                dist = 7.5
-            elif 'M62' in assoc_func_str:
-                dist = 6.8
-            elif 'M71' in assoc_func_str:
-                dist = 4.0
-            elif 'NGC1851' in assoc_func_str:
-                dist = 12.1
-            elif 'NGC5986' in assoc_func_str:
-                dist = 10.4
-            elif 'NGC6341' in assoc_func_str:
-                dist = 8.3
-            elif 'NGC6397' in assoc_func_str:
-                dist = 2.3
-            elif 'NGC6440' in assoc_func_str:
-                dist = 8.5
-            elif 'NGC6441' in assoc_func_str:
-                dist = 11.6
-            elif 'NGC6517' in assoc_func_str:
-                dist = 10.6
-            elif 'NGC6522' in assoc_func_str:
-                dist = 7.7
-            elif 'NGC6539' in assoc_func_str:
-                dist = 7.8
-            elif 'NGC6544' in assoc_func_str:
-                dist = 3.0
-            elif 'NGC6624' in assoc_func_str:
-                dist = 7.9
-            elif 'NGC6652' in assoc_func_str:
-                dist = 10.0
-            elif 'NGC_6712' in assoc_func_str:
-                dist = 6.9
-            elif 'NGC6749' in assoc_func_str:
-                dist = 7.9
-            elif 'NGC6752' in assoc_func_str:
-                dist = 4.0
-            elif 'NGC6760' in assoc_func_str:
-                dist = 7.4
-            elif 'OmegaCen' in assoc_func_str:
-                dist = 5.2
-            elif 'Ter5' in assoc_func_str:
-                dist = 6.9
-            elif 'NGC6342' in assoc_func_str:
-                dist = 8.5
-            dist = int(float(dist) * 1000)
-            if float(dist) < 15000:
-                dist_str = f" The estimated distance to {row['PSRJ']} is {dist} pc."
-            else:
-                dist_str = f" The YMD distance model suggests that the distance to {row['PSRJ']} is {dist} pc, but that is suspicious."
-        else:
-            dist_str = ''
-        # SURVEY
-        if survey_func_str is None:
-            survey_str = ''
+            if not np.isnan(dist_override):
+                dist = dist_override
+            distances.append(int(float(dist) * 1000))
         else:
-            if year_str == '':
-                survey_str = ''
-            else:
-                if include_links:
-                    survey_str = f" as part of [[https://astronomy.swin.edu.au/~mbailes/encyc/{survey_name}_plots.html|{survey_func_str}]]."
-                else:
-                    survey_str = f" as part of {survey_func_str}."
-        # ORBITAL PERIOD
-        if pb_func_str is None:
-            pb_str = ''
-        else:
-            if ecc_func_str is None:
-                pb_str = f" PSR {row['PSRJ']} {pb_func_str}."
-            else:
-                pb_str = f" PSR {row['PSRJ']} {pb_func_str}"
-        # ECCENTRICITY
-        if ecc_func_str is None:
-            ecc_str = ''
-        else:
-            if pb_str == '':
-                ecc_str = f" PSR {row['PSRJ']} {ecc_func_str}."
-            else:
-                ecc_str = f" and {ecc_func_str}."
-        # AGE
-        if age_func_str is None:
-            age_str = ''
-        else:
-            if 'PSR' in pb_str:
-                age_temp_str = ' It'
-            else:
-                age_temp_str = f" PSR {row['PSRJ']}"
-            age_str = f"{age_temp_str} is {age_func_str}."
-        # BSURF
-        if bsurf_func_str is None:
-            bsurf_str = ''
-        else:
-            if 'PSR' in age_str:
-                bsurf_str = f" It has {bsurf_func_str}."
-            else:
-                bsurf_str = f" PSR {row['PSRJ']} has {bsurf_func_str}."
-        # MINMASS
-        if minmass_func_str is None:
-            minmass_str = 'This pulsar appears to be solitary.'
-        else:
-            minmass_str = 'This pulsar has ' + minmass_func_str + '.'
-        if '*' == row['DIST'] or type(row['DIST']) == float:
-            minmass_str = f" {minmass_str}"
-        # Assosiation
-        if assoc_func_str is None:
-            assoc_str = ''
-        else:
-            if 'extragalactic' in assoc_func_str:
-                assoc_str = 'It is ' + assoc_func_str
-            else:
-                assoc_str = assoc_func_str
-        # Declination
-        if dec_func_str is not None or '' == dec_func_str:
-            if s1400_str != '':
-                dec_temp_str = f" PSR {row['PSRJ']} "
-            else:
-                dec_temp_str = ' It '
-            if 'extragalactic' in assoc_str or assoc_str == '':
-                dec_str = dec_temp_str + 'is a ' + dec_func_str + ' pulsar.'
-            elif '47Tuc' in assoc_str or 'and has' in assoc_str:
-                dec_str = dec_temp_str + 'is a ' + dec_func_str + ' pulsar '
-            else:
-                dec_str = dec_temp_str + 'is a ' + dec_func_str + ' pulsar with '
-        else:
-            dec_str = ''
-        # vtrans
-        if vtrans_func_str is None:
-            vtrans_str = ''
-        else:
-            if 'PSR' not in bsurf_str:
-                vtrans_str = ' PSR ' + row['PSRJ'] + ' has ' + vtrans_func_str + '.'
-            else:
-                vtrans_str = ' It has ' + vtrans_func_str + '.'
-        # Adjustments to end_str because assoc function is not perfect.
-        end_str = period_str + dm_str + s1400_str + dec_str + assoc_str + p1_func_str + pb_str + ecc_str + age_str + bsurf_str + vtrans_str + dist_str + minmass_str + year_str + survey_str
-        if '(47Tuc)an' in end_str:
-            end_str = end_str.replace('(47Tuc)an', '47Tuc with an')
-            if 'with 47Tuc' in end_str:
-                end_str = end_str.replace('with 47Tuc', '47Tuc')
-        if 'and has located' in end_str:
-            end_str = end_str.replace('and has located', 'located')
-        if '.an' in end_str:
-            end_str = end_str.replace('.an extragalactic pulsar located in the Small Magellanic Cloud.', ' with ')
-        if 'with and' in end_str:
-            end_str = end_str.replace('with and', 'and')
-        if 'J0537-6910' in end_str or 'J0540-6919' in end_str:
-            end_str = end_str.replace('.an extragalactic pulsar located in the Large Magellanic Cloud.', ', and has ')
-            end_str = end_str.replace('It is a gamma-ray source (4FGL_J0540.3-6920), an extragalactic pulsar located in the Large Magellanic Cloud.an extragalactic pulsar located in the Large Magellanic Cloud.', 'It is an extragalactic pulsar located in the Large Magellanic Cloud, with a gamma-ray source (4FGL_J0540.3-6920) and ')
-        if 'a gamma-ray source (4FGL_J0540.3-6920), an extragalactic pulsar located in the Large Magellanic Cloud,' in end_str:
-            end_str = end_str.replace('a gamma-ray source (4FGL_J0540.3-6920), an extragalactic pulsar located in the Large Magellanic Cloud,', 'an extragalactic pulsar located in the Large Magellanic Cloud with a gamma-ray source (4FGL_J0540.3-6920)')
-        if '(?)' in end_str:
-            end_str = end_str.replace('(?)','')
-        if ')a ' in end_str:
-            end_str = end_str.replace(')a', ') a')
-        if ')an' in end_str:
-            end_str = end_str.replace(')an', ') an')
-        if 'and located' in end_str or 'and  located' in end_str:
-            end_str = end_str.replace ('and located', 'and is located')
-            end_str = end_str.replace ('and  located', 'and is located')
-        if ', located' or ',  located' in end_str:
-            end_str = end_str.replace (', located', ', is located')
-            end_str = end_str.replace (',  located', ', is located')
-        if 'and an' in end_str or 'and  an' in end_str:
-            end_str = end_str.replace ('and an', 'and has an')
-            end_str = end_str.replace ('and  an', 'and has an')
-        if ' ()' in end_str:
-            end_str = end_str.replace(' ()', '')
-        if ' with (' in end_str or '  with  ('in end_str or '  with (' in end_str or ' with  (' in end_str:
-            end_str = end_str.replace(' with (', ' (')
-            end_str = end_str.replace('  with (', ' (')
-            end_str = end_str.replace(' with  (', ' (')
-            end_str = end_str.replace('  with  (', ' (')
-        if 'with located' in end_str or ' with  located in end_str':
-            end_str = end_str.replace('with located', 'located')
-            end_str = end_str.replace('with  located', 'located')
-        if ') an' in end_str or ')  an' in end_str:
-            end_str = end_str.replace(') an', ') and an')
-            end_str = end_str.replace(')  an', ') and an')
-        if ') a ' in end_str or ')  a ' in end_str:
-            end_str = end_str.replace(') a ', ') and a ')
-            end_str = end_str.replace(')  a ', ') and a ')
-        if 'the optical counterpart.' in end_str:
-            end_str = end_str.replace('the optical counterpart', 'an optical counterpart')
-        if 'and  and' in end_str or 'and and' in end_str:
-            end_str = end_str.replace('and and', 'and')
-            end_str = end_str.replace('and  and', 'and')
-        if ' and a supernova remnant (Vela)' in end_str:
-            end_str = end_str.replace(' and a supernova remnant (Vela)', '')
-        if ' and an associated x-ray source (Swift_J063343.8+063223)' in end_str:
-            end_str = end_str.replace( 'and an associated x-ray source (Swift_J063343.8+063223)', '')
-        if ' and an associated gamma-ray source (HESS_J1023-575)' in end_str:
-            end_str = end_str.replace(' and an associated gamma-ray source (HESS_J1023-575)', '')
-        if ')) and an optical counterpart' in end_str:
-            end_str = end_str.replace('and an', 'with an')
-        if ' and an associated gamma-ray source (1AGL_J)' in end_str:
-            end_str = end_str.replace(' and an associated gamma-ray source (1AGL_J)', '')
-        if 'It is an associated gamma-ray source' in end_str:
-            end_str = end_str.replace('It is an associated gamma-ray source', 'It has an associated gamma-ray source')
-        output_paragraphs.append(end_str)
-    return output_paragraphs
-
-def main():
-    parser = argparse.ArgumentParser(description="Creates a human readable summary of a pulsar based on information for the ANTF pulsar catalogue.")
+            distances.append(None)
+        minmass_spaces.append('*' == dist or type(dist) == float)
+    # YEAR and SURVEY
+    dates = [
+        None if '*' == date or type(date) == float or '1089806188' in str(date) else date
+        for date in date_col
+    ]
+    survey_names = [survey.split(',')[0] if type(survey) == str else None for survey in survey_col]
+    surveys = [
+        None if survey_name is None else
+        f"[[https://astronomy.swin.edu.au/~mbailes/encyc/{survey_name}_plots.html|{SURVEY_CODES[survey_name]}]]" if include_links else
+        SURVEY_CODES[survey_name]
+        for survey_name in survey_names
+    ]
+
+    joined_paragraphs = SENTENCE_PLAN.render_many(zip(
+        psrj_col, names, period_texts, dm_texts, s1400_texts, hemispheres, assoc_sections, pdot_strs,
+        pb_texts, ecc_texts, age_texts, bsurf_texts, vtrans_texts, distances, minmass_texts,
+        minmass_spaces, dates, surveys,
+    ))
+    with profiling.stage('rewrite', n_pulsars):
+        return [fix_paragraph_grammar(paragraph) for paragraph in joined_paragraphs]
+
+
+def assoc_distance_override(assoc):
+    """Find the distance (kpc) to use instead of the catalogue distance for a pulsar's associations.
+
+    The names of the associations (see parse_assoc, e.g. "47Tuc" of "GC:47Tuc[mlr+91]") are looked up in order
+    in the distance overrides table and the first found is used.
+
+    Parameters
+    ----------
+    assoc: str
+        The ATNF ASSOC parameter.
+
+    Returns
+    -------
+    distance: float
+        The distance override or NaN if none of the associations have one.
+    """
+    if type(assoc) != str:
+        return np.nan
+    associations = parse_assoc(assoc.strip())
+    if associations is None:
+        return np.nan
+    distance_overrides = load_distance_overrides()
+    for records in associations:
+        for record in records:
+            if record.name in distance_overrides:
+                return distance_overrides[record.name]
+    return np.nan
+
+
+def assoc_distance_overrides(assocs):
+    """Vectorised assoc_distance_override for a whole ASSOC column, looking up each unique ASSOC value once.
+
+    Returns
+    -------
+    distances: np.ndarray
+        The distance override for each pulsar or NaN if it has none.
+    """
+    distances = {}
+    for assoc in assocs:
+        if type(assoc) == str and assoc not in distances:
+            distances[assoc] = assoc_distance_override(assoc)
+    return np.array([distances.get(assoc, np.nan) if type(assoc) == str else np.nan for assoc in assocs], dtype=float)
+
+
+def fix_paragraph_grammar(end_str):
+    """Adjustments to the joined paragraph because assoc function is not perfect (see PARAGRAPH_REWRITE_RULES)."""
+    return PARAGRAPH_REWRITER.rewrite(end_str)
+
+
+def write_paragraphs(paragraphs, f):
+    """Write each paragraph from (PSRJ, paragraph) pairs on its own line of f as soon as it is rendered."""
+    for _, paragraph in paragraphs:
+        f.write(paragraph + '\n')
+        f.flush()
+
+
+def collect_store_records(records, stored):
+    """Pass on each writer record, appending its (PSRJ, PSRB, paragraph) to stored for a ParagraphStore."""
+    for record in records:
+        stored.append((record['PSRJ'], record['PSRB'], record['paragraph']))
+        yield record
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ['serve']:
+        # Imported here so the paragraph CLI doesn't pay for asyncio
+        from pulsar_paragraph.server import main as serve_main
+        return serve_main(argv[1:])
+
+    parser = argparse.ArgumentParser(description="Creates a human readable summary of a pulsar based on information for the ANTF pulsar catalogue. Run 'pulsar_paragraph serve --help' for the paragraph server.")
 
     parser.add_argument("-p", "--pulsar_names", nargs="+", help="List of pulsar names. If none selected will process all pulsars.")
+    parser.add_argument("-w", "--where", help="Only process the pulsars selected by an expression over the catalogue columns and derived quantities, e.g. 'P0 < 0.03 and PB > 0 and DECJ < 0' (DECJ in degrees). Missing values never match a comparison, including !=.")
     parser.add_argument("-o", "--output_file", help="Output file name. If none supplied will print to stdout.")
+    parser.add_argument("-f", "--format", choices=list(WRITERS), help="Output format. txt is one paragraph per line, the others are records of the pulsar names, paragraph and derived quantities. Default: from the --output_file extension, or txt.")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], help="Compress the output (for parquet, the column codec). Default: from the --output_file extension (.gz or .zst).")
     parser.add_argument("-l", "--include_links", action="store_true", help="Include links to pulsars.org.au and astronomy.swin.edu.au in the descriptions.")
+    parser.add_argument("--refresh", action="store_true", help="Download the latest ATNF catalogue even if the cached snapshot is still fresh.")
+    parser.add_argument("--offline", action="store_true", help="Never use the network, only the cached catalogue snapshot.")
+    parser.add_argument("--cache_dir", help="Directory of the cached catalogue snapshots. Default: $PULSAR_PARAGRAPH_CACHE or ~/.cache/pulsar_paragraph.")
+    parser.add_argument("--db", metavar="PATH", help="Read the catalogue from a local psrcat.db file instead of the cached snapshot of the ATNF catalogue, without psrqpy or the network.")
+    parser.add_argument("--cache_ttl", type=float, default=DEFAULT_CACHE_TTL, help="Seconds a cached catalogue snapshot is used before the ATNF catalogue is checked again. Default: %(default)s (one week).")
+    parser.add_argument("--incremental", metavar="MANIFEST", help="Only render the pulsars that are new or changed since the run that wrote the MANIFEST file, reusing the other paragraphs. The manifest is created if it doesn't exist.")
+    parser.add_argument("--store", metavar="DIR", help="Indexed on-disk store of the paragraphs, updated with the paragraphs of each run (only the new and changed pulsars with --incremental). Created if it doesn't exist.")
+    parser.add_argument("--cached", action="store_true", help="Serve the -p pulsars straight from the --store (or the --incremental manifest) without loading the catalogue. Names ending in * are prefix lookups in the store, e.g. 'J04*'. Falls back to a normal run if any of them aren't stored.")
+    parser.add_argument("--paragraph_cache", metavar="PATH", help="SQLite database of rendered paragraphs, shared between runs and gate configurations. Only pulsars not in the cache are rendered.")
+    parser.add_argument("--paragraph_cache_size", type=int, default=DEFAULT_MAX_ENTRIES, help="Maximum number of paragraphs kept in --paragraph_cache, the least recently used are evicted. Default: %(default)s.")
+    parser.add_argument("--profile", nargs="?", const="table", choices=["table", "json"], help="Report the wall time and number of calls of each stage of rendering on stderr, as a table (default) or JSON.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used to render the paragraphs, 0 for one per CPU. Default: %(default)s.")
+    parser.add_argument("--pipeline", action="store_true", help="Load, derive, render and write the paragraphs in chunks in separate threads connected by bounded queues, so each chunk is written as soon as it is rendered.")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.refresh and args.offline:
+        parser.error("--refresh and --offline can't be used together")
+    if args.db and args.refresh:
+        parser.error("--refresh can't be used with --db")
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or more")
+    if args.cached and not ((args.incremental or args.store) and args.pulsar_names):
+        parser.error("--cached needs --store or --incremental and --pulsar_names")
+    if args.cached and args.where:
+        parser.error("--cached can't be used with --where")
+    if args.where:
+        try:
+            parse_where(args.where)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.pipeline and (args.incremental or args.store or args.paragraph_cache):
+        parser.error("--pipeline can't be used with --incremental, --store or --paragraph_cache")
+    output_format, compression = infer_format(args.output_file)
+    output_format = args.format or output_format or 'txt'
+    compression = args.compression or compression
+    if not WRITERS[output_format].text and not args.output_file:
+        parser.error(f"{output_format} output needs --output_file")
 
-    output_paragraphs = create_pulsar_paragraph(
+    if args.profile:
+        profiler = profiling.enable()
+        start = time.perf_counter()
+
+    options = dict(
         pulsar_names=args.pulsar_names,
+        where=args.where,
+        query=args.db,
         include_links=args.include_links,
+        refresh=args.refresh,
+        offline=args.offline,
+        cache_dir=args.cache_dir,
+        cache_ttl=args.cache_ttl,
+        jobs=args.jobs,
     )
-    if args.output_file:
-        with open(args.output_file, 'w') as f:
-            for paragraph in output_paragraphs:
-                f.write(paragraph + '\n')
-    else:
-        for paragraph in output_paragraphs:
-            print(paragraph)
+    paragraphs = None
+    records = None
+    store = None
+    stored = None
+    if args.store:
+        store = ParagraphStore(args.store)
+    if args.cached:
+        # Fast path that doesn't import pandas or psrqpy
+        fingerprint = render_fingerprint(PulsarParagraph(), args.include_links)
+        if store is not None:
+            paragraphs = stored_paragraphs(store, args.pulsar_names, fingerprint)
+        if paragraphs is None and args.incremental:
+            paragraphs = cached_paragraphs(args.incremental, args.pulsar_names, fingerprint)
+    paragraph_cache = None
+    if args.paragraph_cache and paragraphs is None:
+        paragraph_cache = ParagraphCache(args.paragraph_cache, max_entries=args.paragraph_cache_size)
+        options['paragraph_cache'] = paragraph_cache
+    if paragraphs is None and args.incremental:
+        query = select_pulsars(
+            pulsar_names=args.pulsar_names,
+            query=args.db,
+            refresh=args.refresh,
+            offline=args.offline,
+            cache_dir=args.cache_dir,
+            cache_ttl=args.cache_ttl,
+            where=args.where,
+        )
+        paragraphs, changes = update_selected_paragraphs(
+            args.incremental,
+            query,
+            all_pulsars=args.pulsar_names is None and args.where is None,
+            include_links=args.include_links,
+            jobs=args.jobs,
+            paragraph_cache=paragraph_cache,
+            store=store,
+        )
+        if output_format != 'txt' or compression is not None:
+            # The same records as a full run, with the B names and derived quantities
+            records = pulsar_records(derive_quantities(query), paragraphs)
+        print(f"Rendered {len(changes['new'])} new and {len(changes['changed'])} changed pulsars, reused {len(paragraphs) - len(changes['new']) - len(changes['changed'])}", file=sys.stderr)
+        if changes['removed']:
+            print(f"Removed from the catalogue: {' '.join(changes['removed'])}", file=sys.stderr)
+    elif paragraphs is None and store is not None:
+        # The records have the B names for the store, which is updated once they have all been written
+        stored = []
+        records = collect_store_records(iter_pulsar_records(**options), stored)
+        if output_format == 'txt' and compression is None:
+            paragraphs = ((record['PSRJ'], record['paragraph']) for record in records)
+    elif paragraphs is None and output_format == 'txt' and not args.pipeline:
+        paragraphs = iter_pulsar_paragraphs(**options)
+    try:
+        if args.pipeline:
+            # Imported here as only the pipeline needs its threads
+            from pulsar_paragraph.pipeline import PsrcatDBSource, SnapshotSource, run_pipeline
 
+            if args.db:
+                source = PsrcatDBSource(args.db)
+            else:
+                source = SnapshotSource(cache_dir=args.cache_dir, ttl=args.cache_ttl, refresh=args.refresh, offline=args.offline)
+            with open_writer(args.output_file, output_format, compression) as writer:
+                run_pipeline(source, writer, include_links=args.include_links, pulsar_names=args.pulsar_names, where=args.where, jobs=args.jobs)
+        elif output_format == 'txt' and compression is None:
+            if args.output_file:
+                with open(args.output_file, 'w') as f:
+                    write_paragraphs(paragraphs, f)
+            else:
+                write_paragraphs(paragraphs, sys.stdout)
+        else:
+            if records is None and paragraphs is None:
+                records = iter_pulsar_records(**options)
+            elif records is None:
+                # --cached paragraphs from the manifest or the store only have the names and paragraphs
+                records = ({'PSRJ': psrj, 'paragraph': paragraph} for psrj, paragraph in paragraphs)
+            with open_writer(args.output_file, output_format, compression) as writer:
+                writer.write_many(records)
+    except BrokenPipeError:
+        # The reader (e.g. head) has stopped so stop rendering. Point stdout at devnull so the
+        # interpreter doesn't raise another BrokenPipeError when it flushes stdout on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    if stored is not None:
+        store.update(stored, render_fingerprint(PulsarParagraph(), args.include_links), replace=args.pulsar_names is None and args.where is None)
+    if store is not None:
+        store.close()
+    if args.profile:
+        profiling.disable()
+        profiler.add('total', time.perf_counter() - start)
+        print(profiler.format_table() if args.profile == 'table' else profiler.to_json(), file=sys.stderr)
+    if paragraph_cache is not None:
+        stats = paragraph_cache.stats()
+        print(f"Paragraph cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), {stats['entries']} paragraphs cached", file=sys.stderr)
+        paragraph_cache.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
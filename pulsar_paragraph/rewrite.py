@@ -0,0 +1,140 @@
+import re
+from collections import Counter
+
+
+def trie_regex(strs):
+    """Build a regular expression matching any of strs, factored into a prefix trie so it is fast to search."""
+    trie = {}
+    for string in strs:
+        node = trie
+        for char in string:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # One of the strings ends here
+            pattern += '?'
+        return pattern
+
+    return build(trie)
+
+
+class RewriteRule:
+    def __init__(
+            self,
+            replacements,
+            guard=None,
+            children=(),
+            name=None,
+        ):
+        # The (old, new) string replacements, applied in order.
+        self.replacements = tuple(replacements)
+        # The rule is only applied if one of these strings is in the paragraph. None means always apply.
+        if isinstance(guard, str):
+            guard = (guard,)
+        self.guard = guard
+        # Without a guard the rule can only change the paragraph if it contains one of the strings replaced
+        self.triggers = tuple(old for old, _ in self.replacements) if guard is None else guard
+        # Rules that are only applied after this rule has been applied.
+        self.children = tuple(children)
+        # Used as the key of the hit counter, defaults to the first string replaced.
+        self.name = name or self.replacements[0][0]
+
+    def applies_to(self, text):
+        for trigger in self.triggers:
+            if trigger in text:
+                return True
+        return False
+
+    def old_strs(self):
+        """All the strings this rule and its children can replace."""
+        old_strs = [old for old, _ in self.replacements]
+        for child in self.children:
+            old_strs += child.old_strs()
+        return old_strs
+
+
+class RewriteEngine:
+    """Applies an ordered table of RewriteRules to paragraphs.
+
+    The rules are compiled into a single regular expression of every string they can replace,
+    so a paragraph that none of the rules can change is handled with one scan. Otherwise the rules
+    are applied in order, as later rules can depend on the output of earlier ones.
+    The number of paragraphs each rule changed is counted in hits.
+    """
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        old_strs = []
+        for rule in self.rules:
+            old_strs += rule.old_strs()
+        self.matcher = re.compile(trie_regex(set(old_strs)))
+        self.hits = Counter()
+
+    def reset_hits(self):
+        self.hits = Counter()
+
+    def rewrite(self, text):
+        if self.matcher.search(text) is None:
+            return text
+        return self._apply_rules(self.rules, text)
+
+    def _apply_rules(self, rules, text):
+        for rule in rules:
+            if not rule.applies_to(text):
+                continue
+            rewritten = text
+            for old, new in rule.replacements:
+                rewritten = rewritten.replace(old, new)
+            if rewritten != text:
+                self.hits[rule.name] += 1
+                text = rewritten
+            text = self._apply_rules(rule.children, text)
+        return text
+
+
+# Adjustments to the paragraphs because assoc function is not perfect. Applied in order.
+PARAGRAPH_REWRITE_RULES = [
+    RewriteRule(
+        [('(47Tuc)an', '47Tuc with an')],
+        children=[RewriteRule([('with 47Tuc', '47Tuc')], guard='with 47Tuc')],
+        guard='(47Tuc)an',
+    ),
+    RewriteRule([('and has located', 'located')]),
+    RewriteRule([('.an extragalactic pulsar located in the Small Magellanic Cloud.', ' with ')], guard='.an'),
+    RewriteRule([('with and', 'and')]),
+    RewriteRule(
+        [
+            ('.an extragalactic pulsar located in the Large Magellanic Cloud.', ', and has '),
+            ('It is a gamma-ray source (4FGL_J0540.3-6920), an extragalactic pulsar located in the Large Magellanic Cloud.an extragalactic pulsar located in the Large Magellanic Cloud.', 'It is an extragalactic pulsar located in the Large Magellanic Cloud, with a gamma-ray source (4FGL_J0540.3-6920) and '),
+        ],
+        guard=('J0537-6910', 'J0540-6919'),
+    ),
+    RewriteRule([('a gamma-ray source (4FGL_J0540.3-6920), an extragalactic pulsar located in the Large Magellanic Cloud,', 'an extragalactic pulsar located in the Large Magellanic Cloud with a gamma-ray source (4FGL_J0540.3-6920)')]),
+    RewriteRule([('(?)', '')]),
+    RewriteRule([(')a', ') a')], guard=')a '),
+    RewriteRule([(')an', ') an')]),
+    RewriteRule([('and located', 'and is located'), ('and  located', 'and is located')]),
+    RewriteRule([(', located', ', is located'), (',  located', ', is located')]),
+    RewriteRule([('and an', 'and has an'), ('and  an', 'and has an')]),
+    RewriteRule([(' ()', '')]),
+    RewriteRule([(' with (', ' ('), ('  with (', ' ('), (' with  (', ' ('), ('  with  (', ' (')]),
+    RewriteRule([('with located', 'located'), ('with  located', 'located')]),
+    RewriteRule([(') an', ') and an'), (')  an', ') and an')]),
+    RewriteRule([(') a ', ') and a '), (')  a ', ') and a ')]),
+    RewriteRule([('the optical counterpart', 'an optical counterpart')], guard='the optical counterpart.'),
+    RewriteRule([('and and', 'and'), ('and  and', 'and')]),
+    RewriteRule([(' and a supernova remnant (Vela)', '')]),
+    RewriteRule([('and an associated x-ray source (Swift_J063343.8+063223)', '')], guard=' and an associated x-ray source (Swift_J063343.8+063223)'),
+    RewriteRule([(' and an associated gamma-ray source (HESS_J1023-575)', '')]),
+    RewriteRule([('and an', 'with an')], guard=')) and an optical counterpart', name=')) and an optical counterpart'),
+    RewriteRule([(' and an associated gamma-ray source (1AGL_J)', '')]),
+    RewriteRule([('It is an associated gamma-ray source', 'It has an associated gamma-ray source')]),
+]
+PARAGRAPH_REWRITER = RewriteEngine(PARAGRAPH_REWRITE_RULES)
@@ -0,0 +1,244 @@
+import ast
+import operator
+from collections import namedtuple
+
+import numpy as np
+
+from pulsar_paragraph.pulsar_classes import values_to_float_array
+
+
+# Catalogue columns that are strings, which can only be compared with ==, != and in
+STRING_COLUMNS = frozenset(['PSRJ', 'PSRB', 'ASSOC', 'SURVEY'])
+# The operators allowed in selection expressions
+COMPARISONS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+BINARY_OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.Mod: np.mod,
+}
+# Comparisons that order values, which strings can't be used in
+ORDERINGS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+# and/or and &/| (as in pandas)
+CONJUNCTIONS = (ast.And, ast.BitAnd)
+DISJUNCTIONS = (ast.Or, ast.BitOr)
+UNARY_OPERATORS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+# The functions that can be called in selection expressions
+FUNCTIONS = {
+    'abs': np.abs,
+    'log10': np.log10,
+    'sqrt': np.sqrt,
+    'isnan': np.isnan,
+    'isfinite': np.isfinite,
+}
+
+
+def declination_degrees(decjs):
+    """Convert DECJ strings (e.g. "-47:15:09.11") to degrees, NaN where missing."""
+    degrees = np.full(len(decjs), np.nan)
+    for i, decj in enumerate(decjs):
+        if type(decj) != str or decj == '*':
+            continue
+        try:
+            parts = [abs(float(part)) for part in decj.split(':')]
+        except ValueError:
+            continue
+        value = sum(part / 60 ** power for power, part in enumerate(parts))
+        degrees[i] = -value if decj.lstrip().startswith('-') else value
+    return degrees
+
+
+def is_missing(values):
+    """Which of values (an array from selection_column or a constant) are missing: NaN or None."""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return np.fromiter((value is None for value in values.flat), dtype=bool, count=values.size).reshape(values.shape)
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    return np.zeros(values.shape, dtype=bool)
+
+
+# The result of a condition over the pulsars: where it is true, and where it is known (not from a missing value).
+# Where it isn't known it is neither true nor, once negated, true, so missing values never match.
+Condition = namedtuple('Condition', ['true', 'known'])
+
+
+def condition(values):
+    """values (a Condition, or values used as a condition, e.g. "PB and P1") as a Condition, with missing values unknown."""
+    if isinstance(values, Condition):
+        return values
+    known = ~is_missing(values)
+    return Condition(np.logical_and(np.asarray(values, dtype=bool), known), known)
+
+
+def operand(values):
+    """values to compute with, a Condition is where it is true."""
+    return values.true if isinstance(values, Condition) else values
+
+
+def conjunction(conditions):
+    """and of Conditions, which is known where they are all known or any is known to be false."""
+    true = np.logical_and.reduce([c.true for c in conditions])
+    false = np.logical_or.reduce([np.logical_and(c.known, ~c.true) for c in conditions])
+    return Condition(true, np.logical_or(np.logical_and.reduce([c.known for c in conditions]), false))
+
+
+def disjunction(conditions):
+    """or of Conditions, which is known where they are all known or any is true."""
+    true = np.logical_or.reduce([c.true for c in conditions])
+    return Condition(true, np.logical_or(np.logical_and.reduce([c.known for c in conditions]), true))
+
+
+def selection_column(query, name):
+    """The values of a catalogue column as an array for a selection: floats (NaN where missing), strings (None where missing)
+    or, for DECJ, the declination in degrees.
+    """
+    if name == 'DECJ':
+        return declination_degrees(query['DECJ'].tolist())
+    if name in STRING_COLUMNS:
+        return np.array([value if type(value) == str and value != '*' else None for value in query[name].tolist()], dtype=object)
+    return values_to_float_array(query[name])
+
+
+class Selection:
+    """A selection expression over the catalogue's columns, evaluated once over the whole catalogue to a boolean mask.
+
+    Expressions are Python syntax, e.g. "P0 < 0.03 and PB > 0 and DECJ < 0" or "ASSOC in ['GC', 'SNR']", with
+    comparisons, arithmetic, and/or/not (or &, |, ~) and the FUNCTIONS. Missing values never match: comparisons with them
+    (including != and not in) are unknown rather than true or false, so negating them (e.g. "not P0 < 0.03") doesn't
+    match either, and the same goes for missing values where a condition is expected (e.g. "PB and P1").
+    DECJ is the declination in degrees. The STRING_COLUMNS can only be compared with ==, != and in.
+
+    Parameters
+    ----------
+    expression: str
+        The selection expression.
+    columns: list
+        The columns the expression may use.
+
+    Raises
+    ------
+    ValueError
+        If the expression isn't valid or uses anything but the columns, constants and FUNCTIONS.
+    """
+    def __init__(self, expression, columns):
+        self.expression = expression
+        try:
+            self.tree = ast.parse(expression.strip(), mode='eval').body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid selection {expression!r}: {e.msg}") from None
+        self.columns = set()
+        self.check(self.tree, frozenset(columns))
+
+    def check_numeric(self, nodes, usage):
+        """Raise a ValueError if any of nodes is a string column or constant, which can't be used in usage."""
+        for node in nodes:
+            if isinstance(node, ast.Name) and node.id in STRING_COLUMNS:
+                raise ValueError(f"{node.id} is a string column, it can't be used in {usage} in selection {self.expression!r}, only with ==, != and in")
+        for node in nodes:
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                raise ValueError(f"The string {node.value!r} can't be used in {usage} in selection {self.expression!r}, only with ==, != and in")
+
+    def check(self, node, columns):
+        """Check every node of the expression is allowed, recording the columns it uses."""
+        if isinstance(node, ast.Name):
+            if node.id not in columns:
+                raise ValueError(f"Unknown column {node.id} in selection {self.expression!r}, the columns are {', '.join(sorted(columns))}")
+            self.columns.add(node.id)
+            return
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"Only the functions {', '.join(FUNCTIONS)} can be called in selection {self.expression!r}")
+            self.check_numeric(node.args, f"{node.func.id}()")
+            children = node.args
+        elif isinstance(node, ast.Compare):
+            for op, left, comparator in zip(node.ops, [node.left] + node.comparators, node.comparators):
+                if isinstance(op, ORDERINGS):
+                    self.check_numeric([left, comparator], "an ordering comparison (<, <=, > or >=)")
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(comparator, (ast.List, ast.Tuple, ast.Set)) or not all(isinstance(element, ast.Constant) for element in comparator.elts):
+                        raise ValueError(f"in needs a list of values in selection {self.expression!r}")
+                elif type(op) not in COMPARISONS:
+                    raise ValueError(f"Unsupported comparison in selection {self.expression!r}")
+            children = [node.left] + [comparator for comparator in node.comparators if not isinstance(comparator, (ast.List, ast.Tuple, ast.Set))]
+        elif isinstance(node, ast.BoolOp):
+            children = node.values
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, CONJUNCTIONS + DISJUNCTIONS):
+            children = [node.left, node.right]
+        elif isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            self.check_numeric([node.left, node.right], "arithmetic")
+            children = [node.left, node.right]
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            children = [node.operand]
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            self.check_numeric([node.operand], "arithmetic")
+            children = [node.operand]
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) and not isinstance(node.value, bool):
+            return
+        else:
+            raise ValueError(f"Unsupported {type(node).__name__} in selection {self.expression!r}")
+        for child in children:
+            self.check(child, columns)
+
+    def mask(self, query):
+        """The boolean mask of the pulsars (rows of query) the expression selects."""
+        values = {column: selection_column(query, column) for column in self.columns}
+        with np.errstate(all='ignore'):
+            try:
+                mask = self.evaluate(self.tree, values)
+            except TypeError as e:
+                raise ValueError(f"Can't evaluate selection {self.expression!r}: {e}") from None
+        mask = np.asarray(operand(mask))
+        if mask.dtype != bool:
+            raise ValueError(f"Selection {self.expression!r} isn't a condition")
+        return np.broadcast_to(mask, (len(query),))
+
+    def evaluate(self, node, values):
+        """The values of node, or a Condition for comparisons, and/or/not and what they combine."""
+        if isinstance(node, ast.Name):
+            return values[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Call):
+            return FUNCTIONS[node.func.id](*(operand(self.evaluate(arg, values)) for arg in node.args))
+        if isinstance(node, ast.BoolOp):
+            combine = conjunction if isinstance(node.op, CONJUNCTIONS) else disjunction
+            return combine([condition(self.evaluate(value, values)) for value in node.values])
+        if isinstance(node, ast.BinOp) and isinstance(node.op, CONJUNCTIONS + DISJUNCTIONS):
+            combine = conjunction if isinstance(node.op, CONJUNCTIONS) else disjunction
+            return combine([condition(self.evaluate(node.left, values)), condition(self.evaluate(node.right, values))])
+        if isinstance(node, ast.BinOp):
+            return BINARY_OPERATORS[type(node.op)](operand(self.evaluate(node.left, values)), operand(self.evaluate(node.right, values)))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.Invert)):
+            negated = condition(self.evaluate(node.operand, values))
+            # Unknown stays unknown, so negation never selects missing values
+            return Condition(np.logical_and(~negated.true, negated.known), negated.known)
+        if isinstance(node, ast.UnaryOp):
+            return UNARY_OPERATORS[type(node.op)](operand(self.evaluate(node.operand, values)))
+        # A (possibly chained) comparison, e.g. 0.001 < P0 < 0.03
+        comparisons = []
+        left = operand(self.evaluate(node.left, values))
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                found = np.isin(left, [element.value for element in comparator.elts])
+                known = ~is_missing(left)
+                comparisons.append(Condition(np.logical_and(found if isinstance(op, ast.In) else ~found, known), known))
+                continue
+            right = operand(self.evaluate(comparator, values))
+            # NaN and None are unequal to everything, so != would otherwise select them
+            known = ~(is_missing(left) | is_missing(right))
+            comparisons.append(Condition(np.logical_and(COMPARISONS[type(op)](left, right), known), known))
+            left = right
+        return conjunction(comparisons)
@@ -0,0 +1,194 @@
+from collections import namedtuple
+
+
+# Distances (pc) beyond this are flagged as suspicious
+SUSPICIOUS_DISTANCE = 15000
+
+# Everything the paragraph of one pulsar is built from, any of them None if the pulsar doesn't have it:
+# psrj: the J name
+# name: how the pulsar is named in the first sentence, e.g. "J0534+2200 (B0531+21)" or a link to its page
+# period, dm, s1400, pb, ecc, age, bsurf, vtrans, minmass: the Section of each variable, or its text (see PulsarVariable.variable_values_to_str)
+# hemisphere: "Northern Hemisphere" or "Southern Hemisphere"
+# assoc: the AssocSection of its associations
+# pdot: the period derivative sentence (see PulsarParagraph.p1_to_str)
+# distance: the distance in pc
+# minmass_space: whether the companion sentence is preceded by a space
+# date: the year of discovery
+# survey: the survey that discovered it, or a link to the survey's plots
+PulsarSections = namedtuple('PulsarSections', [
+    'psrj', 'name', 'period', 'dm', 's1400', 'hemisphere', 'assoc', 'pdot', 'pb', 'ecc',
+    'age', 'bsurf', 'vtrans', 'distance', 'minmass', 'minmass_space', 'date', 'survey',
+])
+# The placeholder of each field in a compiled template
+FIELDS = {field: f"{{{index}}}" for index, field in enumerate(PulsarSections._fields)}
+# The placeholder of the association text
+ASSOC_TEXT = f"{{{PulsarSections._fields.index('assoc')}.text}}"
+
+# How the associations join onto the hemisphere sentence
+NO_ASSOC = 0
+EXTRAGALACTIC = 1
+CONTINUES = 2
+WITH = 3
+
+# The bits of a paragraph shape (see paragraph_shape) for each section the pulsar has.
+# The association join is in the lowest two bits.
+DM = 1 << 2
+S1400 = 1 << 3
+HEMISPHERE = 1 << 4
+PB = 1 << 5
+ECC = 1 << 6
+AGE = 1 << 7
+BSURF = 1 << 8
+VTRANS = 1 << 9
+DISTANCE = 1 << 10
+SUSPICIOUS_DISTANCE_BIT = 1 << 11
+MINMASS = 1 << 12
+MINMASS_SPACE = 1 << 13
+DATE = 1 << 14
+SURVEY = 1 << 15
+
+
+def paragraph_shape(sections):
+    """The shape of a pulsar's PulsarSections (or tuple of its fields) as an int of bits: which sections it has and how the associations join on.
+
+    Paragraphs with the same shape have the same sentences, subjects and conjunctions.
+    """
+    psrj, name, period, dm, s1400, hemisphere, assoc, pdot, pb, ecc, age, bsurf, vtrans, distance, minmass, minmass_space, date, survey = sections
+    if assoc is None or assoc.text == '':
+        shape = NO_ASSOC
+    elif assoc.extragalactic:
+        shape = EXTRAGALACTIC
+    elif assoc.continues:
+        shape = CONTINUES
+    else:
+        shape = WITH
+    if dm is not None:
+        shape |= DM
+    if s1400 is not None:
+        shape |= S1400
+    if hemisphere is not None:
+        shape |= HEMISPHERE
+    if pb is not None:
+        shape |= PB
+    if ecc is not None:
+        shape |= ECC
+    if age is not None:
+        shape |= AGE
+    if bsurf is not None:
+        shape |= BSURF
+    if vtrans is not None:
+        shape |= VTRANS
+    if distance is not None:
+        shape |= DISTANCE
+        if distance >= SUSPICIOUS_DISTANCE:
+            shape |= SUSPICIOUS_DISTANCE_BIT
+    if minmass is not None:
+        shape |= MINMASS
+    if minmass_space:
+        shape |= MINMASS_SPACE
+    if date is not None:
+        shape |= DATE
+    if survey is not None:
+        shape |= SURVEY
+    return shape
+
+
+def compile_template(shape):
+    """Build the format template of every paragraph with the same shape (see paragraph_shape).
+
+    The shape decides the subject of each sentence (the pulsar's name or "It") and the conjunctions between them,
+    and the template has a placeholder for each value of the PulsarSections.
+    """
+    assoc_join = shape & 3
+    psrj = FIELDS['psrj']
+    named = f" PSR {psrj} "
+    pieces = [f"PSR {FIELDS['name']} is {FIELDS['period']}"]
+
+    # DISPERSION MEASURE
+    pieces.append(f" and has {FIELDS['dm']}." if shape & DM else '.')
+    # S1400
+    if shape & S1400:
+        pieces.append(f" It is {FIELDS['s1400']}.")
+    # Declination, which the associations carry on from
+    if shape & HEMISPHERE:
+        pieces.append(named if shape & S1400 else ' It ')
+        pieces.append(f"is a {FIELDS['hemisphere']} pulsar")
+        pieces.append({NO_ASSOC: '.', EXTRAGALACTIC: '.', CONTINUES: ' ', WITH: ' with '}[assoc_join])
+    # Association
+    if assoc_join == EXTRAGALACTIC:
+        pieces.append(f"It is {ASSOC_TEXT}")
+    elif assoc_join != NO_ASSOC:
+        pieces.append(ASSOC_TEXT)
+    pieces.append(FIELDS['pdot'])
+    # ORBITAL PERIOD and ECCENTRICITY share a sentence
+    if shape & PB:
+        pieces.append(f" PSR {psrj} {FIELDS['pb']}")
+        pieces.append(f" and {FIELDS['ecc']}." if shape & ECC else '.')
+    elif shape & ECC:
+        pieces.append(f" PSR {psrj} {FIELDS['ecc']}.")
+    # AGE, the pulsar is "It" after the orbit sentence
+    age_named = bool(shape & AGE) and not shape & PB
+    if shape & AGE:
+        pieces.append(f"{named}is {FIELDS['age']}." if age_named else f" It is {FIELDS['age']}.")
+    # BSURF
+    bsurf_named = bool(shape & BSURF) and not age_named
+    if shape & BSURF:
+        pieces.append(f"{named}has {FIELDS['bsurf']}." if bsurf_named else f" It has {FIELDS['bsurf']}.")
+    # VTRANS
+    if shape & VTRANS:
+        pieces.append(f" It has {FIELDS['vtrans']}." if bsurf_named else f"{named}has {FIELDS['vtrans']}.")
+    # DISTANCE
+    if shape & SUSPICIOUS_DISTANCE_BIT:
+        pieces.append(f" The YMD distance model suggests that the distance to {psrj} is {FIELDS['distance']} pc, but that is suspicious.")
+    elif shape & DISTANCE:
+        pieces.append(f" The estimated distance to {psrj} is {FIELDS['distance']} pc.")
+    # MINMASS
+    if shape & MINMASS_SPACE:
+        pieces.append(' ')
+    pieces.append(f"This pulsar has {FIELDS['minmass']}." if shape & MINMASS else 'This pulsar appears to be solitary.')
+    # YEAR and SURVEY
+    if shape & DATE and shape & SURVEY:
+        pieces.append(f" PSR {psrj} was discovered in {FIELDS['date']} as part of {FIELDS['survey']}.")
+    elif shape & DATE:
+        pieces.append(f" PSR {psrj} was discovered in {FIELDS['date']}.")
+    return ''.join(pieces)
+
+
+class SentencePlan:
+    """Builds paragraphs from PulsarSections with a template compiled for each paragraph shape.
+
+    Catalogues only have a few hundred different shapes, so after the first few pulsars each paragraph
+    is a lookup of its template and a single format. The paragraphs still need fix_paragraph_grammar for the
+    association descriptions.
+    """
+    def __init__(self):
+        self.templates = {}
+
+    def template(self, shape):
+        template = self.templates.get(shape)
+        if template is None:
+            template = self.templates[shape] = compile_template(shape)
+        return template
+
+    def render(self, sections):
+        return self.template(paragraph_shape(sections)).format(*sections)
+
+    def render_many(self, rows):
+        """The paragraph of each PulsarSections (or tuple of its fields) in rows."""
+        templates = self.templates
+        paragraphs = []
+        for row in rows:
+            shape = paragraph_shape(row)
+            template = templates.get(shape)
+            if template is None:
+                template = self.template(shape)
+            paragraphs.append(template.format(*row))
+        return paragraphs
+
+
+SENTENCE_PLAN = SentencePlan()
+
+
+def compose_paragraph(sections):
+    """Build the paragraph of one pulsar from its PulsarSections (see SentencePlan)."""
+    return SENTENCE_PLAN.render(sections)
@@ -0,0 +1,262 @@
+import sys
+import json
+import time
+import traceback
+import asyncio
+import argparse
+from functools import partial
+from urllib.parse import unquote
+
+from pulsar_paragraph.catalogue import DEFAULT_CACHE_TTL
+from pulsar_paragraph.load_data import load_links_index
+from pulsar_paragraph.names import NameIndex
+from pulsar_paragraph.pulsar_classes import PulsarParagraph
+from pulsar_paragraph.pulsar_paragraph import render_pulsar_paragraphs, select_pulsars
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8642
+# Requests with larger bodies are rejected
+MAX_BODY_SIZE = 1024 * 1024
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+
+class ParagraphIndex:
+    """The rendered paragraph of every pulsar in a catalogue, looked up by J or B name (see NameIndex).
+
+    An index is never changed after it is built, so a reload builds a new one and swaps it in
+    while requests already being answered keep using the old one.
+    """
+    def __init__(self, query, pulsar_paragraph, include_links=False):
+        self.psrjs = query['PSRJ'].tolist()
+        self.paragraphs = render_pulsar_paragraphs(query, pulsar_paragraph, include_links=include_links)
+        self.names = NameIndex.from_query(query)
+        self.loaded = time.time()
+
+    def __len__(self):
+        return len(self.paragraphs)
+
+    def lookup(self, name):
+        """The (PSRJ, paragraph) of the pulsar with the J or B name, or None if it isn't in the catalogue."""
+        position = self.names.lookup(name)
+        if position is None:
+            return None
+        return self.psrjs[position], self.paragraphs[position]
+
+
+class ParagraphServer:
+    """An HTTP server answering paragraph requests from a ParagraphIndex held in memory.
+
+    Endpoints:
+
+    - GET /paragraph/<name>: the paragraph of the pulsar (J or B name) as text/plain.
+    - POST /paragraphs: a JSON body {"pulsars": [names]} gives {"paragraphs": {name: paragraph}, "missing": [names]}.
+    - POST /reload: load the catalogue snapshot again (fetching a new catalogue if the body is {"refresh": true})
+      and swap it in without dropping requests in flight.
+    - GET /health: the number of pulsars and when they were loaded.
+
+    Parameters
+    ----------
+    load_query: callable
+        Called with refresh=True/False to load the catalogue DataFrame (see select_pulsars).
+    pulsar_paragraph: PulsarParagraph, optional
+        The variable gates used to describe each pulsar. Default: PulsarParagraph().
+    include_links: bool
+        Include links to pulsars.org.au and astronomy.swin.edu.au in the descriptions.
+    """
+    def __init__(self, load_query, pulsar_paragraph=None, include_links=False):
+        self.load_query = load_query
+        if pulsar_paragraph is None:
+            pulsar_paragraph = PulsarParagraph()
+        self.pulsar_paragraph = pulsar_paragraph
+        self.include_links = include_links
+        self.index = None
+        self._reload_lock = None
+
+    def build_index(self, refresh=False):
+        if self.include_links:
+            load_links_index()
+        return ParagraphIndex(self.load_query(refresh=refresh), self.pulsar_paragraph, include_links=self.include_links)
+
+    async def reload(self, refresh=False):
+        """Build a new index in a thread, so requests are still answered from the current index, then swap it in."""
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            index = await loop.run_in_executor(None, partial(self.build_index, refresh=refresh))
+            self.index = index
+        return index
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Load the catalogue (if it isn't already) and start listening. Returns the asyncio.Server."""
+        if self.index is None:
+            await self.reload()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            # Keep the connection open for more requests unless the client asks to close it
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(self.response(400, {'error': 'Malformed request line'}, keep_alive=False))
+                    break
+                body = b''
+                try:
+                    content_length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    content_length = -1
+                if content_length < 0:
+                    writer.write(self.response(400, {'error': 'Invalid Content-Length'}, keep_alive=False))
+                    break
+                if content_length > MAX_BODY_SIZE:
+                    writer.write(self.response(413, {'error': 'Request body too large'}, keep_alive=False))
+                    break
+                if content_length:
+                    body = await reader.readexactly(content_length)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    if method == 'POST' and target == '/reload':
+                        status, content = await self.handle_reload(body)
+                    else:
+                        status, content = self.route(method, target, body)
+                except Exception:
+                    # Answer rather than dropping the connection, and keep serving other requests
+                    traceback.print_exc()
+                    status, content = 500, {'error': 'Internal server error'}
+                writer.write(self.response(status, content, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, method, target, body):
+        """Answer a request (other than reload) from the current index.
+
+        Returns
+        -------
+        status: int
+            The HTTP status code.
+        content: str or dict
+            The text/plain or JSON response.
+        """
+        # Requests in flight keep the index they started with if a reload swaps in a new one
+        index = self.index
+        path = target.split('?', 1)[0]
+        if path.startswith('/paragraph/'):
+            if method != 'GET':
+                return 405, {'error': 'Use GET'}
+            name = unquote(path[len('/paragraph/'):])
+            found = index.lookup(name)
+            if found is None:
+                return 404, {'error': f'No pulsar named {name}', 'suggestions': index.names.suggest(name)}
+            return 200, found[1]
+        if path == '/paragraphs':
+            if method != 'POST':
+                return 405, {'error': 'Use POST'}
+            try:
+                names = json.loads(body)['pulsars']
+            except (ValueError, KeyError, TypeError):
+                names = None
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                return 400, {'error': 'The body must be JSON with a list of "pulsars"'}
+            paragraphs = {}
+            missing = []
+            for name in names:
+                found = index.lookup(name)
+                if found is None:
+                    missing.append(name)
+                else:
+                    paragraphs[name] = found[1]
+            return 200, {'paragraphs': paragraphs, 'missing': missing}
+        if path == '/health':
+            return 200, {'pulsars': len(index), 'loaded': index.loaded}
+        return 404, {'error': f'Unknown endpoint {path}'}
+
+    async def handle_reload(self, body):
+        try:
+            refresh = bool(json.loads(body).get('refresh', False)) if body else False
+        except (ValueError, AttributeError):
+            return 400, {'error': 'The body must be JSON'}
+        try:
+            index = await self.reload(refresh=refresh)
+        except Exception as e:
+            # Keep serving the current index
+            return 500, {'error': f'Reload failed: {e}'}
+        return 200, {'pulsars': len(index), 'loaded': index.loaded}
+
+    @staticmethod
+    def response(status, content, keep_alive=True):
+        if isinstance(content, str):
+            content_type = 'text/plain; charset=utf-8'
+            body = content.encode()
+        else:
+            content_type = 'application/json'
+            body = json.dumps(content).encode()
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode('latin-1') + body
+
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    asyncio_server = await server.start(host, port)
+    print(f"Serving {len(server.index)} pulsar paragraphs on http://{host}:{port}", file=sys.stderr)
+    async with asyncio_server:
+        await asyncio_server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pulsar_paragraph serve", description="Serve pulsar paragraphs over HTTP from a catalogue held in memory.")
+
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on. Default: %(default)s (only this machine).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on. Default: %(default)s.")
+    parser.add_argument("-l", "--include_links", action="store_true", help="Include links to pulsars.org.au and astronomy.swin.edu.au in the descriptions.")
+    parser.add_argument("--offline", action="store_true", help="Never use the network, only the cached catalogue snapshot.")
+    parser.add_argument("--cache_dir", help="Directory of the cached catalogue snapshots. Default: $PULSAR_PARAGRAPH_CACHE or ~/.cache/pulsar_paragraph.")
+    parser.add_argument("--cache_ttl", type=float, default=DEFAULT_CACHE_TTL, help="Seconds a cached catalogue snapshot is used before the ATNF catalogue is checked again. Default: %(default)s (one week).")
+
+    args = parser.parse_args(argv)
+
+    def load_query(refresh=False):
+        return select_pulsars(
+            refresh=refresh and not args.offline,
+            offline=args.offline,
+            cache_dir=args.cache_dir,
+            cache_ttl=args.cache_ttl,
+        )
+
+    server = ParagraphServer(load_query, include_links=args.include_links)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import os
+import json
+import mmap
+
+import numpy as np
+
+from pulsar_paragraph.names import normalize_name
+
+
+# Bump when the layout of the store changes, which makes it start again empty
+STORE_FORMAT = 1
+# Names are stored in fixed width fields of this many bytes
+MAX_NAME_LENGTH = 32
+# An entry of the sorted name index. alias is 1 for B names, which point at the same record as the J name.
+INDEX_DTYPE = np.dtype([
+    ('name', f'S{MAX_NAME_LENGTH}'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('alias', 'u1'),
+])
+DATA_FILE = 'paragraphs.dat'
+INDEX_FILE = 'paragraphs.idx'
+METADATA_FILE = 'store.json'
+# The data file is compacted when it is more than this many times the size of the current records
+COMPACT_RATIO = 2
+
+
+class ParagraphStore:
+    """An on-disk store of paragraphs that can be looked up by J or B name without loading the catalogue.
+
+    Records are appended to a data file as "PSRJ\\tPSRB\\tparagraph\\n". A sorted index of every J and B name with the
+    offset and length of its record is memory-mapped when the store is opened, so a lookup is a binary search
+    and one read. Updates append the new records and atomically replace the index, so a reader never sees a partial
+    update. Replaced records are left in the data file until compact is called, which update does when they take up
+    most of the file.
+
+    Parameters
+    ----------
+    path: str
+        The store directory, created if it doesn't exist.
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.metadata = self._read_metadata()
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_metadata(self):
+        try:
+            with open(self._file(METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            metadata = None
+        if metadata is None or metadata.get('format') != STORE_FORMAT:
+            metadata = {'format': STORE_FORMAT, 'fingerprint': None, 'pulsars': 0}
+        return metadata
+
+    def _open(self):
+        self.index = self._read_index()
+        self.names = self.index['name']
+        self._data_file = None
+        self.data = b''
+        if len(self.index):
+            self._data_file = open(self._file(DATA_FILE), 'rb')
+            self.data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_index(self):
+        index_path = self._file(INDEX_FILE)
+        if not os.path.isfile(index_path) or os.path.getsize(index_path) == 0:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.memmap(index_path, dtype=INDEX_DTYPE, mode='r')
+
+    def close(self):
+        if self._data_file is not None:
+            self.data.close()
+            self._data_file.close()
+            self._data_file = None
+        self.index = self.names = None
+
+    @property
+    def fingerprint(self):
+        """The render_fingerprint the stored paragraphs were rendered with."""
+        return self.metadata['fingerprint']
+
+    def __len__(self):
+        return self.metadata['pulsars']
+
+    def _read_record(self, offset, length):
+        psrj, psrb, paragraph = self.data[offset:offset + length].decode().rstrip('\n').split('\t', 2)
+        return psrj, psrb or None, paragraph
+
+    def get(self, name):
+        """The (PSRJ, paragraph) of the pulsar with the J or B name, or None if it isn't in the store."""
+        key = name.encode()
+        position = int(np.searchsorted(self.names, key))
+        if position == len(self.names) or self.names[position] != key:
+            return None
+        entry = self.index[position]
+        psrj, _, paragraph = self._read_record(int(entry['offset']), int(entry['length']))
+        return psrj, paragraph
+
+    def scan(self, prefix):
+        """The (PSRJ, paragraph) of every pulsar with a J or B name starting with prefix (e.g. "J04"), sorted by PSRJ."""
+        key = prefix.encode()
+        start = int(np.searchsorted(self.names, key, side='left'))
+        # Every name starting with the prefix sorts before the prefix followed by the largest byte
+        end = int(np.searchsorted(self.names, key + b'\xff' * (MAX_NAME_LENGTH - len(key)), side='right'))
+        records = {}
+        for entry in self.index[start:end]:
+            psrj, _, paragraph = self._read_record(int(entry['offset']), int(entry['length']))
+            records[psrj] = paragraph
+        return sorted(records.items())
+
+    def records(self):
+        """Every stored (PSRJ, PSRB, paragraph), sorted by PSRJ."""
+        return [
+            self._read_record(int(entry['offset']), int(entry['length']))
+            for entry in self.index[self.index['alias'] == 0]
+        ]
+
+    def update(self, records, fingerprint, removed=(), replace=False):
+        """Add or replace the paragraphs of some pulsars.
+
+        Parameters
+        ----------
+        records: list
+            The (PSRJ, PSRB or None, paragraph) of each pulsar to add or replace.
+        fingerprint: str
+            The render_fingerprint the paragraphs were rendered with. If it is different to the store's
+            the other stored paragraphs are out of date so they are all removed.
+        removed: list, optional
+            The J names of pulsars to remove.
+        replace: bool
+            Remove every pulsar that isn't in records.
+        """
+        if fingerprint != self.fingerprint:
+            replace = True
+        pulsars = {}
+        if not replace:
+            # The current (offset, length, B name) of each pulsar
+            for psrj, psrb, offset, length in self._entries():
+                pulsars[psrj] = (offset, length, psrb)
+        for psrj in removed:
+            pulsars.pop(psrj, None)
+
+        data_path = self._file(DATA_FILE)
+        if replace:
+            # Start a new data file, readers with the old one open keep reading it
+            data_path_new = f'{data_path}.tmp'
+            mode = 'wb'
+        else:
+            data_path_new = data_path
+            mode = 'ab'
+        with open(data_path_new, mode) as f:
+            offset = f.seek(0, os.SEEK_END)
+            for psrj, psrb, paragraph in records:
+                for name in (psrj, psrb):
+                    if name is not None and len(name.encode()) > MAX_NAME_LENGTH:
+                        raise ValueError(f"Pulsar name {name} is longer than {MAX_NAME_LENGTH} bytes")
+                record = f"{psrj}\t{psrb or ''}\t{paragraph}\n".encode()
+                f.write(record)
+                pulsars[psrj] = (offset, len(record), psrb)
+                offset += len(record)
+        if replace:
+            os.replace(data_path_new, data_path)
+
+        self._write_index(pulsars)
+        self.metadata = {'format': STORE_FORMAT, 'fingerprint': fingerprint, 'pulsars': len(pulsars)}
+        self._write_json(METADATA_FILE, self.metadata)
+        self.close()
+        self._open()
+        if not replace and offset > COMPACT_RATIO * sum(length for _, length, _ in pulsars.values()):
+            self.compact()
+
+    def _entries(self):
+        """The (PSRJ, PSRB or None, offset, length) of each stored pulsar."""
+        psrb_of_offset = {
+            int(entry['offset']): entry['name'].decode()
+            for entry in self.index[self.index['alias'] == 1]
+        }
+        return [
+            (entry['name'].decode(), psrb_of_offset.get(int(entry['offset'])), int(entry['offset']), int(entry['length']))
+            for entry in self.index[self.index['alias'] == 0]
+        ]
+
+    def _write_index(self, pulsars):
+        entries = []
+        for psrj, (offset, length, psrb) in pulsars.items():
+            entries.append((psrj.encode(), offset, length, 0))
+            if psrb is not None:
+                entries.append((psrb.encode(), offset, length, 1))
+        index = np.array(entries, dtype=INDEX_DTYPE)
+        index.sort(order='name')
+        index_path = self._file(INDEX_FILE)
+        index.tofile(f'{index_path}.tmp')
+        os.replace(f'{index_path}.tmp', index_path)
+
+    def _write_json(self, name, content):
+        path = self._file(name)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(content, f)
+        os.replace(f'{path}.tmp', path)
+
+    def compact(self):
+        """Rewrite the data file without the records that have been replaced or removed."""
+        self.update(self.records(), self.fingerprint, replace=True)
+
+
+def stored_paragraphs(store, pulsar_names, fingerprint):
+    """Get the paragraphs of pulsar_names from a ParagraphStore without loading the catalogue.
+
+    Names ending in "*" are prefix scans, e.g. "J04*".
+
+    Returns
+    -------
+    paragraphs: list or None
+        The (PSRJ, paragraph) of each pulsar sorted by PSRJ, or None if the store was rendered with a different
+        render_fingerprint or any of the names (or prefixes) aren't in it.
+    """
+    if store.fingerprint != fingerprint:
+        return None
+    paragraphs = {}
+    for name in map(normalize_name, pulsar_names):
+        if name.endswith('*'):
+            found = store.scan(name.rstrip('*'))
+            if not found:
+                return None
+            paragraphs.update(found)
+        else:
+            found = store.get(name)
+            if found is None:
+                return None
+            paragraphs[found[0]] = found[1]
+    return sorted(paragraphs.items())
@@ -0,0 +1,234 @@
+import io
+import os
+import csv
+import sys
+import json
+import gzip
+import sqlite3
+
+
+# The fields of each paragraph record, the derived quantities are from derive_quantities
+RECORD_FIELDS = ['PSRJ', 'PSRB', 'paragraph', 'P1_CORR', 'AGE_CORR', 'BSURF_CORR']
+# Number of records buffered before they are written
+DEFAULT_BUFFER_SIZE = 1024
+FORMAT_EXTENSIONS = {
+    '.txt': 'txt',
+    '.jsonl': 'jsonl',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.sqlite': 'sqlite',
+    '.db': 'sqlite',
+}
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.zst': 'zstd',
+}
+
+
+def infer_format(path):
+    """Guess the (format, compression) of an output file from its extensions, e.g. paragraphs.jsonl.gz is ("jsonl", "gzip").
+
+    Either is None if it can't be worked out.
+    """
+    if path is None:
+        return None, None
+    root, extension = os.path.splitext(path)
+    compression = COMPRESSION_EXTENSIONS.get(extension)
+    if compression is not None:
+        root, extension = os.path.splitext(root)
+    return FORMAT_EXTENSIONS.get(extension), compression
+
+
+def open_text_stream(path=None, compression=None, newline=None):
+    """Open a text stream to write to path (or stdout if None), compressed with gzip or zstd.
+
+    Returns
+    -------
+    stream: file object
+        The text stream.
+    close: bool
+        Whether the stream should be closed when finished (stdout isn't).
+    """
+    if compression is None:
+        if path is None:
+            return sys.stdout, False
+        return open(path, 'w', newline=newline, encoding='utf-8'), True
+    if compression == 'gzip':
+        binary = gzip.open(path, 'wb') if path is not None else gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression needs the zstandard package (pip install zstandard)")
+        raw = open(path, 'wb') if path is not None else sys.stdout.buffer
+        binary = zstandard.ZstdCompressor().stream_writer(raw, closefd=path is not None)
+    else:
+        raise ValueError(f"Unknown compression {compression}, use gzip or zstd")
+    # Closing the text stream finishes the compressed stream but never closes stdout
+    return io.TextIOWrapper(binary, encoding='utf-8', newline=newline, write_through=True), True
+
+
+class ParagraphWriter:
+    """Base class of the writers of paragraph records, dicts of the RECORD_FIELDS.
+
+    Records are buffered and written buffer_size at a time by write_records, which each format implements.
+    Use as a context manager, or call close, so the last records are written.
+    """
+    # Whether the format is a text stream that can be compressed and written to stdout
+    text = True
+
+    def __init__(self, path=None, compression=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        if not self.text and path is None:
+            raise ValueError(f"{type(self).__name__} needs an output file")
+        self.path = path
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self.stream, self._close_stream = open_text_stream(self.path, self.compression)
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self.buffer:
+            self.write_records(self.buffer)
+            self.buffer = []
+
+    def write_records(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+        self.close_output()
+
+    def close_output(self):
+        if self._close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class TextWriter(ParagraphWriter):
+    """One paragraph per line, without the pulsar names (the original output format)."""
+    def write_records(self, records):
+        self.stream.write(''.join(record['paragraph'] + '\n' for record in records))
+        self.stream.flush()
+
+
+class JSONLWriter(ParagraphWriter):
+    """One JSON object of the RECORD_FIELDS per line."""
+    def write_records(self, records):
+        self.stream.write(''.join(json.dumps({field: record.get(field) for field in RECORD_FIELDS}) + '\n' for record in records))
+        self.stream.flush()
+
+
+class CSVWriter(ParagraphWriter):
+    """CSV with a header of the RECORD_FIELDS, missing values are empty."""
+    def open(self):
+        # The csv module does its own line endings
+        self.stream, self._close_stream = open_text_stream(self.path, self.compression, newline='')
+        self.csv_writer = csv.writer(self.stream)
+        self.csv_writer.writerow(RECORD_FIELDS)
+
+    def write_records(self, records):
+        self.csv_writer.writerows([record.get(field) for field in RECORD_FIELDS] for record in records)
+        self.stream.flush()
+
+
+class ParquetWriter(ParagraphWriter):
+    """Parquet file of the RECORD_FIELDS with a row group per buffer of records. Needs pyarrow.
+
+    compression is the Parquet codec of the columns (default snappy).
+    """
+    text = False
+
+    def open(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs the pyarrow package (pip install pyarrow)")
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema(
+            [(field, pyarrow.string()) for field in RECORD_FIELDS[:3]]
+            + [(field, pyarrow.float64()) for field in RECORD_FIELDS[3:]]
+        )
+        self.parquet_writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression or 'snappy')
+
+    def write_records(self, records):
+        columns = {field: [record.get(field) for record in records] for field in RECORD_FIELDS}
+        self.parquet_writer.write_table(self.pyarrow.table(columns, schema=self.schema))
+
+    def close_output(self):
+        self.parquet_writer.close()
+
+
+class SQLiteWriter(ParagraphWriter):
+    """SQLite database with a paragraphs table of the RECORD_FIELDS keyed by PSRJ. Each buffer of records is inserted in one transaction."""
+    text = False
+
+    def open(self):
+        if self.compression is not None:
+            raise ValueError("SQLite output can't be compressed")
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS paragraphs '
+                '(PSRJ TEXT PRIMARY KEY, PSRB TEXT, paragraph TEXT NOT NULL, P1_CORR REAL, AGE_CORR REAL, BSURF_CORR REAL)'
+            )
+
+    def write_records(self, records):
+        placeholders = ', '.join('?' * len(RECORD_FIELDS))
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO paragraphs ({', '.join(RECORD_FIELDS)}) VALUES ({placeholders})",
+                [tuple(record.get(field) for field in RECORD_FIELDS) for record in records],
+            )
+
+    def close_output(self):
+        self.connection.close()
+
+
+WRITERS = {
+    'txt': TextWriter,
+    'jsonl': JSONLWriter,
+    'csv': CSVWriter,
+    'parquet': ParquetWriter,
+    'sqlite': SQLiteWriter,
+}
+
+
+def open_writer(path=None, format=None, compression=None, buffer_size=DEFAULT_BUFFER_SIZE):
+    """Open the ParagraphWriter for format (default from the extension of path, or txt).
+
+    Parameters
+    ----------
+    path: str, optional
+        The output file. Default: stdout (text formats only).
+    format: str, optional
+        One of WRITERS.
+    compression: str, optional
+        "gzip" or "zstd" for the text formats, or the Parquet codec. Default: from the extension of path.
+    buffer_size: int
+        Number of records written at a time.
+    """
+    inferred_format, inferred_compression = infer_format(path)
+    format = format or inferred_format or 'txt'
+    if compression is None and WRITERS[format].text:
+        compression = inferred_compression
+    return WRITERS[format](path, compression=compression, buffer_size=buffer_size)
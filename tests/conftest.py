@@ -0,0 +1,28 @@
+import os
+
+import psrqpy
+import pytest
+
+
+TEST_DB = os.path.join(os.path.dirname(__file__), 'data', 'psrcat_test.db')
+
+
+@pytest.fixture(scope="session")
+def catalogue():
+    """A small subset of the ATNF catalogue loaded the same way as the real one."""
+    return psrqpy.QueryATNF(loadfromdb=TEST_DB).pandas
+
+
+@pytest.fixture
+def full_assoc_catalogue(catalogue):
+    """The test catalogue with the full ASSOC strings and string discovery dates."""
+    query = catalogue.copy()
+    query['ASSOC'] = query['ASSOC_ORIG']
+    query['DATE'] = query['DATE'].astype(int).astype(str)
+    return query
+
+
+@pytest.fixture
+def psrcat_db():
+    """The path of the test psrcat.db file the catalogue fixture is loaded from."""
+    return TEST_DB
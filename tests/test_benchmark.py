@@ -0,0 +1,23 @@
+import json
+
+from pulsar_paragraph.benchmark import STAGES, run_scenario, synthetic_catalogue
+from pulsar_paragraph.pulsar_paragraph import PARAGRAPH_COLUMNS, create_pulsar_paragraph
+
+
+def test_synthetic_catalogue():
+    query = synthetic_catalogue(2000, seed=1)
+    assert list(query.columns) == PARAGRAPH_COLUMNS
+    assert query['PSRJ'].is_unique
+    # Roughly the catalogue's missing value rates
+    assert 0.1 < query['ASSOC'].isna().mean() < 0.9
+    assert 0.8 < query['VTRANS'].isna().mean() < 1.0
+    assert synthetic_catalogue(10, seed=1).equals(synthetic_catalogue(10, seed=1))
+    assert len(create_pulsar_paragraph(query=query)) == 2000
+
+
+def test_run_scenario(tmp_path):
+    result = run_scenario(200, work_dir=str(tmp_path))
+    assert list(result['stages']) == STAGES
+    assert result['n_pulsars'] == 200
+    assert result['total'] > 0
+    json.dumps(result)
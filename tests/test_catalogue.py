@@ -0,0 +1,57 @@
+import pytest
+
+from pulsar_paragraph import catalogue as catalogue_module
+from pulsar_paragraph.catalogue import load_catalogue, read_snapshot_index, read_snapshot_metadata
+
+
+@pytest.fixture
+def fetches(monkeypatch, catalogue):
+    """Replace the ATNF download with the test catalogue and record each fetch."""
+    fetched = []
+    def fake_fetch_catalogue(version='latest', refresh=False, columns=None):
+        fetched.append(version if columns is None else columns)
+        return catalogue if columns is None else catalogue[columns], '2.6.1'
+    monkeypatch.setattr(catalogue_module, 'fetch_catalogue', fake_fetch_catalogue)
+    return fetched
+
+
+def test_snapshot_cache(tmp_path, fetches, catalogue):
+    query = load_catalogue(cache_dir=tmp_path)
+    assert fetches == ['latest']
+    assert read_snapshot_metadata(tmp_path)['version'] == '2.6.1'
+    # A warm cache doesn't fetch again
+    cached = load_catalogue(cache_dir=tmp_path)
+    assert fetches == ['latest']
+    assert cached.equals(query)
+    # Refreshing always fetches
+    load_catalogue(cache_dir=tmp_path, refresh=True)
+    assert fetches == ['latest', 'latest']
+    # An expired snapshot is fetched again, unless offline
+    load_catalogue(cache_dir=tmp_path, ttl=0, offline=True)
+    assert len(fetches) == 2
+    load_catalogue(cache_dir=tmp_path, ttl=0)
+    assert len(fetches) == 3
+    # Versioned snapshots never expire
+    load_catalogue(version='2.6.1', cache_dir=tmp_path, ttl=0)
+    assert len(fetches) == 3
+
+
+def test_offline_without_snapshot(tmp_path, fetches):
+    with pytest.raises(FileNotFoundError):
+        load_catalogue(cache_dir=tmp_path, offline=True)
+    assert fetches == []
+
+
+def test_snapshot_column_projection(tmp_path, fetches, catalogue):
+    query = load_catalogue(columns=['PSRJ', 'P0'], cache_dir=tmp_path)
+    assert list(query.columns) == ['PSRJ', 'P0']
+    assert fetches == [['PSRJ', 'P0']]
+    # Only the requested columns are read from the snapshot
+    assert list(load_catalogue(columns=['P0'], cache_dir=tmp_path).columns) == ['P0']
+    assert len(fetches) == 1
+    # Missing columns are fetched along with the ones already in the snapshot
+    query = load_catalogue(columns=['DM'], cache_dir=tmp_path)
+    assert fetches[-1] == ['DM', 'PSRJ', 'P0']
+    assert list(query.columns) == ['DM']
+    assert query['DM'].equals(catalogue['DM'])
+    assert read_snapshot_index('2.6.1', tmp_path) == {'columns': ['DM', 'PSRJ', 'P0'], 'complete': False}
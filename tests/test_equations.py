@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from pulsar_paragraph.pulsar_paragraph import shklovski_pdot_correction
+from pulsar_paragraph.pulsar_paragraph import derive_quantities, shklovski_pdot_correction
 
 def test_shklovski_pdot_correction():
     pdot = 5.729214736380701e-20
@@ -8,4 +9,18 @@ def test_shklovski_pdot_correction():
     dist = 0.15679
     vtrans = 104.74457137561224
     pdot_corrected = shklovski_pdot_correction(pdot, p, dist, vtrans)
-    assert pdot_corrected == pytest.approx(1.34e-20, rel=1e-2)
\ No newline at end of file
+    assert pdot_corrected == pytest.approx(1.34e-20, rel=1e-2)
+
+def test_derive_quantities(catalogue):
+    derived = derive_quantities(catalogue)
+    for _, row in derived.iterrows():
+        if np.isnan(row['P0']) or np.isnan(row['P1']) or np.isnan(row['DIST']) or np.isnan(row['VTRANS']):
+            assert row['P1_CORR'] == row['P1'] or np.isnan(row['P1_CORR'])
+            assert row['AGE_CORR'] == row['AGE'] or np.isnan(row['AGE_CORR'])
+        else:
+            pdot = shklovski_pdot_correction(row['P1'], row['P0'], row['DIST'], row['VTRANS'])
+            assert row['P1_CORR'] == pdot
+            assert row['AGE_CORR'] == row['P0'] / ( 2 * pdot ) * 3.1688087814029e-8
+            assert row['BSURF_CORR'] == 3.2e19 * np.sqrt( row['P0'] * pdot )
+    # The input catalogue is left untouched
+    assert 'P1_CORR' not in catalogue.columns
@@ -0,0 +1,51 @@
+from pulsar_paragraph import incremental
+from pulsar_paragraph.catalogue import write_snapshot
+from pulsar_paragraph.incremental import read_manifest
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph, main, update_pulsar_paragraphs
+
+
+def test_update_pulsar_paragraphs(catalogue, tmp_path):
+    manifest_path = str(tmp_path / 'manifest.json')
+    expected = list(zip(catalogue['PSRJ'], create_pulsar_paragraph(query=catalogue)))
+
+    paragraphs, changes = update_pulsar_paragraphs(manifest_path, query=catalogue)
+    assert paragraphs == expected
+    assert changes == {'new': catalogue['PSRJ'].tolist(), 'changed': [], 'removed': []}
+
+    # Nothing has changed so nothing is rendered
+    paragraphs, changes = update_pulsar_paragraphs(manifest_path, query=catalogue)
+    assert paragraphs == expected
+    assert changes == {'new': [], 'changed': [], 'removed': []}
+
+    # A new catalogue release with one pulsar changed and one removed
+    release = catalogue[catalogue['PSRJ'] != 'J2144-3933'].copy()
+    release.loc[release['PSRJ'] == 'J0437-4715', 'P0'] = 0.5
+    paragraphs, changes = update_pulsar_paragraphs(manifest_path, query=release)
+    assert paragraphs == list(zip(release['PSRJ'], create_pulsar_paragraph(query=release)))
+    assert changes == {'new': [], 'changed': ['J0437-4715'], 'removed': ['J2144-3933']}
+    assert 'J2144-3933' not in read_manifest(manifest_path)['pulsars']
+
+    # Changing the settings renders everything again
+    _, changes = update_pulsar_paragraphs(manifest_path, query=release, include_links=True)
+    assert changes['new'] == release['PSRJ'].tolist()
+
+
+def test_render_version(catalogue, tmp_path, monkeypatch):
+    manifest_path = str(tmp_path / 'manifest.json')
+    update_pulsar_paragraphs(manifest_path, query=catalogue)
+    # A release that changes the wording renders every paragraph again
+    monkeypatch.setattr(incremental, 'RENDER_VERSION', incremental.RENDER_VERSION + 1)
+    _, changes = update_pulsar_paragraphs(manifest_path, query=catalogue)
+    assert changes['new'] == catalogue['PSRJ'].tolist()
+
+
+def test_main_incremental_records(catalogue, tmp_path):
+    write_snapshot(catalogue, '2.6.1', cache_dir=str(tmp_path), complete=True)
+    options = ['--offline', '--cache_dir', str(tmp_path)]
+    manifest_path = str(tmp_path / 'manifest.json')
+    main(options + ['-o', str(tmp_path / 'full.jsonl')])
+    # The first incremental run renders everything, the second reuses the manifest's paragraphs
+    for _ in range(2):
+        main(options + ['--incremental', manifest_path, '-o', str(tmp_path / 'incremental.jsonl')])
+        assert (tmp_path / 'incremental.jsonl').read_text() == (tmp_path / 'full.jsonl').read_text()
+    assert '"PSRB": "B0021-72C"' in (tmp_path / 'incremental.jsonl').read_text()
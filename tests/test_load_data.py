@@ -0,0 +1,11 @@
+import csv
+
+from pulsar_paragraph.load_data import get_data_path, load_links_index
+
+
+def test_links_index_matches_csv():
+    # If this fails, rerun pulsar_paragraph.load_data.compile_links_index() after updating the CSV
+    with open(get_data_path('pulsars-links_available.csv'), newline='') as f:
+        psrs_available = {row[0] for row in csv.reader(f) if row}
+    assert load_links_index() == psrs_available
+    assert 'J0437-4715' in load_links_index()
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from pulsar_paragraph.names import NameIndex, NameMatcher, normalize_name
+from pulsar_paragraph.pulsar_paragraph import select_pulsars
+
+
+def test_normalize_name():
+    assert normalize_name('J0437−4715') == 'J0437-4715'
+    assert normalize_name(' psr j0437–4715 ') == 'J0437-4715'
+    assert normalize_name('PSR B0531+21') == 'B0531+21'
+    assert normalize_name('J04*') == 'J04*'
+
+
+def test_name_index(catalogue):
+    index = NameIndex.from_query(catalogue)
+    psrjs = catalogue['PSRJ'].tolist()
+    assert psrjs[index.lookup('J0437−4715')] == 'J0437-4715'
+    assert psrjs[index.lookup('b0531+21')] == 'J0534+2200'
+    assert psrjs[index.lookup('0833-45')] == 'J0835-4510'
+    assert psrjs[index.lookup('j1748-2446a')] == 'J1748-2446A'
+    assert index.lookup('J9999+9999') is None
+
+    positions, missing = index.resolve(['J2144-3933', 'B0531+21', 'J0534+2200', 'J08*', 'J9*', 'nothing'])
+    assert [psrjs[position] for position in positions] == ['J0534+2200', 'J0835-4510', 'J2144-3933']
+    assert missing == ['J9*', 'nothing']
+    assert index.suggest('J0534+2201')[0] == 'J0534+2200'
+
+
+def test_name_index_case():
+    # Names only differing in case are found by their exact case
+    index = NameIndex(['J1748-2446A', 'J1748-2446a', 'J0000+0000'], [np.nan, '*', 'B2357-00'])
+    assert index.lookup('J1748-2446a') == 1
+    assert index.lookup('j1748-2446A') == 0
+    assert index.lookup('b2357-00') == 2
+    assert len(index) == 4
+
+
+def test_name_matcher(catalogue):
+    matcher = NameMatcher(['J2144-3933', 'b0531+21', 'J0534+2200', 'J08*', 'J9*', 'nothing'])
+    chunks = [catalogue.iloc[:4], catalogue.iloc[4:]]
+    matched = [chunk['PSRJ'].iloc[matcher.match(chunk['PSRJ'].tolist(), chunk['PSRB'].tolist())].tolist() for chunk in chunks]
+    assert matched == [['J0534+2200', 'J0835-4510'], ['J2144-3933']]
+    assert matcher.missing() == ['J9*', 'nothing']
+
+
+def test_select_pulsars(catalogue):
+    with pytest.warns(UserWarning, match='did you mean J0437-4715'):
+        query = select_pulsars(['J0437−4715', 'j0534+2200', 'J0437-4716'], query=catalogue)
+    assert query['PSRJ'].tolist() == ['J0437-4715', 'J0534+2200']
@@ -0,0 +1,29 @@
+from pulsar_paragraph.paragraph_cache import ParagraphCache
+from pulsar_paragraph.pulsar_classes import PulsarParagraph, VariableGate
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph
+
+
+def test_paragraph_cache(catalogue, tmp_path):
+    expected = create_pulsar_paragraph(query=catalogue)
+    with ParagraphCache(str(tmp_path / 'paragraphs.sqlite')) as paragraph_cache:
+        assert create_pulsar_paragraph(query=catalogue, paragraph_cache=paragraph_cache) == expected
+        assert (paragraph_cache.hits, paragraph_cache.misses) == (0, len(catalogue))
+        assert create_pulsar_paragraph(query=catalogue, paragraph_cache=paragraph_cache) == expected
+        assert (paragraph_cache.hits, paragraph_cache.misses) == (len(catalogue), len(catalogue))
+
+        # A different gate set can't reuse the cached paragraphs
+        pulsar_paragraph = PulsarParagraph()
+        pulsar_paragraph.dm.add_gate(VariableGate('dm', 1e4, 1e5, 'an absurd dispersion measure of'))
+        assert create_pulsar_paragraph(query=catalogue, pulsar_paragraph=pulsar_paragraph, paragraph_cache=paragraph_cache) == expected
+        assert paragraph_cache.stats() == {'hits': 8, 'misses': 16, 'hit_rate': 1 / 3, 'entries': 16}
+
+
+def test_paragraph_cache_eviction(tmp_path):
+    with ParagraphCache(str(tmp_path / 'paragraphs.sqlite'), max_entries=2) as paragraph_cache:
+        paragraph_cache.put_many({'a': 'A'})
+        paragraph_cache.put_many({'b': 'B'})
+        # Using a makes b the least recently used
+        assert paragraph_cache.get_many(['a']) == {'a': 'A'}
+        paragraph_cache.put_many({'c': 'C'})
+        assert paragraph_cache.get_many(['a', 'b', 'c']) == {'a': 'A', 'c': 'C'}
+        assert len(paragraph_cache) == 2
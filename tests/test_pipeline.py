@@ -0,0 +1,71 @@
+import json
+import time
+
+import pytest
+
+from pulsar_paragraph.pipeline import CSVSource, Pipeline, PsrcatDBSource, QuerySource, run_pipeline
+from pulsar_paragraph.pulsar_paragraph import PARAGRAPH_COLUMNS, iter_pulsar_records
+from pulsar_paragraph.writers import open_writer
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_pipeline(catalogue, tmp_path):
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        pipeline = Pipeline(QuerySource(catalogue), writer, chunk_size=3, queue_size=1)
+        assert pipeline.run() == len(catalogue)
+    assert read_jsonl(tmp_path / 'paragraphs.jsonl') == list(iter_pulsar_records(query=catalogue))
+    # 8 pulsars in chunks of 3
+    assert pipeline.calls == {'load': 3, 'derive': 3, 'render': 3, 'write': 3}
+
+
+def test_csv_source(catalogue, tmp_path):
+    catalogue[PARAGRAPH_COLUMNS].to_csv(tmp_path / 'catalogue.csv', index=False)
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        run_pipeline(CSVSource(str(tmp_path / 'catalogue.csv'), read_size=5), writer, chunk_size=2, pulsar_names=['J0534+2200', 'B0833-45'])
+    records = read_jsonl(tmp_path / 'paragraphs.jsonl')
+    expected = list(iter_pulsar_records(query=catalogue, pulsar_names=['J0534+2200', 'B0833-45']))
+    assert [record['PSRJ'] for record in records] == [record['PSRJ'] for record in expected]
+    assert records == expected
+
+
+def test_pipeline_missing_names(catalogue, tmp_path):
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        with pytest.warns(UserWarning, match='No pulsar named J0437-4716 in the catalogue'):
+            run_pipeline(QuerySource(catalogue), writer, chunk_size=2, pulsar_names=['J0437-4716', 'b0531+21', 'J08*'])
+    assert [record['PSRJ'] for record in read_jsonl(tmp_path / 'paragraphs.jsonl')] == ['J0534+2200', 'J0835-4510']
+
+
+def test_pipeline_jobs(catalogue, tmp_path):
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        run_pipeline(QuerySource(catalogue), writer, chunk_size=1, jobs=2)
+    assert read_jsonl(tmp_path / 'paragraphs.jsonl') == list(iter_pulsar_records(query=catalogue))
+
+
+def test_pipeline_error(catalogue, tmp_path):
+    class FailingWriter:
+        def write_many(self, records):
+            raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        run_pipeline(QuerySource(catalogue), FailingWriter(), chunk_size=1, queue_size=1)
+
+
+def test_pipeline_jobs_error(catalogue):
+    class FailingWriter:
+        def write_many(self, records):
+            # Let the render stage finish and queue its end marker behind the rendered chunks
+            time.sleep(0.5)
+            raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        run_pipeline(QuerySource(catalogue), FailingWriter(), chunk_size=2, jobs=2)
+
+
+def test_psrcat_db_source(psrcat_db, tmp_path):
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        run_pipeline(PsrcatDBSource(psrcat_db), writer, chunk_size=3)
+    assert read_jsonl(tmp_path / 'paragraphs.jsonl') == list(iter_pulsar_records(query=psrcat_db))
@@ -0,0 +1,23 @@
+from pulsar_paragraph import profiling
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph
+
+
+def test_profiling_disabled():
+    assert profiling.enabled_profiler() is None
+    # The same do-nothing stage is used for everything
+    assert profiling.stage('rewrite') is profiling.stage('dec_law', 10)
+
+
+def test_profile_create_pulsar_paragraph(catalogue):
+    profiler = profiling.enable()
+    try:
+        paragraphs = create_pulsar_paragraph(query=catalogue)
+    finally:
+        assert profiling.disable() is profiler
+    assert paragraphs == create_pulsar_paragraph(query=catalogue)
+
+    stats = profiler.stats()
+    for stage in ['variable_value_to_str:period', 'variable_value_to_str:s1400', 'assoc_to_str', 'dec_law', 'p1_to_str', 'distance_override', 'rewrite']:
+        assert stats[stage]['calls'] == len(catalogue)
+        assert stats[stage]['seconds'] >= 0
+    assert 'assoc_to_str' in profiler.format_table()
@@ -0,0 +1,107 @@
+import numpy as np
+import psrqpy
+import pytest
+
+from pulsar_paragraph.psrcat_db import iter_psrcat_db, minimum_companion_mass, parse_error, read_psrcat_db
+from pulsar_paragraph.pulsar_paragraph import PARAGRAPH_COLUMNS, create_pulsar_paragraph
+
+
+# Pulsars with the parameters that are derived from others (F0, F1, FB0, EPS1/EPS2, PX, DIST_AMN/DIST_AMX, decimal DECJ)
+DERIVED_DB = """#CATALOGUE 2.6.1
+PSRJ     J0101-0101                    abc+10
+RAJ      01:01:00
+DECJ     -1.5
+F0       3.2                           1         abc+10
+F1       -1.5e-14                      2         abc+10
+DM       10.1                          1         abc+10
+FB0      1.2e-5                        1         abc+10
+A1       12.5                          1         abc+10
+EPS1     1.0e-3                        1         abc+10
+EPS2     -2.0e-3                       1         abc+10
+PX       2.0                           0.5       abc+10
+PMRA     10                            1         abc+10
+PMDEC    -5                            1         abc+10
+DIST_DM  3.2                                     abc+10
+@-----------------------------------------------------------------
+PSRJ     J0303+0303                    abc+10
+PSRB     B0300+02                      abc+10
+RAJ      03:03:00                      1         abc+10
+DECJ     +03:03:00                     1         abc+10
+P0       1.5                           1         abc+10
+PX       0.5                           0.3       abc+10
+DIST_AMN 2.0                                     abc+10
+DIST_AMX 3.0                                     abc+10
+PB       0.1                           1         abc+10
+A1       0.0001                        1         abc+10
+SURVEY   misc
+@-----------------------------------------------------------------
+PSRJ     J0404-0404                    abc+10
+RAJ      04:04:00                      1         abc+10
+DECJ     -04:04:00                     1         abc+10
+P0       0.002                         1         abc+10
+PX       1.234                         12        abc+10
+DIST_DM  5.0
+PMRA     3.0
+PMDEC    4.0
+S1400    0.03                          1         abc+10
+ASSOC    GC:NGC6544[abc+10],XRS:foo[abc+11]
+@-----------------------------------------------------------------
+"""
+
+
+def assert_same_catalogue(query, expected):
+    for column in PARAGRAPH_COLUMNS:
+        if column == 'DATE':
+            # psrqpy replaces the discovery date with the year of the name's reference
+            continue
+        if expected[column].dtype == float:
+            np.testing.assert_allclose(query[column].to_numpy(dtype=float), expected[column].to_numpy(), rtol=1e-9, atol=1e-10, err_msg=column)
+        else:
+            assert query[column].fillna('').tolist() == expected[column].fillna('').tolist(), column
+
+
+def test_read_psrcat_db(catalogue, psrcat_db):
+    query = read_psrcat_db(psrcat_db)
+    assert list(query.columns) == PARAGRAPH_COLUMNS
+    assert_same_catalogue(query, catalogue)
+    assert query['DATE'].tolist()[:3] == [1991, 1993, 1968]
+    assert create_pulsar_paragraph(query=psrcat_db) == create_pulsar_paragraph(query=catalogue)
+    assert create_pulsar_paragraph(query=psrcat_db, pulsar_names=['B0531+21']) == create_pulsar_paragraph(query=catalogue, pulsar_names=['B0531+21'])
+
+
+def test_derived_parameters(tmp_path):
+    path = tmp_path / 'psrcat.db'
+    path.write_text(DERIVED_DB)
+    query = read_psrcat_db(str(path))
+    assert_same_catalogue(query, psrqpy.QueryATNF(loadfromdb=str(path)).pandas)
+    assert query['DECJ'][0] == '-01:30:00'
+    assert query['ASSOC'][2] == 'GC'
+
+
+def test_ecliptic_and_missing_values(tmp_path):
+    path = tmp_path / 'psrcat.db'
+    path.write_text(
+        "PSRJ     J0202+0202\nELONG    120.5\nELAT     -3.25\nPMELONG  4.0\nPMELAT   -3.0\n"
+        "P0       0.25\nP1       *\nDIST_DM  1.5\n@---\n"
+        "PSRJ     J0000+0000\nDM\n@---\n"
+    )
+    query = read_psrcat_db(str(path), columns=['PSRJ', 'P1', 'DECJ', 'VTRANS', 'DM'])
+    assert query['PSRJ'].tolist() == ['J0000+0000', 'J0202+0202']
+    assert np.isnan(query['P1']).all() and np.isnan(query['DM']).all()
+    assert query['DECJ'][1].startswith('+16:52:')
+    assert query['VTRANS'][1] == pytest.approx(5.0 * 1.5 * 4.74, rel=1e-3)
+    assert [len(chunk) for chunk in iter_psrcat_db(str(path), chunk_size=1)] == [1, 1]
+
+
+def test_parse_error():
+    assert parse_error('0.0057574519367126365', '2e-19') == pytest.approx(2e-19)
+    assert parse_error('6.37', '9') == pytest.approx(0.09)
+    assert parse_error('4.20972E-13', '2') == pytest.approx(2e-18)
+    assert parse_error('-47:15:09.110714', '15') == pytest.approx(1.5e-05)
+
+
+def test_minimum_companion_mass():
+    mass_function = np.array([2.5e-9, 1e-3, 0.5, 30.0, np.nan])
+    minmass = minimum_companion_mass(mass_function)
+    assert np.isnan(minmass[-1])
+    np.testing.assert_allclose((1.35 + minmass[:-1]) ** 2, minmass[:-1] ** 3 / mass_function[:-1], rtol=1e-10)
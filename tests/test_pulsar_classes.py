@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pulsar_paragraph.pulsar_classes import AssocRecord, GateTable, PulsarParagraph, PulsarVariable, VariableGate, parse_assoc, render_assoc
+
+
+def test_variable_values_to_str_matches_scalar():
+    pulsar_paragraph = PulsarParagraph()
+    values = [np.nan, "*", -1.0, 0.0, 0.001, 0.0015, 0.999, 0.9995, 1.0, 2.0, 5e-4, 3.3, 150.2, 1e5, 1e9, 1e20]
+    for variable in vars(pulsar_paragraph).values():
+        expected = [variable.variable_value_to_str(value) for value in values]
+        assert variable.variable_values_to_str(values) == expected
+        numeric = pd.Series([np.nan if value == "*" else value for value in values])
+        assert variable.variable_values_to_str(numeric) == [variable.variable_value_to_str(value) for value in numeric]
+
+
+def test_variable_values_to_str_overlapping_gates():
+    variable = PulsarVariable(name="test", unit="", load_defaults=False)
+    variable.add_gate(VariableGate("test", 0.0, 10.0, "small"))
+    variable.add_gate(VariableGate("test", 5.0, 20.0, "large"))
+    values = np.array([1.0, 6.0, 15.0, 25.0])
+    assert variable.variable_values_to_str(values) == [variable.variable_value_to_str(value) for value in values]
+    # Overlapping gates added with add_gate are allowed, but can be checked
+    with pytest.raises(ValueError, match="The gates of test overlap"):
+        variable.validate()
+    PulsarParagraph().period.validate()
+
+
+def test_gate_table():
+    # The period gates used to leave a hole between 0.999 and 1.0 seconds
+    assert PulsarParagraph().period.variable_value_to_str(0.9995) == "a normal pulsar with a period of 999.50 milliseconds"
+
+    with pytest.raises(ValueError, match="gaps between 1.0 and 2.0"):
+        GateTable([VariableGate("test", 0.0, 1.0, "low"), VariableGate("test", 2.0, 3.0, "high")], "").validate("test")
+    with pytest.raises(ValueError, match="overlap"):
+        GateTable([VariableGate("test", 0.0, 10.0, "small"), VariableGate("test", 5.0, 20.0, "large")], "").validate("test")
+
+    # Every PulsarParagraph shares the compiled tables of the default gates
+    first, second = PulsarParagraph(), PulsarParagraph()
+    assert first.dm.table is second.dm.table
+    second.dm.add_gate(VariableGate("dm", 1e4, 1e5, "an absurd dispersion measure of"))
+    assert first.dm.table is not second.dm.table
+
+
+def test_parse_assoc():
+    assert parse_assoc('XRS:RX_J0437.4-4711[bbb+93], GRS:4FGL_J0437.2-4715,SNR:G21.5-0.9:Kes75[gvb+00]') == (
+        (AssocRecord('XRS', 'RX_J0437.4-4711', 'bbb+93'),),
+        (AssocRecord('GRS', '4FGL_J0437.2-4715', None),),
+        (AssocRecord('SNR', 'G21.5-0.9', None), AssocRecord('SNR', 'Kes75', 'gvb+00')),
+    )
+    assert parse_assoc('GC') == ((AssocRecord('GC', None, None),),)
+    assert parse_assoc('*') is None
+    # Parsed once per distinct string
+    assert parse_assoc('GC:47Tuc[mlr+91]') is parse_assoc('GC:47Tuc[mlr+91]')
+
+
+def test_assoc_to_str_cached():
+    pulsar_paragraph = PulsarParagraph()
+    render_assoc.cache_clear()
+    for _ in range(3):
+        assert pulsar_paragraph.assoc_to_str('GC:47Tuc[mlr+91]') == ' and has located in the globular cluster (47Tuc). '
+    assert render_assoc.cache_info().hits == 2
+    assert pulsar_paragraph.assoc_to_str('*') is None
@@ -0,0 +1,45 @@
+import numpy as np
+
+from pulsar_paragraph.pulsar_paragraph import assoc_distance_override, assoc_distance_overrides, create_pulsar_paragraph, iter_pulsar_paragraphs
+
+
+def test_create_pulsar_paragraph(catalogue):
+    paragraphs = create_pulsar_paragraph(pulsar_names=['J0437-4715', 'J1748-2446A'], query=catalogue)
+    assert paragraphs == [
+        'PSR J0437-4715 is a millisecond pulsar with a period of 5.76 milliseconds and has an extremely low dispersion measure of 2.645 pc/cm^3. It is a very bright pulsar with a 1400 MHz catalogue flux density of 150.200 mJy. PSR J0437-4715 is a Southern Hemisphere pulsar. This pulsar has a period derivative of 1.37e-20. PSR J0437-4715 has a fairly typical orbital period of 5.741 days and a very mildly eccentric orbit with an eccentricity of 0.00002. It is an ancient pulsar with an estimated age of 6.665 Gyr. PSR J0437-4715 has a low implied magnetic field strength of 2.84e+08 G. It has a high transverse velocity of 104.9 km/s. The estimated distance to J0437-4715 is 156 pc. This pulsar has a low-mass companion with a minimum mass of 0.140 solar masses.',
+        'PSR J1748-2446A (B1744-24A) is a relatively slow millisecond pulsar with a period of 11.56 milliseconds and has a fairly large dispersion measure of 242.150 pc/cm^3. It is a weak pulsar with a 1400 MHz catalogue flux density of 0.600 mJy. PSR J1748-2446A is a Southern Hemisphere pulsar. This pulsar has an unusual negative period derivative of -3.40e-20. Because it is negative, it has no estimate of implied magnetic field strength or characteristic age. PSR J1748-2446A has an extremely tight orbital period of just 1.816 hours. This pulsar has a very low-mass companion with a minimum mass of 0.087 solar masses.',
+    ]
+
+
+def test_create_pulsar_paragraph_assoc_and_links(full_assoc_catalogue):
+    paragraphs = create_pulsar_paragraph(
+        pulsar_names=['J0024-7204C', 'J0534+2200', 'J0835-4510'],
+        query=full_assoc_catalogue,
+        include_links=True,
+    )
+    assert paragraphs == [
+        'PSR J0024-7204C (B0021-72C) is a millisecond pulsar with a period of 5.76 milliseconds and has a fairly low dispersion measure of 24.599 pc/cm^3. It is a weak pulsar with a 1400 MHz catalogue flux density of 0.600 mJy. PSR J0024-7204C is a Southern Hemisphere pulsar  located in the globular cluster (47Tuc).  This pulsar has an unusual negative period derivative of -4.98e-20. Because it is negative, it has no estimate of implied magnetic field strength or characteristic age. This pulsar appears to be solitary. PSR J0024-7204C was discovered in 2003 as part of [[https://astronomy.swin.edu.au/~mbailes/encyc/pksgc_plots.html|the Parkes globular cluster survey]].',
+        'PSR J0534+2200 (B0531+21) is a quite fast pulsar with a period of 33.39 milliseconds and has a moderate dispersion measure of 56.771 pc/cm^3. It is a fairly bright pulsar with a 1400 MHz catalogue flux density of 14.000 mJy. PSR J0534+2200 is a Northern Hemisphere pulsar with a supernova remnant (Crab) and is located in the pulsar wind nebula (Crab). This pulsar has a period derivative of 4.21e-13. PSR J0534+2200 is a fairly young pulsar with an estimated age of 1256.784 yr. It has a typical slow pulsar-like implied magnetic field strength of 3.79e+12 G. PSR J0534+2200 has a high transverse velocity of 140.7 km/s. The estimated distance to J0534+2200 is 2000 pc. This pulsar appears to be solitary. PSR J0534+2200 was discovered in 2018 as part of [[https://astronomy.swin.edu.au/~mbailes/encyc/misc_plots.html|a minor survey]].',
+        'PSR [[https://pulsars.org.au/fold/meertime/J0835-4510|J0835-4510]] (B0833-45) is a quite fast pulsar with a period of 89.33 milliseconds and has a moderate dispersion measure of 67.970 pc/cm^3. It is an extremely bright pulsar with a 1400 MHz catalogue flux density of 1.050 Jy. PSR J0835-4510 is a Southern Hemisphere pulsar  and has a supernova remnant (Vela).  This pulsar has a period derivative of 1.25e-13. PSR J0835-4510 is a fairly young pulsar with an estimated age of 11321.877 yr. It has a typical slow pulsar-like implied magnetic field strength of 3.38e+12 G. PSR J0835-4510 has an intermediate transverse velocity of 78.5 km/s. The estimated distance to J0835-4510 is 285 pc. This pulsar appears to be solitary. PSR J0835-4510 was discovered in 2018 as part of [[https://astronomy.swin.edu.au/~mbailes/encyc/misc_plots.html|a minor survey]].',
+    ]
+
+
+def test_assoc_distance_overrides():
+    assocs = ['GC:M22[lbm+87]', 'GC:M2[fhn+05]', 'GC:M28[lbm+87],XRS:CXOU_J182432.8-245208', 'SNR:Vela[lvm68]', '*', np.nan]
+    distances = assoc_distance_overrides(assocs)
+    np.testing.assert_array_equal(distances, [3.2, 11.5, 5.5, np.nan, np.nan, np.nan])
+    assert assoc_distance_override('GC:M2[fhn+05]') == 11.5
+
+
+def test_iter_pulsar_paragraphs(catalogue):
+    paragraphs = iter_pulsar_paragraphs(query=catalogue, chunk_size=3)
+    # Nothing is rendered until the first paragraph is requested
+    first = next(paragraphs)
+    assert first[0] == catalogue['PSRJ'].iloc[0]
+    assert [first] + list(paragraphs) == list(zip(catalogue['PSRJ'], create_pulsar_paragraph(query=catalogue)))
+
+
+def test_create_pulsar_paragraph_jobs(catalogue):
+    serial = create_pulsar_paragraph(query=catalogue)
+    assert create_pulsar_paragraph(query=catalogue, jobs=2) == serial
+    assert [paragraph for _, paragraph in iter_pulsar_paragraphs(query=catalogue, chunk_size=1, jobs=3)] == serial
@@ -0,0 +1,23 @@
+import re
+
+from pulsar_paragraph.rewrite import RewriteEngine, RewriteRule, trie_regex
+
+
+def test_trie_regex():
+    strs = ['and an', 'and  an', 'and and', ') a ', ')an', '(?)']
+    matcher = re.compile(trie_regex(strs))
+    for string in strs:
+        assert matcher.fullmatch(string)
+    assert matcher.search('It is a pulsar.') is None
+
+
+def test_rewrite_engine():
+    engine = RewriteEngine([
+        RewriteRule([(')an', ') an')]),
+        # Only matches after the first rule has been applied
+        RewriteRule([(') an', ') and an')]),
+        RewriteRule([(')a', ') a')], guard=')a '),
+    ])
+    assert engine.rewrite('a source (X)an x-ray source (Y)ab') == 'a source (X) and an x-ray source (Y)ab'
+    assert engine.rewrite('nothing to fix') == 'nothing to fix'
+    assert engine.hits == {')an': 1, ') an': 1}
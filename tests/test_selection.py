@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+import pytest
+
+from pulsar_paragraph.pipeline import QuerySource, run_pipeline
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph, main, parse_where, select_pulsars
+from pulsar_paragraph.selection import declination_degrees
+from pulsar_paragraph.writers import open_writer
+
+
+def selected(catalogue, where, **kwargs):
+    return select_pulsars(query=catalogue, where=where, **kwargs)['PSRJ'].tolist()
+
+
+def test_declination_degrees():
+    np.testing.assert_allclose(declination_degrees(['-47:15:09.11', '+22:00:52.06', '-00:30', '12']), [-47.25253, 22.01446, -0.5, 12], rtol=1e-5)
+    assert np.isnan(declination_degrees(['*', None, float('nan')])).all()
+
+
+def test_select_pulsars_where(catalogue):
+    assert selected(catalogue, 'P0 < 0.03 and PB > 0 and DECJ < 0') == ['J0437-4715', 'J1748-2446A']
+    assert selected(catalogue, "ASSOC in ['GC', 'SNR'] and not DECJ < 0") == ['J0534+2200', 'J2129+1210A']
+    assert selected(catalogue, '0.01 < P0 < 0.1') == ['J0534+2200', 'J0835-4510', 'J1748-2446A']
+    assert selected(catalogue, "(PSRB != 'B0531+21') & (log10(P0) > -1)") == ['J1820-0427', 'J2129+1210A']
+    # Derived quantities, and missing values are never selected
+    assert selected(catalogue, 'P1_CORR < 0') == ['J0024-7204C', 'J1748-2446A', 'J2129+1210A']
+    assert selected(catalogue, 'PB > 0 or PB <= 0') == ['J0437-4715', 'J1748-2446A']
+    assert selected(catalogue, 'PB != 0') == ['J0437-4715', 'J1748-2446A']
+    assert selected(catalogue, "PSRB != 'B0531+21'") == ['J0024-7204C', 'J0835-4510', 'J1748-2446A', 'J1820-0427', 'J2129+1210A']
+    assert selected(catalogue, "ASSOC not in ['GC']") == ['J0437-4715', 'J0534+2200', 'J0835-4510']
+    assert selected(catalogue, 'P1 and PB') == ['J0437-4715', 'J1748-2446A']
+    assert selected(catalogue, 'PB | ASSOC') == selected(catalogue, 'PB > 0 or ASSOC in [\'GC\', \'SNR\', \'XRS\']')
+    assert selected(catalogue, 'P0 > 1', pulsar_names=['J04*', 'J2144-3933']) == ['J2144-3933']
+
+
+def test_where_negation_missing(catalogue):
+    catalogue = catalogue.copy()
+    catalogue.loc[catalogue['PSRJ'] == 'J0437-4715', 'P0'] = np.nan
+    fast = selected(catalogue, 'P0 < 0.03')
+    assert 'J0437-4715' not in fast
+    # Negating a comparison with a missing value doesn't select it either
+    for where in ['not P0 < 0.03', '~(P0 < 0.03)', 'not (P0 < 0.03 and DECJ < 0)']:
+        assert 'J0437-4715' not in selected(catalogue, where)
+    assert selected(catalogue, 'not P0 < 0.03') == [psrj for psrj in catalogue['PSRJ'] if psrj not in fast + ['J0437-4715']]
+    # Unless the rest of the condition decides it
+    assert 'J0437-4715' in selected(catalogue, 'not (P0 < 0.03 and DECJ > 0)')
+    assert 'J0437-4715' in selected(catalogue, 'not isnan(P0) or DECJ < 0')
+
+
+def test_create_pulsar_paragraph_where(catalogue):
+    paragraphs = create_pulsar_paragraph(query=catalogue, where="ASSOC == 'GC'")
+    assert paragraphs == create_pulsar_paragraph(query=catalogue, pulsar_names=['J0024-7204C', 'J1748-2446A', 'J2129+1210A'])
+    # where comes after the existing arguments, so positional calls are unchanged
+    assert create_pulsar_paragraph(['J0437-4715'], catalogue) == create_pulsar_paragraph(query=catalogue, where="PSRJ == 'J0437-4715'")
+
+
+def test_pipeline_where(catalogue, tmp_path):
+    with open_writer(str(tmp_path / 'paragraphs.jsonl')) as writer:
+        run_pipeline(QuerySource(catalogue), writer, chunk_size=3, where='P1_CORR > 1e-14')
+    with open(tmp_path / 'paragraphs.jsonl') as f:
+        assert [json.loads(line)['PSRJ'] for line in f] == ['J0534+2200', 'J0835-4510']
+
+
+@pytest.mark.parametrize('where, message', [
+    ('P0 <', 'Invalid selection'),
+    ('F0 > 1', 'Unknown column F0'),
+    ("__import__('os').system('ls')", 'Only the functions'),
+    ('P0.real > 1', 'Unsupported Attribute'),
+    ('P0 in [P1]', 'in needs a list'),
+    ('P0 + 1', "isn't a condition"),
+    ("PSRB < 'B2'", 'PSRB is a string column'),
+    ("'J1' <= PSRJ", 'PSRJ is a string column'),
+    ('ASSOC + 1 > 2', 'ASSOC is a string column'),
+    ('-SURVEY', 'SURVEY is a string column'),
+    ("P0 > 'x'", "The string 'x'"),
+])
+def test_invalid_where(catalogue, where, message):
+    with pytest.raises(ValueError, match=message):
+        select_pulsars(query=catalogue, where=where)
+
+
+def test_string_column_order():
+    # Rejected when the expression is parsed, before the catalogue is loaded
+    with pytest.raises(ValueError, match="PSRB is a string column, it can't be used in an ordering comparison"):
+        parse_where("PSRB < 'B2'")
+    assert parse_where("PSRB != 'B2' and ASSOC in ['GC']").columns == {'PSRB', 'ASSOC'}
+
+
+def test_main_where(psrcat_db, capsys):
+    main(['--db', psrcat_db, '--where', 'P0 > 1'])
+    assert capsys.readouterr().out.startswith('PSR J2144-3933 ')
+    with pytest.raises(SystemExit):
+        main(['--db', psrcat_db, '--where', 'P0 >> 1'])
+    assert 'Unsupported BinOp' in capsys.readouterr().err
@@ -0,0 +1,65 @@
+from pulsar_paragraph.pulsar_classes import AssocSection, PulsarParagraph, Section
+from pulsar_paragraph.sentence_plan import SentencePlan, PulsarSections, compose_paragraph
+
+
+def sections(**fields):
+    """PulsarSections of a made up pulsar with only a period, plus fields."""
+    defaults = dict.fromkeys(PulsarSections._fields)
+    defaults.update(
+        psrj='J0000+0000',
+        name='J0000+0000',
+        period=Section('a normal pulsar with a period of', '1.50', 'seconds'),
+        pdot=' PSR J0000+0000 has no measured period derivative.',
+        minmass_space=True,
+    )
+    defaults.update(fields)
+    return PulsarSections(**defaults)
+
+
+def test_compose_paragraph_subjects():
+    age = Section('a fairly old pulsar with an estimated age of', '2.000', 'Myr')
+    bsurf = Section('a moderate implied magnetic field strength of', '1.00e+10', 'G')
+    vtrans = Section('a low transverse velocity of', '20.0', 'km/s')
+    # The pulsar is named, then "It", then named again
+    assert compose_paragraph(sections(age=age, bsurf=bsurf, vtrans=vtrans)) == (
+        'PSR J0000+0000 is a normal pulsar with a period of 1.50 seconds. PSR J0000+0000 has no measured period derivative.'
+        ' PSR J0000+0000 is a fairly old pulsar with an estimated age of 2.000 Myr. It has a moderate implied magnetic field strength of 1.00e+10 G.'
+        ' PSR J0000+0000 has a low transverse velocity of 20.0 km/s. This pulsar appears to be solitary.'
+    )
+    # After the orbit sentence the age is "It"
+    pb = Section('has a fairly typical orbital period of', '5.000', 'days')
+    ecc = Section('an eccentric orbit with an eccentricity of', '0.20000', '')
+    assert compose_paragraph(sections(pb=pb, ecc=ecc, age=age, bsurf=bsurf, vtrans=vtrans, distance=20000)) == (
+        'PSR J0000+0000 is a normal pulsar with a period of 1.50 seconds. PSR J0000+0000 has no measured period derivative.'
+        ' PSR J0000+0000 has a fairly typical orbital period of 5.000 days and an eccentric orbit with an eccentricity of 0.20000.'
+        ' It is a fairly old pulsar with an estimated age of 2.000 Myr. PSR J0000+0000 has a moderate implied magnetic field strength of 1.00e+10 G.'
+        ' It has a low transverse velocity of 20.0 km/s.'
+        ' The YMD distance model suggests that the distance to J0000+0000 is 20000 pc, but that is suspicious. This pulsar appears to be solitary.'
+    )
+
+
+def test_compose_paragraph_associations():
+    joined = {
+        AssocSection('a supernova remnant (Crab).', False, False): 'is a Northern Hemisphere pulsar with a supernova remnant (Crab).',
+        AssocSection(' located in the globular cluster (47Tuc). ', False, True): 'is a Northern Hemisphere pulsar  located in the globular cluster (47Tuc). ',
+        AssocSection('an extragalactic pulsar located in the Small Magellanic Cloud.', True, False): 'is a Northern Hemisphere pulsar.It is an extragalactic pulsar located in the Small Magellanic Cloud.',
+        None: 'is a Northern Hemisphere pulsar.',
+    }
+    for assoc, expected in joined.items():
+        paragraph = compose_paragraph(sections(hemisphere='Northern Hemisphere', assoc=assoc, date='2001', survey='a minor survey'))
+        assert paragraph.startswith(f'PSR J0000+0000 is a normal pulsar with a period of 1.50 seconds. It {expected} PSR J0000+0000 has')
+        assert paragraph.endswith('PSR J0000+0000 was discovered in 2001 as part of a minor survey.')
+
+
+def test_sentence_plan_templates():
+    plan = SentencePlan()
+    paragraphs = plan.render_many([sections(), sections(psrj='J1111+1111', name='J1111+1111'), sections(distance=100)])
+    assert paragraphs[1].startswith('PSR J1111+1111 is')
+    assert len(plan.templates) == 2
+
+
+def test_variable_values_to_sections():
+    column = PulsarParagraph().age.variable_values_to_sections([1256.784, '*', 2e6])
+    assert column[0] == Section('a fairly young pulsar with an estimated age of', '1256.784', 'yr')
+    assert column[1] is None
+    assert column.texts[2] == 'a fairly old pulsar with an estimated age of 2.000 Myr'
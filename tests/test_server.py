@@ -0,0 +1,68 @@
+import json
+import asyncio
+
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph
+from pulsar_paragraph.server import ParagraphServer
+
+
+async def request(port, method, target, body=None):
+    body = b'' if body is None else json.dumps(body).encode()
+    return await raw_request(port, f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n", body)
+
+
+async def raw_request(port, head, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(head.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    if b'application/json' in head:
+        return status, json.loads(content)
+    return status, content.decode()
+
+
+def test_paragraph_server(catalogue):
+    releases = [catalogue.iloc[:4], catalogue]
+
+    def load_query(refresh=False):
+        return releases.pop(0)
+
+    async def run():
+        server = ParagraphServer(load_query)
+        asyncio_server = await server.start('127.0.0.1', 0)
+        port = asyncio_server.sockets[0].getsockname()[1]
+        async with asyncio_server:
+            status, paragraph = await request(port, 'GET', '/paragraph/J0437-4715')
+            assert (status, paragraph) == (200, create_pulsar_paragraph(pulsar_names=['J0437-4715'], query=catalogue)[0])
+            # B names and URL escaped names
+            assert (await request(port, 'GET', '/paragraph/B0531%2B21'))[0] == 200
+            assert (await request(port, 'GET', '/paragraph/J2144-3933'))[0] == 404
+            # Unicode minus signs and lower case, and suggestions for unknown names
+            assert (await request(port, 'GET', '/paragraph/j0437%E2%88%924715')) == (status, paragraph)
+            assert (await request(port, 'GET', '/paragraph/J0437-4716'))[1]['suggestions'][0] == 'J0437-4715'
+
+            assert await request(port, 'POST', '/reload') == (200, {'pulsars': 8, 'loaded': server.index.loaded})
+            status, content = await request(port, 'POST', '/paragraphs', {'pulsars': ['J2144-3933', 'B0531+21', 'J9999+9999']})
+            assert status == 200
+            assert content['paragraphs'] == {
+                'J2144-3933': create_pulsar_paragraph(pulsar_names=['J2144-3933'], query=catalogue)[0],
+                'B0531+21': create_pulsar_paragraph(pulsar_names=['B0531+21'], query=catalogue)[0],
+            }
+            assert content['missing'] == ['J9999+9999']
+            assert (await request(port, 'POST', '/paragraphs', {'names': []}))[0] == 400
+            assert (await request(port, 'POST', '/paragraphs', {'pulsars': 5}))[0] == 400
+            assert (await request(port, 'POST', '/paragraphs', {'pulsars': 'J0437-4715'}))[0] == 400
+            assert (await request(port, 'POST', '/paragraphs', {'pulsars': ['J0437-4715', 5]}))[0] == 400
+            for content_length in ('abc', '-5'):
+                assert (await raw_request(port, f"POST /paragraphs HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n"))[0] == 400
+
+            # Unexpected errors are answered with a 500 and the server keeps serving
+            def failing_route(method, target, body):
+                raise RuntimeError("index corrupted")
+
+            server.route = failing_route
+            assert await request(port, 'GET', '/health') == (500, {'error': 'Internal server error'})
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import sys
+import subprocess
+
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph, update_pulsar_paragraphs
+from pulsar_paragraph.store import ParagraphStore
+
+# Run main() in a fresh interpreter then report the heavy modules that were imported
+RUN_MAIN = """
+import sys
+from pulsar_paragraph.pulsar_paragraph import main
+sys.argv = ['pulsar_paragraph'] + sys.argv[1:]
+try:
+    main()
+finally:
+    print(sorted(module for module in ('pandas', 'psrqpy') if module in sys.modules), file=sys.stderr)
+"""
+
+
+def run_main(*args):
+    return subprocess.run([sys.executable, '-c', RUN_MAIN, *args], capture_output=True, text=True, check=True)
+
+
+def test_import_is_lazy():
+    result = subprocess.run(
+        [sys.executable, '-c', "import sys, pulsar_paragraph.pulsar_paragraph; print('pandas' in sys.modules, 'psrqpy' in sys.modules)"],
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == 'False False'
+
+
+def test_cached_fast_path(catalogue, tmp_path):
+    manifest_path = str(tmp_path / 'manifest.json')
+    update_pulsar_paragraphs(manifest_path, query=catalogue)
+
+    result = run_main('--incremental', manifest_path, '--cached', '-p', 'B0531+21', 'J0437-4715')
+    assert result.stdout.splitlines() == create_pulsar_paragraph(pulsar_names=['J0437-4715', 'J0534+2200'], query=catalogue)
+    assert result.stderr.splitlines()[-1] == '[]'
+
+    assert run_main('--help').stderr.splitlines()[-1] == '[]'
+
+
+def test_store_fast_path(catalogue, tmp_path):
+    store_path = str(tmp_path / 'store')
+    update_pulsar_paragraphs(str(tmp_path / 'manifest.json'), query=catalogue, store=ParagraphStore(store_path))
+
+    result = run_main('--store', store_path, '--cached', '-p', 'B0531+21', 'J04*')
+    assert result.stdout.splitlines() == create_pulsar_paragraph(pulsar_names=['J0437-4715', 'J0534+2200'], query=catalogue)
+    assert result.stderr.splitlines()[-1] == '[]'
@@ -0,0 +1,55 @@
+from pulsar_paragraph.incremental import render_fingerprint
+from pulsar_paragraph.pulsar_classes import PulsarParagraph
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph, update_pulsar_paragraphs
+from pulsar_paragraph.store import ParagraphStore, stored_paragraphs
+
+
+def test_store_lookup(tmp_path):
+    records = [('J0534+2200', 'B0531+21', 'The Crab.'), ('J0437-4715', None, 'A bright MSP.'), ('J0437-4700', None, 'Made up.')]
+    with ParagraphStore(str(tmp_path / 'store')) as store:
+        store.update(records, 'gates')
+        assert len(store) == 3
+        assert store.get('B0531+21') == ('J0534+2200', 'The Crab.')
+        assert store.get('J0534+2200') == ('J0534+2200', 'The Crab.')
+        assert store.get('J0000+0000') is None
+        assert store.scan('J04') == [('J0437-4700', 'Made up.'), ('J0437-4715', 'A bright MSP.')]
+        assert store.scan('B05') == [('J0534+2200', 'The Crab.')]
+
+        # A partial update replaces one pulsar and removes another
+        store.update([('J0437-4715', None, 'Updated.')], 'gates', removed=['J0437-4700'])
+        assert store.records() == [('J0437-4715', None, 'Updated.'), ('J0534+2200', 'B0531+21', 'The Crab.')]
+
+    # The index is read back when the store is opened again
+    with ParagraphStore(str(tmp_path / 'store')) as store:
+        assert store.fingerprint == 'gates'
+        assert stored_paragraphs(store, ['J04*', 'B0531+21'], 'gates') == [('J0437-4715', 'Updated.'), ('J0534+2200', 'The Crab.')]
+        assert stored_paragraphs(store, ['J0534+2200'], 'other gates') is None
+        assert stored_paragraphs(store, ['J05*', 'J9*'], 'gates') is None
+
+        # Different gates replace everything
+        store.update([('J0437-4715', None, 'New gates.')], 'other gates')
+        assert store.records() == [('J0437-4715', None, 'New gates.')]
+
+
+def test_store_compacts(tmp_path):
+    with ParagraphStore(str(tmp_path / 'store')) as store:
+        for version in range(5):
+            store.update([('J0437-4715', None, f'Version {version}.'), ('J0534+2200', 'B0531+21', 'The Crab.')], 'gates')
+        assert (tmp_path / 'store' / 'paragraphs.dat').stat().st_size <= 2 * len('J0437-4715\t\tVersion 4.\nJ0534+2200\tB0531+21\tThe Crab.\n')
+        assert store.get('J0437-4715') == ('J0437-4715', 'Version 4.')
+
+
+def test_incremental_store(catalogue, tmp_path):
+    manifest_path = str(tmp_path / 'manifest.json')
+    fingerprint = render_fingerprint(PulsarParagraph())
+    with ParagraphStore(str(tmp_path / 'store')) as store:
+        update_pulsar_paragraphs(manifest_path, query=catalogue, store=store)
+        assert len(store) == len(catalogue)
+
+        release = catalogue[catalogue['PSRJ'] != 'J2144-3933'].copy()
+        release.loc[release['PSRJ'] == 'J0437-4715', 'P0'] = 0.5
+        update_pulsar_paragraphs(manifest_path, query=release, store=store)
+        assert store.get('J2144-3933') is None
+        assert stored_paragraphs(store, release['PSRJ'].tolist(), fingerprint) == sorted(
+            zip(release['PSRJ'], create_pulsar_paragraph(query=release))
+        )
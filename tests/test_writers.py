@@ -0,0 +1,62 @@
+import csv
+import gzip
+import json
+import sqlite3
+
+import pytest
+
+from pulsar_paragraph.pulsar_paragraph import create_pulsar_paragraph, iter_pulsar_records
+from pulsar_paragraph.writers import RECORD_FIELDS, infer_format, open_writer
+
+
+def write_records(catalogue, path, **kwargs):
+    records = list(iter_pulsar_records(query=catalogue))
+    with open_writer(str(path), buffer_size=3, **kwargs) as writer:
+        writer.write_many(records)
+    return records
+
+
+def test_iter_pulsar_records(catalogue):
+    records = list(iter_pulsar_records(query=catalogue))
+    assert [record['paragraph'] for record in records] == create_pulsar_paragraph(query=catalogue)
+    assert [list(record) for record in records] == [RECORD_FIELDS] * len(catalogue)
+    crab = records[catalogue['PSRJ'].tolist().index('J0534+2200')]
+    assert crab['PSRB'] == 'B0531+21'
+    assert crab['AGE_CORR'] == pytest.approx(1256.784, rel=1e-6)
+    assert records[catalogue['PSRJ'].tolist().index('J2144-3933')]['PSRB'] is None
+
+
+def test_infer_format():
+    assert infer_format('paragraphs.jsonl.gz') == ('jsonl', 'gzip')
+    assert infer_format('paragraphs.csv.zst') == ('csv', 'zstd')
+    assert infer_format('paragraphs.sqlite') == ('sqlite', None)
+    assert infer_format('paragraphs') == (None, None)
+
+
+def test_jsonl_writer(catalogue, tmp_path):
+    records = write_records(catalogue, tmp_path / 'paragraphs.jsonl.gz')
+    with gzip.open(tmp_path / 'paragraphs.jsonl.gz', 'rt') as f:
+        assert [json.loads(line) for line in f] == records
+
+
+def test_csv_writer(catalogue, tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+    records = write_records(catalogue, tmp_path / 'paragraphs.csv.zst')
+    with open(tmp_path / 'paragraphs.csv.zst', 'rb') as f:
+        rows = list(csv.DictReader(zstandard.ZstdDecompressor().stream_reader(f).read().decode().splitlines()))
+    assert [row['paragraph'] for row in rows] == [record['paragraph'] for record in records]
+    assert [row['PSRB'] or None for row in rows] == [record['PSRB'] for record in records]
+
+
+def test_parquet_writer(catalogue, tmp_path):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    records = write_records(catalogue, tmp_path / 'paragraphs.parquet', compression='zstd')
+    assert parquet.read_table(tmp_path / 'paragraphs.parquet').to_pylist() == records
+
+
+def test_sqlite_writer(catalogue, tmp_path):
+    records = write_records(catalogue, tmp_path / 'paragraphs.sqlite')
+    connection = sqlite3.connect(tmp_path / 'paragraphs.sqlite')
+    rows = connection.execute(f"SELECT {', '.join(RECORD_FIELDS)} FROM paragraphs").fetchall()
+    connection.close()
+    assert sorted(rows) == sorted(tuple(record.values()) for record in records)